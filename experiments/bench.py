@@ -2,9 +2,13 @@
 """
 Benchmarking and performance measurement for Pacman search algorithms.
 Measures time/space complexity (expansions, frontier size) and generates charts.
+For tracking performance against a stored baseline see experiments/regression.py;
+for heuristic admissibility / consistency / EBF checks see experiments/heuristic_quality.py.
 """
 
+import os
 import time
+import tracemalloc
 import matplotlib.pyplot as plt
 import numpy as np
 from typing import List, Dict, Tuple
@@ -13,6 +17,8 @@ from pacman.core.state import GameState
 from pacman.core.rules import Rules
 from pacman.search.astar import AStarSearch
 from pacman.search.heuristics import Heuristics
+from pacman.search.macro_planner import MacroPlanner
+from pacman.core.layout_generator import generate_layout_file
 
 
 class BenchmarkResults:
@@ -25,6 +31,14 @@ class BenchmarkResults:
         self.execution_time = 0.0
         self.nodes_expanded = 0
         self.max_frontier_size = 0
+        self.nodes_generated = 0
+        self.max_closed_size = 0
+        self.heuristic_calls = 0
+        self.heuristic_time = 0.0
+        self.cache_hit_rate = 0.0
+        self.stats = None  # SearchStats from the search engine
+        self.grid_size = None  # (rows, cols) of the layout
+        self.food_count = 0
         self.path_length = 0
         self.success = False
         self.memory_usage = 0
@@ -41,14 +55,17 @@ class PacmanBenchmark:
     def run_single_benchmark(self, 
                            layout_file: str, 
                            algorithm: str = "astar",
-                           heuristic: str = "manhattan") -> BenchmarkResults:
+                           heuristic: str = "maze_distance",
+                           measure_memory: bool = False) -> BenchmarkResults:
         """
         Run a single benchmark test.
         
         Args:
             layout_file: Path to layout file
-            algorithm: Search algorithm to use
-            heuristic: Heuristic function to use
+            algorithm: Search algorithm to use ("astar", or "macro" for MacroPlanner)
+            heuristic: Heuristic spec from the registry in heuristics.py (a name or
+                "max(a,b)"); unknown names raise ValueError
+            measure_memory: Record peak traced allocation (tracemalloc) in memory_usage
             
         Returns:
             BenchmarkResults object with performance metrics
@@ -63,10 +80,14 @@ class PacmanBenchmark:
             initial_state = GameState.get_initial_state(grid)
             rules = Rules(grid)
             heuristics = Heuristics(grid)
+            result.grid_size = (grid.rows, grid.cols)
+            result.food_count = len(grid.initial_food_pos)
             
             # Create search algorithm
             if algorithm == "astar":
-                search = AStarSearch(rules, heuristics)
+                search = AStarSearch(rules, heuristics, heuristic)
+            elif algorithm == "macro":
+                search = MacroPlanner(grid, heuristic)
             else:
                 raise ValueError(f"Unknown algorithm: {algorithm}")
             
@@ -76,18 +97,31 @@ class PacmanBenchmark:
                        state.pacman.pos == grid.exitgate_pos)
             
             # Measure performance
+            if measure_memory:
+                tracemalloc.start()
             start_time = time.time()
-            path = search.search(initial_state, goal_condition)
+            if algorithm == "macro":
+                path, stats = search.search(initial_state, return_stats=True)  # Goal is built in
+            else:
+                path, stats = search.search(initial_state, goal_condition, return_stats=True)
             end_time = time.time()
+            if measure_memory:
+                result.memory_usage = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
             
             result.execution_time = end_time - start_time
             result.success = path is not None
             result.path_length = len(path) if path else 0
             
-            # TODO: Add actual node expansion counting
-            # This would require modifying the search algorithm to track metrics
-            result.nodes_expanded = 0  # Placeholder
-            result.max_frontier_size = 0  # Placeholder
+            # Search metrics reported by the engine
+            result.stats = stats
+            result.nodes_expanded = stats.expansions
+            result.max_frontier_size = stats.peak_frontier
+            result.nodes_generated = stats.generations
+            result.max_closed_size = stats.peak_closed
+            result.heuristic_calls = stats.heuristic_calls
+            result.heuristic_time = stats.heuristic_time
+            result.cache_hit_rate = stats.cache_hit_rate
             
         except Exception as e:
             print(f"Benchmark failed: {e}")
@@ -108,7 +142,7 @@ class PacmanBenchmark:
         results = []
         
         algorithms = ["astar"]
-        heuristics = ["manhattan", "bfs", "mst"]
+        heuristics = ["maze_distance", "bfs_distance", "mst"]
         
         for layout_file in layout_files:
             print(f"Benchmarking layout: {layout_file}")
@@ -122,6 +156,74 @@ class PacmanBenchmark:
         self.results.extend(results)
         return results
     
+    def run_scaling_benchmark(self,
+                              sizes: Tuple[int, ...] = (11, 21, 31, 41, 61),
+                              food_counts: Tuple[int, ...] = (1, 2, 3, 4, 5, 6),
+                              fixed_size: int = 21,
+                              fixed_food: int = 3,
+                              heuristic: str = "tsp_maze",
+                              seed: int = 0,
+                              ghost_count: int = 0,
+                              layout_dir: str = "experiments/generated",
+                              algorithm: str = "astar") -> List[BenchmarkResults]:
+        """
+        Run the search on generated layouts to measure how time and memory scale.
+        Two sweeps: grid size (square, fixed_food food) and food count (fixed_size grid).
+        
+        Args:
+            sizes: Grid sizes (rows = cols) for the size sweep (5-500)
+            food_counts: Food counts for the food sweep
+            fixed_size / fixed_food: The other dimension held constant in each sweep
+            heuristic: Heuristic used by the search
+            seed: Layout generator seed
+            ghost_count: Ghosts per layout (ghosts multiply the state space)
+            layout_dir: Where generated layout files are written
+            algorithm: "astar" or "macro" (see run_single_benchmark)
+            
+        Returns:
+            List of benchmark results (with grid_size, food_count and memory_usage set)
+        """
+        results = []
+        sweeps = [(size, fixed_food) for size in sizes] + [(fixed_size, food) for food in food_counts]
+        for size, food in sweeps:
+            layout_file = os.path.join(layout_dir, f"gen_{size}x{size}_f{food}_g{ghost_count}_s{seed}.txt")
+            generate_layout_file(layout_file, size, size, seed=seed, food_count=food,
+                                 pie_count=0, ghost_count=ghost_count)
+            print(f"Scaling: {size}x{size}, {food} food...")
+            result = self.run_single_benchmark(os.path.abspath(layout_file), algorithm, heuristic,
+                                               measure_memory=True)
+            results.append(result)
+        
+        self.results.extend(results)
+        return results
+    
+    def generate_scaling_charts(self, results: List[BenchmarkResults],
+                                fixed_size: int = 21, fixed_food: int = 3,
+                                output_dir: str = "experiments/charts"):
+        """
+        Plot time and peak memory against grid size and against food count.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        by_size = sorted((r for r in results if r.success and r.food_count == fixed_food),
+                         key=lambda r: r.grid_size)
+        by_food = sorted((r for r in results if r.success and r.grid_size == (fixed_size, fixed_size)),
+                         key=lambda r: r.food_count)
+        
+        fig, axes = plt.subplots(2, 2, figsize=(12, 9))
+        for row, (series, xs, xlabel) in enumerate([
+                (by_size, [r.grid_size[0] * r.grid_size[1] for r in by_size], "Grid cells"),
+                (by_food, [r.food_count for r in by_food], "Food count")]):
+            axes[row][0].plot(xs, [r.execution_time for r in series], marker='o')
+            axes[row][0].set_ylabel("Execution Time (seconds)")
+            axes[row][1].plot(xs, [r.memory_usage / 1024 / 1024 for r in series], marker='o', color='green')
+            axes[row][1].set_ylabel("Peak Memory (MiB)")
+            for ax in axes[row]:
+                ax.set_xlabel(xlabel)
+                ax.grid(True, alpha=0.3)
+        fig.suptitle("Search Scaling on Generated Layouts")
+        fig.savefig(f"{output_dir}/scaling.png", dpi=300, bbox_inches='tight')
+        plt.close(fig)
+    
     def generate_charts(self, output_dir: str = "experiments/charts"):
         """
         Generate performance charts from benchmark results.
@@ -227,8 +329,12 @@ class PacmanBenchmark:
         if successful > 0:
             avg_time = np.mean([r.execution_time for r in self.results if r.success])
             avg_length = np.mean([r.path_length for r in self.results if r.success])
+            avg_expanded = np.mean([r.nodes_expanded for r in self.results if r.success])
+            avg_frontier = np.mean([r.max_frontier_size for r in self.results if r.success])
             print(f"Average execution time: {avg_time:.3f}s")
             print(f"Average path length: {avg_length:.1f}")
+            print(f"Average nodes expanded: {avg_expanded:.1f}")
+            print(f"Average peak frontier size: {avg_frontier:.1f}")
         
         # Group by heuristic
         heuristics = list(set(r.heuristic_name for r in self.results))
@@ -236,14 +342,52 @@ class PacmanBenchmark:
             heuristic_results = [r for r in self.results if r.heuristic_name == heuristic]
             success_rate = len([r for r in heuristic_results if r.success]) / len(heuristic_results) * 100
             print(f"\n{heuristic} heuristic: {success_rate:.1f}% success rate")
+            for r in heuristic_results:
+                if r.stats is not None:
+                    print(f"  {r.stats}")
 
 
 def main():
     """
     Main function to run benchmarks.
     """
+    import argparse
+    parser = argparse.ArgumentParser(description="Pacman search benchmark")
+    parser.add_argument('--scaling', action='store_true',
+                        help="Run the generated-layout scaling sweep instead of the fixed suite")
+    parser.add_argument('--seed', type=int, default=0, help="Layout generator seed")
+    parser.add_argument('--algorithm', choices=["astar", "macro"], default="astar",
+                        help="Search used by --scaling (macro = MacroPlanner with mst_exit)")
+    parser.add_argument('--heuristic-quality', action='store_true',
+                        help="Measure h/h*, admissibility, consistency and EBF of each heuristic")
+    parser.add_argument('--samples', type=int, default=500,
+                        help="Sampled states per layout for --heuristic-quality")
+    args = parser.parse_args()
+    
+    from pacman.core import profiler
+    profiler.enable_from_env()  # PACMAN_PROFILE=out.json / out.folded
+    
+    if args.heuristic_quality:
+        from experiments.heuristic_quality import run
+        print("Starting Pacman Heuristic Quality Benchmark...")
+        run(samples=args.samples, seed=args.seed)
+        return
+    
     benchmark = PacmanBenchmark()
     
+    if args.scaling:
+        print("Starting Pacman Search Scaling Benchmark...")
+        if args.algorithm == "macro":
+            results = benchmark.run_scaling_benchmark(seed=args.seed, heuristic="mst_exit", algorithm="macro")
+        else:
+            results = benchmark.run_scaling_benchmark(seed=args.seed)
+        benchmark.generate_scaling_charts(results)
+        for r in results:
+            print(f"{r.grid_size[0]}x{r.grid_size[1]} food={r.food_count}: "
+                  f"{r.execution_time:.3f}s, {r.memory_usage / 1024:.0f} KiB, "
+                  f"expanded={r.nodes_expanded}, success={r.success}")
+        return
+    
     # Test layouts (you can add more)
     layout_files = [
         "data/layout.txt",
@@ -0,0 +1,219 @@
+# experiments/heuristic_quality.py
+"""
+Heuristic quality dashboard: checks the admissibility / consistency claims in
+pacman/search/heuristic_analysis.md against ground truth.
+
+On small generated layouts the whole state space reachable by AStarSearch
+(Rules.expand, the successor generator used by the search) is enumerated,
+and the true cost-to-go h* of every state is computed by a backward BFS from the
+goal states (unit action costs). For each heuristic spec (see the registry in pacman/search/heuristics.py) it reports:
+
+    mean h/h*            how much of the true cost the heuristic sees (1.0 = perfect)
+    max overestimate     max(h - h*); > 0 means the heuristic is NOT admissible
+    inadmissible         fraction of sampled states with h > h*
+    consistency          fraction of edges (s -> s') with h(s) > 1 + h(s')
+    expansions / EBF     AStarSearch expansions from the start state and the effective
+                         branching factor b* solving N + 1 = 1 + b* + ... + b*^d
+
+Layouts are generated without magical pies: eating a wall inside
+Rules.expand mutates the shared Grid, which would corrupt the enumeration.
+
+Usage:
+    python experiments/heuristic_quality.py [--samples 500] [--seed 0]
+"""
+
+import argparse
+import os
+import random
+from collections import deque
+from typing import Dict, List, Optional
+
+from pacman.core.grid import Grid
+from pacman.core.rules import Rules
+from pacman.core.state import GameState
+from pacman.core.layout_generator import generate_layout_file
+from pacman.search.astar import AStarSearch
+from pacman.search.heuristics import Heuristics, resolve_heuristic
+
+
+EXPERIMENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYOUT_DIR = os.path.join(EXPERIMENTS_DIR, "generated")
+
+# Small layouts whose full state space can be enumerated in seconds
+LAYOUTS = {
+    "hq-9x9-f2": dict(rows=9, cols=9, seed=11, food_count=2, pie_count=0, ghost_count=1),
+    "hq-9x11-f3-loops": dict(rows=9, cols=11, seed=12, corridor_density=0.3,
+                             food_count=3, pie_count=0, ghost_count=1),
+    "hq-11x11-f3": dict(rows=11, cols=11, seed=13, food_count=3, pie_count=0, ghost_count=2),
+}
+
+# Heuristic specs under test (registry names or max() compositions)
+HEURISTIC_SPECS = [
+    "maze_distance",
+    "teleport_aware",
+    "tsp_maze",
+    "farthest_food_and_exit",
+    "bfs_distance",
+    "mst",
+    "food_to_exit",
+    "mst_exit",
+    "max(farthest_food_and_exit,mst)",
+]
+
+MAX_STATES = 500000  # Safety cap on the enumerated state space
+
+
+class StateSpace:
+    """Explicit state graph reachable from the start state, with h* for every state."""
+
+    def __init__(self, layout_file: str):
+        self.grid = Grid(layout_file)
+        self.rules = Rules(self.grid)
+        self.start = GameState.get_initial_state(self.grid)
+        self.successors: Dict[GameState, List[GameState]] = {}
+        self.cost_to_go: Dict[GameState, int] = {}
+        self._enumerate()
+        self._backward_bfs()
+
+    def is_goal(self, state: GameState) -> bool:
+        return len(state.food_left) == 0 and state.pacman.pos == self.grid.exitgate_pos
+
+    def _enumerate(self):
+        queue = deque([self.start])
+        self.successors[self.start] = []
+        while queue:
+            state = queue.popleft()
+            if self.is_goal(state):
+                continue  # A* stops at the goal
+            children = []
+            for _, child in self.rules.expand(state):
+                children.append(child)
+                if child not in self.successors:
+                    if len(self.successors) >= MAX_STATES:
+                        raise RuntimeError(f"State space larger than {MAX_STATES} states")
+                    self.successors[child] = []
+                    queue.append(child)
+            self.successors[state] = children
+
+    def _backward_bfs(self):
+        predecessors: Dict[GameState, List[GameState]] = {state: [] for state in self.successors}
+        for state, children in self.successors.items():
+            for child in children:
+                predecessors[child].append(state)
+        queue = deque()
+        for state in self.successors:
+            if self.is_goal(state):
+                self.cost_to_go[state] = 0
+                queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for parent in predecessors[state]:
+                if parent not in self.cost_to_go:
+                    self.cost_to_go[parent] = self.cost_to_go[state] + 1
+                    queue.append(parent)
+
+
+def effective_branching_factor(expansions: int, depth: int) -> Optional[float]:
+    """Solve N + 1 = 1 + b + b^2 + ... + b^d for b by bisection."""
+    if depth <= 0 or expansions <= 0:
+        return None
+    target = expansions + 1
+
+    def total(b):
+        return sum(b ** i for i in range(depth + 1))
+
+    low, high = 1.0, float(max(2, expansions))
+    for _ in range(100):
+        mid = (low + high) / 2
+        if total(mid) < target:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def evaluate_heuristic(space: StateSpace, spec: str, samples: List[GameState]) -> Dict:
+    heuristics = Heuristics(space.grid)
+    h = resolve_heuristic(spec, heuristics)
+
+    ratios, overestimates = [], []
+    inadmissible = 0
+    for state in samples:
+        h_value = h(state)
+        h_star = space.cost_to_go[state]
+        overestimates.append(h_value - h_star)
+        if h_value > h_star:
+            inadmissible += 1
+        if h_star > 0:
+            ratios.append(h_value / h_star)
+
+    edges = violations = 0
+    for state in samples:
+        h_state = h(state)
+        for child in space.successors[state]:
+            edges += 1
+            if h_state > 1 + h(child):
+                violations += 1
+
+    # Expansions of AStarSearch with this heuristic from the start state
+    search = AStarSearch(Rules(space.grid), heuristics, spec)
+    path, stats = search.search(space.start, space.is_goal, return_stats=True)
+    depth = len(path) if path is not None else 0
+
+    return {
+        "mean_ratio": sum(ratios) / len(ratios) if ratios else None,
+        "max_overestimate": max(overestimates) if overestimates else None,
+        "inadmissible_rate": inadmissible / len(samples) if samples else 0.0,
+        "consistency_violation_rate": violations / edges if edges else 0.0,
+        "expansions": stats.expansions,
+        "solution_length": depth,
+        "optimal_length": space.cost_to_go.get(space.start),
+        "ebf": effective_branching_factor(stats.expansions, depth),
+    }
+
+
+def run(samples: int = 500, seed: int = 0, layouts: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict]]:
+    results = {}
+    for name in layouts or list(LAYOUTS):
+        path = os.path.join(LAYOUT_DIR, f"{name}.txt")
+        if not os.path.exists(path):
+            spec = dict(LAYOUTS[name])
+            generate_layout_file(path, spec.pop("rows"), spec.pop("cols"), **spec)
+
+        space = StateSpace(path)
+        solvable = [state for state in space.successors if state in space.cost_to_go]
+        rng = random.Random(seed)
+        sampled = rng.sample(solvable, min(samples, len(solvable)))
+        print(f"\n{name}: {len(space.successors)} states, {len(solvable)} can reach the goal, "
+              f"h*(start) = {space.cost_to_go.get(space.start)}, {len(sampled)} sampled")
+        print(f"  {'heuristic':<32} {'h/h*':>6} {'max over':>9} {'inadm.':>7} {'incons.':>8} "
+              f"{'expanded':>9} {'len':>4} {'EBF':>6}")
+
+        results[name] = {}
+        for label in HEURISTIC_SPECS:
+            report = evaluate_heuristic(space, label, sampled)
+            results[name][label] = report
+            ratio = f"{report['mean_ratio']:.2f}" if report['mean_ratio'] is not None else "-"
+            ebf = f"{report['ebf']:.3f}" if report['ebf'] is not None else "-"
+            length = report['solution_length']
+            if report['optimal_length'] is not None and length != report['optimal_length']:
+                length = f"{length}*"  # Suboptimal solution found
+            print(f"  {label:<32} {ratio:>6} {report['max_overestimate']:>9} "
+                  f"{report['inadmissible_rate']:>6.1%} {report['consistency_violation_rate']:>8.1%} "
+                  f"{report['expansions']:>9} {length!s:>4} {ebf:>6}")
+    print("\n(* = longer than the optimal solution)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure heuristic admissibility, consistency and EBF")
+    parser.add_argument("--samples", type=int, default=500, help="Sampled states per layout")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    parser.add_argument("--layout", action="append", choices=sorted(LAYOUTS),
+                        help="Only run the given layout(s)")
+    args = parser.parse_args(argv)
+    run(args.samples, args.seed, args.layout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# experiments/regression.py
+"""
+Performance regression harness for the Pacman search engines.
+
+Runs a fixed matrix of layouts x heuristics x engines (AStarSearch eager and lazy, AStarComplete,
+MacroPlanner)
+with repeated timings, reports median / percentile times, expansions and memory,
+saves the results as versioned JSON and compares them against a checked-in baseline.
+Exits with a nonzero status when any case is slower than the baseline by more than
+the configured threshold.
+
+Usage:
+    python experiments/regression.py                      # run and compare with the baseline
+    python experiments/regression.py --update-baseline    # run and overwrite the baseline
+    python experiments/regression.py --threshold 0.5 --repeats 9 --output results.json
+
+Timings are machine dependent: regenerate the baseline (--update-baseline) on the
+machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pacman.core.grid import Grid
+from pacman.core.rules import Rules
+from pacman.core.state import GameState
+from pacman.core.layout_generator import generate_layout_file
+from pacman.search.astar import AStarSearch, LAZY_BOUNDS
+from pacman.search.astar_complete import AStarComplete
+from pacman.search.heuristics import Heuristics
+from pacman.search.macro_planner import MacroPlanner
+
+
+SCHEMA_VERSION = 1
+EXPERIMENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(EXPERIMENTS_DIR, "baselines", "baseline.json")
+LAYOUT_DIR = os.path.join(EXPERIMENTS_DIR, "generated")
+DEFAULT_THRESHOLD = 0.25  # Fail if median time grows by more than 25%
+
+# Fixed benchmark layouts: name -> layout_generator arguments (deterministic via seed)
+LAYOUTS = {
+    "gen-11x11-f3": dict(rows=11, cols=11, seed=1, food_count=3, pie_count=0, ghost_count=1),
+    "gen-11x15-f2-pie": dict(rows=11, cols=15, seed=5, food_count=2, pie_count=1, ghost_count=1),
+    "gen-21x21-f2-loops": dict(rows=21, cols=21, seed=3, corridor_density=0.3,
+                               food_count=2, pie_count=0, ghost_count=2),
+}
+HEURISTICS = ["maze_distance", "tsp_maze", "farthest_food_and_exit", "teleport_aware"]
+# AStarComplete always uses its own FarthestFoodAndExit heuristic;
+# astar_lazy defers the heuristic until a node is popped (AStarSearch lazy=True), with
+# the queue-time bound from LAZY_BOUNDS, as AutoAgent runs it;
+# macro searches food orderings (MacroPlanner), the heuristic is its top-level one
+ENGINES = {
+    "astar": HEURISTICS,
+    "astar_lazy": sorted(LAZY_BOUNDS),
+    "astar_complete": ["farthest_food_and_exit"],
+    "macro": ["mst_exit"],
+}
+
+
+def layout_path(name: str) -> str:
+    """Generate (if needed) and return the absolute path of a matrix layout."""
+    path = os.path.join(LAYOUT_DIR, f"{name}.txt")
+    if not os.path.exists(path):
+        spec = dict(LAYOUTS[name])
+        generate_layout_file(path, spec.pop("rows"), spec.pop("cols"), **spec)
+    return path
+
+
+def run_search(layout_file: str, engine: str, heuristic: str):
+    """One search on fresh Grid/Rules/Heuristics (no warm caches). Returns (path, stats)."""
+    grid = Grid(layout_file)
+    rules = Rules(grid)
+    initial_state = GameState.get_initial_state(grid)
+    if engine in ("astar", "astar_lazy"):
+        lazy = engine == "astar_lazy"
+        search = AStarSearch(rules, Heuristics(grid), heuristic, lazy=lazy,
+                             lazy_bound=LAZY_BOUNDS[heuristic] if lazy else None)
+        def goal_condition(state):
+            return len(state.food_left) == 0 and state.pacman.pos == grid.exitgate_pos
+        return search.search(initial_state, goal_condition, return_stats=True)
+    elif engine == "astar_complete":
+        return AStarComplete(grid, rules).search(initial_state, return_stats=True)
+    elif engine == "macro":
+        return MacroPlanner(grid, heuristic).search(initial_state, return_stats=True)
+    raise ValueError(f"Unknown engine: {engine}")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in [0, 100])."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    k = (len(ordered) - 1) * q / 100.0
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def run_case(layout: str, engine: str, heuristic: str, repeats: int, warmup: int) -> Dict:
+    """Time one matrix case `repeats` times (after `warmup` untimed runs)."""
+    path = layout_path(layout)
+    for _ in range(warmup):
+        run_search(path, engine, heuristic)
+
+    times = []
+    result = stats = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result, stats = run_search(path, engine, heuristic)
+        times.append(time.perf_counter() - start)
+
+    # Separate run for memory: tracemalloc slows allocation-heavy code, so it is not timed
+    tracemalloc.start()
+    run_search(path, engine, heuristic)
+    peak_traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "layout": layout,
+        "engine": engine,
+        "heuristic": heuristic,
+        "repeats": repeats,
+        "median": statistics.median(times),
+        "p10": percentile(times, 10),
+        "p90": percentile(times, 90),
+        "min": min(times),
+        "max": max(times),
+        "path_length": len(result) if result is not None else None,
+        "expansions": stats.expansions,
+        "generations": stats.generations,
+        "peak_frontier": stats.peak_frontier,
+        "peak_traced_bytes": peak_traced,
+    }
+
+
+def run_matrix(repeats: int = 5, warmup: int = 1, layouts: Optional[List[str]] = None) -> Dict:
+    """Run the full matrix and return the versioned results document."""
+    cases = {}
+    for layout in layouts or list(LAYOUTS):
+        for engine, heuristics in ENGINES.items():
+            for heuristic in heuristics:
+                case_id = f"{layout}/{engine}/{heuristic}"
+                print(f"  {case_id} ...", end=" ", flush=True)
+                cases[case_id] = run_case(layout, engine, heuristic, repeats, warmup)
+                print(f"median {cases[case_id]['median'] * 1000:.1f} ms, "
+                      f"{cases[case_id]['expansions']} expansions")
+
+    peak_rss_kb = None
+    if resource is not None:
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":  # ru_maxrss is in bytes on macOS
+            peak_rss_kb //= 1024
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss_kb": peak_rss_kb,
+        "cases": cases,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Compare results with a baseline. Prints a table and returns the list of
+    regressed case ids (median slower than baseline by more than threshold).
+    """
+    if baseline.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"Baseline schema version {baseline.get('schema_version')} "
+                         f"does not match {SCHEMA_VERSION}; regenerate it with --update-baseline")
+
+    regressions = []
+    print(f"\n{'case':<55} {'baseline':>10} {'current':>10} {'ratio':>7}  expansions")
+    for case_id, case in current["cases"].items():
+        base = baseline["cases"].get(case_id)
+        if base is None:
+            print(f"{case_id:<55} {'-':>10} {case['median'] * 1000:>8.1f}ms {'new':>7}")
+            continue
+        ratio = case["median"] / base["median"] if base["median"] > 0 else float("inf")
+        status = ""
+        if ratio > 1 + threshold:
+            regressions.append(case_id)
+            status = "  REGRESSION"
+        expansions = str(case["expansions"])
+        if case["expansions"] != base["expansions"]:
+            expansions += f" (was {base['expansions']})"
+        print(f"{case_id:<55} {base['median'] * 1000:>8.1f}ms {case['median'] * 1000:>8.1f}ms "
+              f"{ratio:>6.2f}x  {expansions}{status}")
+
+    layouts_run = {case["layout"] for case in current["cases"].values()}
+    for case_id, base in baseline["cases"].items():
+        if case_id not in current["cases"] and base["layout"] in layouts_run:
+            print(f"{case_id:<55} missing from current run")
+    return regressions
+
+
+def save_json(document: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pacman search performance regression harness")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case before timing")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--output", help="Also write the current results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative slowdown of the median time (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write the results as the new baseline instead of comparing")
+    parser.add_argument("--layout", action="append", choices=sorted(LAYOUTS),
+                        help="Only run the given layout(s)")
+    args = parser.parse_args(argv)
+
+    print(f"Running regression matrix ({args.repeats} repeats)...")
+    current = run_matrix(args.repeats, args.warmup, args.layout)
+    if args.output:
+        save_json(current, args.output)
+        print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        save_json(current, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\nNo performance regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
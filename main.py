@@ -1,10 +1,12 @@
 import os
 import sys
+import argparse
 import pygame
 
 from pacman.ui.game import GameEngine, ModeSelectionScreen
 from pacman.agents.manual_agent import ManualAgent
-from pacman.agents.auto_agent import AutoAgent
+from pacman.agents.auto_agent import AutoAgent, PLANNERS
+from pacman.core import profiler
 
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 500
@@ -21,9 +23,44 @@ def parse_args_and_get_config():
     layout_path = 'data/layout.txt' # Layout mặc định
     return layout_path, agent_class
 
+def parse_cli_args():
+    """Các tùy chọn dòng lệnh (ghi/xem replay)."""
+    parser = argparse.ArgumentParser(description="Pacman")
+    parser.add_argument('--record', metavar='PATH',
+                        help="Ghi replay của ván chơi vào file PATH")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="Xem lại file replay PATH thay vì chơi")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="Chỉ vẽ lại các ô thay đổi mỗi frame (pygame.display.update(rects))")
+    parser.add_argument('--sim-rate', type=int, metavar='N',
+                        help="Số bước mô phỏng mỗi giây (mặc định theo agent, 0 = không giới hạn)")
+    parser.add_argument('--render-rate', type=int, metavar='N',
+                        help="Số frame vẽ tối đa mỗi giây (mặc định bằng --sim-rate)")
+    parser.add_argument('--render-every', type=int, default=1, metavar='N',
+                        help="Khi --sim-rate 0: vẽ sau mỗi N bước (0 = chỉ vẽ khi kết thúc)")
+    parser.add_argument('--planner', choices=PLANNERS, default='astar',
+                        help="Planner của AutoAgent: astar (mặc định), sipp (tránh Ghost khi tìm đường) "
+                             "hoặc macro (ăn hết thức ăn rồi tới cổng ra)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Bật profiler theo pha, ghi kết quả ra PATH khi thoát "
+                             "(.json = thống kê, đuôi khác = collapsed stack cho speedscope); "
+                             f"tương đương biến môi trường {profiler.ENV_VAR}=PATH")
+    return parser.parse_args()
+
 def main():
+    args = parse_cli_args()
+    if args.profile:
+        profiler.enable(args.profile)
+    else:
+        profiler.enable_from_env()
     os.environ['SDL_VIDEO_CENTERED'] = '1'  # hiển thị screen ở giữa màn hình
     pygame.init()
+
+    if args.replay:
+        from pacman.ui.replay_viewer import ReplayViewer
+        ReplayViewer(args.replay).run()
+        pygame.quit()
+        sys.exit()
     
     game_mode = 'menu'
     
@@ -46,7 +83,13 @@ def main():
 
             game = GameEngine(
                 layout_file=layout_path, 
-                agent_class=agent_class
+                agent_class=agent_class,
+                record_path=args.record,
+                dirty_rects=args.dirty_rects,
+                sim_rate=args.sim_rate,
+                render_rate=args.render_rate,
+                render_every=args.render_every,
+                planner=args.planner
             )
             
             try:
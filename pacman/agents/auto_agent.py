@@ -1,25 +1,66 @@
 # pacman/agents/auto_agent.py
-from pacman.search.astar import AStarSearch
-from pacman.search.astar_complete import AStarComplete
+from pacman.search.astar import AStarSearch, LAZY_BOUNDS
 from pacman.search.heuristics import Heuristics
+from pacman.search.sipp import SafeIntervalPlanner
+from pacman.search.macro_planner import MacroPlanner
 from pacman.core.rules import Rules
 from pacman.core.grid import Grid
+from pacman.core.danger_map import GhostDangerMap
+from pacman.core.simulator import ROTATION_INTERVAL
+from pacman.agents.plan_cache import PlanCache
+
+PLANNERS = ('astar', 'sipp', 'macro')
 
 class AutoAgent:
     """
     Agent sử dụng thuật toán A* để tìm đường đi.
+
+    planner:
+        'astar' (mặc định) AStarSearch bỏ qua Ghost (dùng heuristic_type và PlanCache);
+                khi bước kế tiếp của plan gặp Ghost, đoạn tiếp theo được lập bằng SIPP
+        'sipp'  SafeIntervalPlanner: plan tránh Ghost ngay khi tìm đường,
+                không có va chạm cho tới lần xoay mê cung kế tiếp
+        'macro' MacroPlanner: ăn hết thức ăn rồi tới cổng ra (A* trên thứ tự các mục tiêu,
+                từng đoạn đi bằng BFS tránh Ghost); dùng 'sipp' khi không lập được plan
     """
-    def __init__(self, grid: Grid, rules: Rules, heuristic_type="farthest_food_and_exit"):
-        print("AutoAgent has ready.")
+    step_rate = 10 # Số bước mô phỏng mỗi giây mặc định trong GameEngine (để người xem theo dõi được)
+
+    def __init__(self, grid: Grid, rules: Rules, heuristic_type="farthest_food_and_exit", plan_cache=None,
+                 events=None, planner='astar'):
+        if planner not in PLANNERS:
+            raise ValueError(f"Unknown planner: {planner}")
         self.grid = grid
         self.rules = rules
-        self.heuristics = Heuristics(grid)
-        self.search = AStarSearch(rules, self.heuristics, heuristic_type)
-        # Use the complete A* implementation
-        self.complete_search = AStarComplete(grid, rules)
+        # Sự kiện (replan, plan mới...) đi chung kênh với Rules; mặc định tắt
+        self.events = events if events is not None else rules.events
+        self.events.emit('agent_ready', agent=type(self).__name__)
+        self.planner = planner
+        # Chỉ tạo bộ tìm kiếm của planner được chọn; SIPP tạo khi cần lần đầu
+        # (planner 'sipp', đoạn tránh Ghost của 'astar', dự phòng của 'macro')
+        self.heuristics = None
+        self.search = None
+        self.safe_planner = None
+        self.macro_planner = None
+        if planner == 'astar':
+            self.heuristics = Heuristics(grid)
+            # Heuristic đắt (tsp_maze): tính lười khi node được lấy ra khỏi frontier,
+            # xếp hàng bằng cận rẻ trong LAZY_BOUNDS; các heuristic khác tính ngay
+            lazy_bound = LAZY_BOUNDS.get(heuristic_type)
+            self.search = AStarSearch(rules, self.heuristics, heuristic_type,
+                                      lazy=lazy_bound is not None, lazy_bound=lazy_bound)
+        elif planner == 'macro':
+            self.macro_planner = MacroPlanner(grid)
+        self._ghost_blocked = False # Plan A* vừa đụng Ghost: đoạn kế tiếp lập bằng SIPP
         self.plan = [] # Kế hoạch (danh sách actions)
         self.planning_done = False
         self.heuristic_type = heuristic_type
+        # Cache plan bền vững: restart cùng kịch bản không cần chạy lại A*
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache.default()
+        # Bản đồ nguy hiểm tính trước từ chu kỳ của Ghost (tạo lại khi xoay/ăn tường)
+        self.danger_map = None
+        # Phiên bản layout của plan hiện tại và bước đã chờ mê cung xoay
+        self._layout_version = grid.layout_version
+        self._rotation_wait_step = None
         
         # Heuristics are now handled internally by the Heuristics class
     
@@ -35,9 +76,24 @@ class AutoAgent:
         Hàm này được gọi bởi GameEngine sau vòng lặp sự kiện.
         Nó sẽ chạy logic A* và trả về hành động.
         """
+        # 0. Mê cung vừa xoay (hoặc reset): plan cũ thuộc hệ tọa độ cũ
+        if self.grid.layout_version != self._layout_version:
+            self._layout_version = self.grid.layout_version
+            if self.plan:
+                self.events.emit('replan', reason='Maze rotated', step=game_state.step_count)
+            self.plan = []
+            self.planning_done = False
+
+        # Mê cung sẽ xoay TRƯỚC khi hành động của bước này được áp dụng:
+        # đứng yên một frame để lập plan trong hệ tọa độ mới
+        step_count = game_state.step_count
+        if step_count > 0 and step_count % ROTATION_INTERVAL == 0 and self._rotation_wait_step != step_count:
+            self._rotation_wait_step = step_count
+            return None
+
         # 1. Kiểm tra va chạm với ma trước khi lấy hành động
         if self._check_ghost_collision(game_state):
-            print("AutoAgent: Ghost collision detected! Replanning...")
+            self.events.emit('replan', reason='Ghost collision detected', step=game_state.step_count)
             self.plan = []  # Clear current plan
             self.planning_done = False
         
@@ -52,8 +108,9 @@ class AutoAgent:
             if self._is_safe_action(game_state, action):
                 return action
             else:
-                print("AutoAgent: Unsafe action detected! Replanning...")
+                self.events.emit('replan', reason='Unsafe action detected', step=game_state.step_count)
                 self.plan = []  # Clear plan and replan
+                self._ghost_blocked = True
                 return self.get_action(game_state)  # Recursive call to replan
         
         # 4. Nếu không có plan, trả về None (không di chuyển)
@@ -64,48 +121,47 @@ class AutoAgent:
         Tạo kế hoạch di chuyển sử dụng A* search.
         """
         try:
-            print("AutoAgent: Starting path planning...")
+            self.events.emit('planning', step=game_state.step_count)
             
             # Lấy các hành động an toàn
             safe_actions = self._get_safe_actions(game_state)
             
             if not safe_actions:
-                print("AutoAgent: No safe actions available! Staying put.")
+                self.events.emit('no_safe_actions', step=game_state.step_count)
                 self.plan = [(0, 0)] * 5  # Stay put
                 self.planning_done = True
                 return
             
+            if self.planner == 'sipp' or self._ghost_blocked:
+                # Plan A* bỏ qua Ghost vừa bị chặn: lập lại bằng SIPP (an toàn theo cấu trúc)
+                # thay vì chạy lại A* rồi vá từng hành động nguy hiểm
+                self._ghost_blocked = False
+                self._create_safe_plan(game_state, safe_actions)
+                return
+            if self.planner == 'macro':
+                self._create_macro_plan(game_state, safe_actions)
+                return
+
             # Use simplified goal condition to avoid infinite loops
             def simple_goal_condition(state):
                 # Just reach the exit for now (ignore food requirement)
                 return state.pacman.pos == self.grid.exitgate_pos
             
-            # Use original A* search with simple goal
-            path = self.search.search(game_state, simple_goal_condition)
+            # Use original A* search with simple goal (tra cache trước)
+            path = self._search_with_cache(game_state, simple_goal_condition)
             
             if path:
-                # Filter path to only include safe actions
-                safe_path = []
-                for action in path:
-                    if action in safe_actions:
-                        safe_path.append(action)
-                    else:
-                        # Replace unsafe action with safe alternative
-                        if safe_actions:
-                            safe_path.append(safe_actions[0])  # Use first safe action
-                        else:
-                            safe_path.append((0, 0))  # Stay put
-                
-                self.plan = safe_path
-                print(f"AutoAgent: Found safe path with {len(safe_path)} steps")
+                # Giữ nguyên plan A*; get_action kiểm tra từng bước với bản đồ nguy hiểm
+                self.plan = list(path)
+                self.events.emit('plan_found', steps=len(path))
             else:
-                print("AutoAgent: No path found - using safe random movement")
+                self.events.emit('no_path', step=game_state.step_count)
                 # Create a safe fallback plan
                 self.plan = safe_actions * 3  # Repeat safe actions
                 self.planning_done = True
                 
         except Exception as e:
-            print(f"AutoAgent planning error: {e}")
+            self.events.emit('planning_error', error=str(e), step=game_state.step_count)
             # Create a safe fallback plan
             safe_actions = self._get_safe_actions(game_state)
             if safe_actions:
@@ -114,6 +170,65 @@ class AutoAgent:
                 self.plan = [(0, 0)] * 5  # Stay put
             self.planning_done = True
     
+    def _create_safe_plan(self, game_state, safe_actions):
+        """
+        Lập plan bằng SafeIntervalPlanner: an toàn theo cấu trúc cho tới lần xoay
+        mê cung kế tiếp, nên không cần lọc/thay hành động sau khi tìm đường.
+        Cùng mục tiêu với plan A* (tới cổng ra, bỏ qua thức ăn).
+        """
+        if self.safe_planner is None:
+            self.safe_planner = SafeIntervalPlanner(self.grid)
+        path = self.safe_planner.search(game_state, collect_food=False)
+        if path:
+            self.plan = path
+            self.events.emit('plan_found', steps=len(path))
+        else:
+            self.events.emit('no_path', step=game_state.step_count)
+            self.plan = safe_actions * 3
+            self.planning_done = True
+
+    def _create_macro_plan(self, game_state, safe_actions):
+        """
+        Lập plan bằng MacroPlanner với mục tiêu đầy đủ (ăn hết thức ăn rồi tới cổng ra),
+        an toàn tới lần xoay mê cung kế tiếp. Nếu không lập được (ví dụ thức ăn nằm ở
+        góc teleport, không ăn được khi đi vào) thì dùng plan SIPP tới cổng ra.
+        """
+        path = self.macro_planner.search(game_state)
+        if path:
+            self.plan = path
+            self.events.emit('plan_found', steps=len(path))
+        else:
+            self._create_safe_plan(game_state, safe_actions)
+
+    def _search_with_cache(self, game_state, goal_condition):
+        """
+        Tra PlanCache trước khi chạy A*. Nếu chưa có, chạy A* rồi lưu kết quả.
+        A* có thể ăn tường trên grid thật (get_successor_for_astar), nên các ô
+        tường bị ăn cũng được lưu lại và áp dụng lại khi dùng plan từ cache,
+        để trạng thái game giống hệt lần chạy gốc.
+        """
+        layout_hash = self.grid.get_layout_hash()
+        cached = self.plan_cache.get(self.grid, game_state, self.heuristic_type, layout_hash)
+        if cached is not None:
+            actions, eaten_walls = cached
+            for pos in eaten_walls:
+                self.grid.eat_wall(pos)
+            self.events.emit('plan_cached', steps=len(actions))
+            return list(actions)
+
+        layout_before = [row[:] for row in self.grid.layout_list]
+        path = self.search.search(game_state, goal_condition)
+        if path is not None:
+            eaten_walls = []
+            if len(self.grid.layout_list) == len(layout_before):
+                for r, row in enumerate(layout_before):
+                    for c, cell in enumerate(row):
+                        if cell == '%' and self.grid.layout_list[r][c] != '%':
+                            eaten_walls.append((r, c))
+            self.plan_cache.put(self.grid, game_state, self.heuristic_type, path, eaten_walls, layout_hash,
+                                events=self.events)
+        return path
+
     def _check_ghost_collision(self, game_state):
         """
         Kiểm tra xem Pacman có đang va chạm với ma không.
@@ -135,18 +250,14 @@ class AutoAgent:
         dr, dc = action
         new_pacman_pos = (pacman_pos[0] + dr, pacman_pos[1] + dc)
         
-        # Kiểm tra va chạm với ma hiện tại
-        for ghost in game_state.ghosts:
-            if new_pacman_pos == ghost.pos:
-                return False
-        
-        # Kiểm tra va chạm với ma sau khi ma di chuyển
-        for ghost in game_state.ghosts:
-            new_ghost = ghost.get_updated_state(self.grid)
-            if new_pacman_pos == new_ghost.pos:
-                return False
-        
-        return True
+        # Va chạm với ma hiện tại hoặc ma sau khi di chuyển: một phép tra bản đồ nguy hiểm
+        danger_map, phase = self._get_danger_map(game_state)
+        return not danger_map.is_dangerous(new_pacman_pos, phase)
+    
+    def _get_danger_map(self, game_state):
+        """Bản đồ nguy hiểm còn hiệu lực cho game_state và pha hiện tại của các Ghost."""
+        self.danger_map = GhostDangerMap.for_state(self.grid, game_state, self.danger_map)
+        return self.danger_map, self.danger_map.phase_of(game_state.ghosts)
     
     def _get_safe_actions(self, game_state):
         """
@@ -154,6 +265,7 @@ class AutoAgent:
         """
         safe_actions = []
         pacman_pos = game_state.pacman.pos
+        danger_map, phase = self._get_danger_map(game_state)
         
         # Kiểm tra 4 hướng di chuyển
         for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
@@ -165,19 +277,8 @@ class AutoAgent:
                 
                 # Kiểm tra tường
                 if not self.grid.is_wall(new_pos) or game_state.pacman.power_steps > 0:
-                    # Kiểm tra va chạm với ma
-                    is_safe = True
-                    for ghost in game_state.ghosts:
-                        if new_pos == ghost.pos:
-                            is_safe = False
-                            break
-                        # Kiểm tra va chạm sau khi ma di chuyển
-                        new_ghost = ghost.get_updated_state(self.grid)
-                        if new_pos == new_ghost.pos:
-                            is_safe = False
-                            break
-                    
-                    if is_safe:
+                    # Kiểm tra va chạm với ma (hiện tại và sau khi di chuyển)
+                    if not danger_map.is_dangerous(new_pos, phase):
                         safe_actions.append((dr, dc))
         
         return safe_actions
\ No newline at end of file
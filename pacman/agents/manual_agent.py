@@ -7,6 +7,8 @@ class ManualAgent:
     Nó đăng ký hành động khi một phím được nhấn (trong process_event)
     và trả về hành động đó khi được GameEngine hỏi (trong get_action).
     """
+    step_rate = 60 # Số bước mô phỏng mỗi giây mặc định trong GameEngine (phản hồi phím nhanh)
+
     def __init__(self):
         print("ManualAgent has ready.")
         self.next_action = None # Sẽ lưu trữ (dr, dc)
@@ -0,0 +1,166 @@
+# pacman/agents/plan_cache.py
+"""
+Cache kế hoạch (plan) của AutoAgent, lưu bền vững xuống đĩa.
+
+Khóa của một plan: (hash layout đã biên dịch, khóa GameState, heuristic_type).
+Mỗi file cache ứng với một file layout gốc, tên file gồm tên layout, hash
+đường dẫn tuyệt đối của file layout và hash nội dung layout gốc. Khi nội dung
+file layout thay đổi thì các file cache cũ của đúng file layout đó bị xóa
+(hai layout trùng tên ở hai thư mục khác nhau không xóa cache của nhau).
+"""
+import os
+import struct
+import hashlib
+
+from pacman.core.action_codec import encode_actions, decode_actions
+
+# Thư mục gốc của repo: Grid đọc layout_file tương đối với thư mục này
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(_ROOT_DIR, ".plan_cache")
+
+_MAGIC = b'PMPC'
+_VERSION = 1
+# Header mỗi bản ghi: khóa sha1 (20 bytes), số ô tường bị ăn, độ dài plan (bytes)
+_RECORD_HEADER = struct.Struct('>20sHI')
+_CELL = struct.Struct('>HH')
+
+
+def state_key(state):
+    """
+    Khóa ổn định (không phụ thuộc PYTHONHASHSEED) cho GameState.
+    Dùng cùng các trường như GameState.__eq__ (bỏ qua step_count và màu ma).
+    """
+    pacman = state.pacman
+    ghosts = tuple((ghost.pos, ghost.direction) for ghost in state.ghosts)
+    return repr((
+        pacman.pos,
+        pacman.power_steps,
+        pacman.waiting_for_teleport,
+        ghosts,
+        tuple(sorted(state.food_left)),
+        tuple(sorted(state.pies_left)),
+    ))
+
+
+class PlanCache:
+    """
+    Cache plan theo layout. Dữ liệu được nạp lười (lazy) vào bộ nhớ
+    ở lần truy cập đầu tiên và ghi thêm (append) vào file khi có plan mới.
+    """
+    _default = None
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        # {đường dẫn file cache: {khóa: (actions, eaten_walls)}}
+        self._tables = {}
+
+    @classmethod
+    def default(cls):
+        """Instance dùng chung, để các GameEngine mới vẫn tận dụng cache trong bộ nhớ."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def get(self, grid, state, heuristic_type, layout_hash=None):
+        """
+        Tìm plan đã lưu. Trả về (actions, eaten_walls) hoặc None.
+        eaten_walls là các ô tường mà lần tìm kiếm gốc đã ăn trên grid.
+        """
+        table = self._load_table(grid)
+        return table.get(self._make_key(grid, state, heuristic_type, layout_hash))
+
+    def put(self, grid, state, heuristic_type, actions, eaten_walls=(), layout_hash=None, events=None):
+        """
+        Lưu plan vào bộ nhớ và ghi thêm vào file cache.
+        events: EventLog nhận sự kiện plan_cache_error khi không ghi được file
+        (cache dùng chung giữa các engine nên không giữ EventLog riêng).
+        """
+        actions = [tuple(action) for action in actions]
+        eaten_walls = [tuple(pos) for pos in eaten_walls]
+        key = self._make_key(grid, state, heuristic_type, layout_hash)
+        path = self._cache_path(grid)
+        self._load_table(grid)[key] = (actions, eaten_walls)
+
+        payload = encode_actions(actions)
+        record = _RECORD_HEADER.pack(key, len(eaten_walls), len(payload))
+        record += b''.join(_CELL.pack(r, c) for r, c in eaten_walls)
+        record += payload
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            is_new = not os.path.exists(path)
+            with open(path, 'ab') as f:
+                if is_new:
+                    f.write(_MAGIC + bytes((_VERSION,)))
+                f.write(record)
+        except OSError as e:
+            if events is not None:
+                events.emit('plan_cache_error', path=path, error=str(e))
+
+    def clear(self):
+        """Xóa toàn bộ cache trong bộ nhớ (file trên đĩa giữ nguyên)."""
+        self._tables.clear()
+
+    def _make_key(self, grid, state, heuristic_type, layout_hash=None):
+        if layout_hash is None:
+            layout_hash = grid.get_layout_hash()
+        raw = f"{layout_hash}|{state_key(state)}|{heuristic_type}"
+        return hashlib.sha1(raw.encode('utf-8')).digest()
+
+    def _layout_prefix(self, grid):
+        """Phần đầu tên file cache: tên layout + hash đường dẫn tuyệt đối của file layout."""
+        layout_file = os.path.abspath(os.path.join(_ROOT_DIR, grid.layout_file))
+        name = os.path.splitext(os.path.basename(layout_file))[0]
+        path_hash = hashlib.sha1(layout_file.encode('utf-8')).hexdigest()[:8]
+        return f"{name}-{path_hash}-"
+
+    def _cache_path(self, grid):
+        initial_hash = grid.get_layout_hash(initial=True)
+        return os.path.join(self.cache_dir, f"{self._layout_prefix(grid)}{initial_hash[:16]}.plans")
+
+    def _load_table(self, grid):
+        path = self._cache_path(grid)
+        table = self._tables.get(path)
+        if table is None:
+            self._invalidate_stale(grid, path)
+            table = self._read_file(path)
+            self._tables[path] = table
+        return table
+
+    def _invalidate_stale(self, grid, current_path):
+        """Xóa file cache của các phiên bản cũ của cùng file layout."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        prefix = self._layout_prefix(grid)
+        current = os.path.basename(current_path)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.plans') and name != current:
+                # Chỉ xóa nếu phần sau prefix đúng là hash nội dung (tránh xóa layout khác tên)
+                if len(name) - len(prefix) - len('.plans') == 16:
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def _read_file(self, path):
+        table = {}
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return table
+
+        if data[:len(_MAGIC)] != _MAGIC or len(data) <= len(_MAGIC) or data[len(_MAGIC)] != _VERSION:
+            return table
+
+        offset = len(_MAGIC) + 1
+        while offset + _RECORD_HEADER.size <= len(data):
+            key, wall_count, payload_len = _RECORD_HEADER.unpack_from(data, offset)
+            offset += _RECORD_HEADER.size
+            end = offset + wall_count * _CELL.size + payload_len
+            if end > len(data):
+                break  # Bản ghi bị cắt ngang (ghi dở) - bỏ qua phần còn lại
+            eaten_walls = [_CELL.unpack_from(data, offset + i * _CELL.size) for i in range(wall_count)]
+            offset += wall_count * _CELL.size
+            table[key] = (decode_actions(data[offset:end]), eaten_walls)
+            offset = end
+        return table
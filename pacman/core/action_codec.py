@@ -0,0 +1,57 @@
+# pacman/core/action_codec.py
+"""
+Mã hóa danh sách action (dr, dc) thành bytes gọn nhẹ để lưu xuống đĩa.
+
+Mỗi bước di chuyển thường (lên/xuống/trái/phải/đứng yên) chiếm 1 byte.
+Các action đặc biệt (ví dụ teleport của A* với offset lớn) được ghi bằng
+byte ESCAPE theo sau là 2 số nguyên có dấu 16-bit.
+"""
+import struct
+
+# Thứ tự cố định - KHÔNG thay đổi vì dữ liệu trên đĩa phụ thuộc vào nó
+ACTIONS = (
+    (-1, 0),  # 0: Lên
+    (1, 0),   # 1: Xuống
+    (0, -1),  # 2: Trái
+    (0, 1),   # 3: Phải
+    (0, 0),   # 4: Đứng yên
+)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+ESCAPE = 0xFF
+_RAW_ACTION = struct.Struct('>hh')
+
+
+def encode_action(action):
+    """Mã hóa một action (dr, dc) thành bytes."""
+    code = ACTION_CODES.get(tuple(action))
+    if code is not None:
+        return bytes((code,))
+    return bytes((ESCAPE,)) + _RAW_ACTION.pack(*action)
+
+
+def encode_actions(actions):
+    """Mã hóa danh sách action thành bytes."""
+    return b''.join(encode_action(action) for action in actions)
+
+
+def decode_action(data, offset):
+    """
+    Giải mã một action bắt đầu tại offset.
+    Trả về (action, offset_mới).
+    """
+    code = data[offset]
+    if code == ESCAPE:
+        action = _RAW_ACTION.unpack_from(data, offset + 1)
+        return action, offset + 1 + _RAW_ACTION.size
+    return ACTIONS[code], offset + 1
+
+
+def decode_actions(data):
+    """Giải mã bytes thành danh sách action (dr, dc)."""
+    actions = []
+    offset = 0
+    while offset < len(data):
+        action, offset = decode_action(data, offset)
+        actions.append(action)
+    return actions
@@ -0,0 +1,314 @@
+# pacman/core/batch_simulator.py
+"""
+Bộ mô phỏng theo lô (batch): chạy N ván chơi độc lập cùng lúc bằng mảng NumPy.
+Ngữ nghĩa mỗi bước giống hệt Simulator.step() (Rules.get_successor, va chạm,
+xoay mê cung mỗi 30 bước, teleport, thắng/thua), nhưng được vector hóa cho cả lô.
+
+Mọi vị trí được lưu trong hệ tọa độ GỐC của layout (chưa xoay). Mỗi ván có một
+chỉ số xoay riêng (0-3); action của agent (theo hệ tọa độ đang hiển thị) được
+đổi sang hệ gốc bằng bảng tra, nên không cần xoay mảng tường khi mê cung xoay.
+"""
+import numpy as np
+
+from pacman.core.action_codec import ACTIONS
+from pacman.core.entities import Pacman, Ghost
+from pacman.core.state import GameState
+from pacman.core.simulator import ROTATION_INTERVAL
+
+# Mã trạng thái game
+RUNNING = 0
+WIN = 1
+LOSE = 2
+STATUS_NAMES = ('running', 'win', 'lose')
+
+# Mã action: 0-3 di chuyển (giống action_codec.ACTIONS),
+# 4 không làm gì (giống action None của Simulator: frame không trôi),
+# 5-8 chọn đích teleport 1-4 (khi Pacman đang chờ ở góc teleport),
+# 9 đứng yên tại chỗ (giống action (0, 0) của Simulator: qua Rules.get_successor,
+# nên vẫn tăng step_count, ma di chuyển và power giảm như một bước đi thường)
+NOOP = 4
+TELEPORT_BASE = 5
+STAY = 9
+
+# Hướng xoay của Pacman (độ) ứng với mã action di chuyển 0-3
+_ACTION_DIRECTIONS = np.array([90, 270, 180, 0], dtype=np.int16)
+
+
+def _to_canonical_vector(vector, rotation):
+    """Đổi vector (dr, dc) ở hệ đã xoay `rotation` lần về hệ gốc."""
+    dr, dc = vector
+    for _ in range(rotation):
+        dr, dc = -dc, dr
+    return dr, dc
+
+
+def _to_display_pos(pos, rotation, rows, cols):
+    """Đổi vị trí ở hệ gốc (rows x cols) sang hệ đã xoay `rotation` lần."""
+    r, c = pos
+    for _ in range(rotation):
+        r, c = c, rows - 1 - r
+        rows, cols = cols, rows
+    return (r, c)
+
+
+class BatchSimulator:
+    """
+    N ván chơi trên cùng một layout, lưu dưới dạng mảng:
+    vị trí Pacman, bitmask thức ăn/bánh, power steps, step count, tường (mỗi ván
+    ăn tường riêng), vị trí/hướng ma, chỉ số xoay và trạng thái thắng/thua.
+    """
+    def __init__(self, grid, num_envs):
+        self.grid = grid
+        self.num_envs = num_envs
+        layout = grid.initial_layout
+        self.rows = grid.initial_rows
+        self.cols = grid.initial_cols
+
+        # --- Bảng tĩnh (dùng chung cho cả lô) ---
+        self._initial_walls = np.array([[cell == '%' for cell in row] for row in layout], dtype=bool)
+        self._initial_pacman = (0, 0)
+        food, pies, ghosts = [], [], []
+        self.exit_pos = None
+        for r in range(self.rows):
+            for c in range(self.cols):
+                char = layout[r][c]
+                if char == 'P':
+                    self._initial_pacman = (r, c)
+                elif char == '.':
+                    food.append((r, c))
+                elif char == '0':
+                    pies.append((r, c))
+                elif char == 'E':
+                    self.exit_pos = (r, c)
+        self.food_positions = np.array(food, dtype=np.int32).reshape(-1, 2)
+        self.pie_positions = np.array(pies, dtype=np.int32).reshape(-1, 2)
+        self._food_index = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        self._food_index[self.food_positions[:, 0], self.food_positions[:, 1]] = np.arange(len(food))
+        self._pie_index = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        self._pie_index[self.pie_positions[:, 0], self.pie_positions[:, 1]] = np.arange(len(pies))
+
+        self.ghost_colors = [color for _, color, _ in grid.initial_ghosts_info]
+        self._initial_ghost_pos = np.array([pos for pos, _, _ in grid.initial_ghosts_info], dtype=np.int32).reshape(-1, 2)
+        self._initial_ghost_dir = np.array([d for _, _, d in grid.initial_ghosts_info], dtype=np.int32).reshape(-1, 2)
+
+        # Bảng đổi action (theo hệ hiển thị) sang vector ở hệ gốc: [rotation, action]
+        self._action_vectors = np.array(
+            [[_to_canonical_vector(action, k) for action in ACTIONS] for k in range(4)], dtype=np.int32
+        )
+
+        # Góc teleport: thứ tự lựa chọn 1-4 phụ thuộc vào hệ đang hiển thị
+        corner_order = []
+        for k in range(4):
+            rows, cols = (self.rows, self.cols) if k % 2 == 0 else (self.cols, self.rows)
+            display_corners = [(1, 1), (1, cols - 2), (rows - 2, 1), (rows - 2, cols - 2)]
+            corner_order.append([self._to_canonical_pos(pos, k) for pos in display_corners])
+        self._corner_order = np.array(corner_order, dtype=np.int32)  # (4, 4, 2)
+        self._is_corner = np.zeros((self.rows, self.cols), dtype=bool)
+        for r, c in corner_order[0]:
+            if 0 <= r < self.rows and 0 <= c < self.cols:
+                self._is_corner[r, c] = True
+
+        self.reset()
+
+    def _to_canonical_pos(self, pos, rotation):
+        """Đổi vị trí ở hệ đã xoay `rotation` lần về hệ gốc."""
+        r, c = pos
+        rows, cols = (self.rows, self.cols) if rotation % 2 == 0 else (self.cols, self.rows)
+        for _ in range(rotation):
+            # Nghịch đảo của (r, c) -> (c, rows_trước - 1 - r)
+            rows, cols = cols, rows
+            r, c = rows - 1 - c, r
+        return (r, c)
+
+    def reset(self, mask=None):
+        """Reset các ván được chọn (mặc định: tất cả) về trạng thái ban đầu."""
+        n = self.num_envs
+        if mask is None:
+            g = len(self._initial_ghost_pos)
+            self.walls = np.broadcast_to(self._initial_walls, (n, self.rows, self.cols)).copy()
+            self.pacman_pos = np.tile(np.array(self._initial_pacman, dtype=np.int32), (n, 1))
+            self.pacman_direction = np.zeros(n, dtype=np.int16)
+            self.waiting_for_teleport = np.zeros(n, dtype=bool)
+            self.power_steps = np.zeros(n, dtype=np.int8)
+            self.step_count = np.zeros(n, dtype=np.int32)
+            self.rotation = np.zeros(n, dtype=np.int8)
+            self.last_rotation_step = np.full(n, -1, dtype=np.int32)
+            self.status = np.full(n, RUNNING, dtype=np.int8)
+            self.food = np.ones((n, len(self.food_positions)), dtype=bool)
+            self.pies = np.ones((n, len(self.pie_positions)), dtype=bool)
+            self.ghost_pos = np.broadcast_to(self._initial_ghost_pos, (n, g, 2)).copy()
+            self.ghost_dir = np.broadcast_to(self._initial_ghost_dir, (n, g, 2)).copy()
+            return
+
+        mask = np.asarray(mask, dtype=bool)
+        self.walls[mask] = self._initial_walls
+        self.pacman_pos[mask] = self._initial_pacman
+        self.pacman_direction[mask] = 0
+        self.waiting_for_teleport[mask] = False
+        self.power_steps[mask] = 0
+        self.step_count[mask] = 0
+        self.rotation[mask] = 0
+        self.last_rotation_step[mask] = -1
+        self.status[mask] = RUNNING
+        self.food[mask] = True
+        self.pies[mask] = True
+        self.ghost_pos[mask] = self._initial_ghost_pos
+        self.ghost_dir[mask] = self._initial_ghost_dir
+
+    def _in_bounds(self, pos):
+        return (pos[..., 0] >= 0) & (pos[..., 0] < self.rows) & (pos[..., 1] >= 0) & (pos[..., 1] < self.cols)
+
+    def _wall_at(self, env_idx, pos):
+        """Tường tại pos (theo từng ván); ngoài biên coi như tường."""
+        inside = self._in_bounds(pos)
+        r = np.clip(pos[..., 0], 0, self.rows - 1)
+        c = np.clip(pos[..., 1], 0, self.cols - 1)
+        return ~inside | self.walls[env_idx, r, c]
+
+    def _next_ghosts(self):
+        """Vị trí/hướng ma ở bước kế tiếp (Ghost.get_updated_state cho cả lô)."""
+        env_idx = np.arange(self.num_envs)[:, None]
+        new_pos = self.ghost_pos + self.ghost_dir
+        blocked = self._wall_at(env_idx, new_pos)[..., None]
+        return np.where(blocked, self.ghost_pos, new_pos), np.where(blocked, -self.ghost_dir, self.ghost_dir)
+
+    def _eat_items(self, env_mask, pos):
+        """Ăn thức ăn/bánh ma thuật tại pos cho các ván trong env_mask."""
+        envs = np.nonzero(env_mask)[0]
+        if len(envs) == 0:
+            return
+        r, c = pos[envs, 0], pos[envs, 1]
+        food_idx = self._food_index[r, c]
+        has_food = food_idx >= 0
+        self.food[envs[has_food], food_idx[has_food]] = False
+        pie_idx = self._pie_index[r, c]
+        has_pie = pie_idx >= 0
+        pie_envs = envs[has_pie]
+        pie_alive = self.pies[pie_envs, pie_idx[has_pie]]
+        self.pies[pie_envs, pie_idx[has_pie]] = False
+        self.power_steps[pie_envs[pie_alive]] = 5 # Kích hoạt Power Mode
+
+    def step(self, actions):
+        """
+        Thực hiện một frame logic cho cả lô.
+        actions: mảng N mã action (xem NOOP, TELEPORT_BASE, STAY).
+        Trả về mảng trạng thái (RUNNING, WIN, LOSE).
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        env_idx = np.arange(self.num_envs)
+        running = self.status == RUNNING
+        is_stay = running & (actions == STAY)
+        is_move = (running & (actions >= 0) & (actions < NOOP)) | is_stay
+        # STAY dùng vector (0, 0) của mã NOOP trong bảng hướng đi
+        move_codes = np.where(is_move & ~is_stay, actions, NOOP)
+
+        # --- 1. Va chạm trước khi di chuyển (theo hệ chưa xoay) ---
+        target = self.pacman_pos + self._action_vectors[self.rotation, move_codes]
+        next_ghost_pos, _ = self._next_ghosts()
+        hit = ((target[:, None, :] == self.ghost_pos).all(-1) |
+               (target[:, None, :] == next_ghost_pos).all(-1)).any(-1)
+        self.status[is_move & hit] = LOSE
+        alive = running & (self.status != LOSE)
+
+        # --- 2. Xoay mê cung (sau mỗi 30 bước) ---
+        rotate = (alive & (self.step_count > 0) & (self.step_count % ROTATION_INTERVAL == 0) &
+                  (self.last_rotation_step != self.step_count))
+        if rotate.any():
+            self.rotation[rotate] = (self.rotation[rotate] + 1) % 4
+            self.last_rotation_step[rotate] = self.step_count[rotate]
+            self.waiting_for_teleport[rotate] = False
+            # Hướng ma giữ nguyên trên màn hình => trong hệ gốc hướng bị xoay ngược 90 độ
+            dir_r = self.ghost_dir[rotate, :, 0].copy()
+            self.ghost_dir[rotate, :, 0] = -self.ghost_dir[rotate, :, 1]
+            self.ghost_dir[rotate, :, 1] = dir_r
+
+        # --- 3. Chọn đích teleport ---
+        teleport = running & self.waiting_for_teleport & (actions >= TELEPORT_BASE) & (actions < TELEPORT_BASE + 4)
+        if teleport.any():
+            self._apply_teleport(teleport, actions - TELEPORT_BASE + 1)
+
+        # --- 4. Di chuyển (Rules.get_successor) theo hệ sau khi xoay ---
+        acting = is_move & alive
+        new_pos = self.pacman_pos + self._action_vectors[self.rotation, move_codes]
+        inside = self._in_bounds(new_pos)
+        r = np.clip(new_pos[:, 0], 0, self.rows - 1)
+        c = np.clip(new_pos[:, 1], 0, self.cols - 1)
+
+        # Đến góc teleport lần đầu: chờ chọn đích, ma không di chuyển
+        at_corner = acting & inside & self._is_corner[r, c]
+        reach_corner = at_corner & ~self.waiting_for_teleport
+        self.pacman_pos[reach_corner] = new_pos[reach_corner]
+        self.waiting_for_teleport[reach_corner] = True
+        self.step_count[reach_corner] += 1
+
+        # Di chuyển thường / ăn tường khi có power
+        is_wall = self.walls[env_idx, r, c]
+        moved = acting & inside & ~at_corner & (~is_wall | (self.power_steps > 0))
+        eat_wall = moved & is_wall
+        self.walls[env_idx[eat_wall], r[eat_wall], c[eat_wall]] = False
+        self.power_steps[moved & (self.power_steps > 0)] -= 1
+        self.pacman_pos[moved] = new_pos[moved]
+        turned = moved & ~is_stay  # Đứng yên giữ nguyên hướng Pacman
+        self.pacman_direction[turned] = _ACTION_DIRECTIONS[move_codes[turned]]
+        self.waiting_for_teleport[moved] = False
+        self.step_count[moved] += 1
+        self._eat_items(moved, self.pacman_pos)
+
+        # Ma di chuyển (sau khi tường đã bị ăn)
+        if moved.any():
+            next_ghost_pos, next_ghost_dir = self._next_ghosts()
+            self.ghost_pos[moved] = next_ghost_pos[moved]
+            self.ghost_dir[moved] = next_ghost_dir[moved]
+
+        # --- 5. Va chạm sau khi di chuyển và kiểm tra thắng ---
+        on_ghost = (self.pacman_pos[:, None, :] == self.ghost_pos).all(-1).any(-1)
+        self.status[acting & on_ghost] = LOSE
+        if self.exit_pos is not None:
+            at_exit = (self.pacman_pos == np.array(self.exit_pos, dtype=np.int32)).all(-1)
+            won = acting & ~on_ghost & at_exit & ~self.food.any(-1)
+            self.status[won] = WIN
+
+        return self.status
+
+    def _apply_teleport(self, env_mask, choices):
+        """Rules.handle_teleport_selection cho các ván trong env_mask."""
+        envs = np.nonzero(env_mask)[0]
+        corners = self._corner_order[self.rotation[envs]]                # (k, 4, 2)
+        options = ~(corners == self.pacman_pos[envs, None, :]).all(-1)   # bỏ góc hiện tại
+        rank = np.cumsum(options, axis=1)
+        pick = options & (rank == choices[envs, None])
+        valid = pick.any(-1)
+        envs = envs[valid]
+        if len(envs) == 0:
+            return
+        dest = corners[valid][pick[valid]]
+        self.pacman_pos[envs] = dest
+        self.waiting_for_teleport[envs] = False
+        self.step_count[envs] += 1
+        mask = np.zeros(self.num_envs, dtype=bool)
+        mask[envs] = True
+        self._eat_items(mask, self.pacman_pos)
+
+    def get_state(self, i):
+        """Tạo GameState (theo hệ đang hiển thị) của ván thứ i, để debug/vẽ."""
+        k = int(self.rotation[i])
+        to_display = lambda pos: _to_display_pos((int(pos[0]), int(pos[1])), k, self.rows, self.cols)
+        pacman = Pacman(to_display(self.pacman_pos[i]), int(self.pacman_direction[i]),
+                        int(self.power_steps[i]), bool(self.waiting_for_teleport[i]))
+        ghosts = []
+        for g, color in enumerate(self.ghost_colors):
+            direction = (int(self.ghost_dir[i, g, 0]), int(self.ghost_dir[i, g, 1]))
+            for _ in range(k):
+                direction = (direction[1], -direction[0])
+            ghosts.append(Ghost(to_display(self.ghost_pos[i, g]), color, direction))
+        return GameState(
+            pacman=pacman,
+            ghosts=tuple(ghosts),
+            food_left=frozenset(to_display(pos) for pos in self.food_positions[self.food[i]]),
+            pies_left=frozenset(to_display(pos) for pos in self.pie_positions[self.pies[i]]),
+            step_count=int(self.step_count[i])
+        )
+
+    def get_status(self, i):
+        """Trạng thái ván thứ i dưới dạng chuỗi ('running', 'win', 'lose')."""
+        return STATUS_NAMES[self.status[i]]
@@ -0,0 +1,179 @@
+# pacman/core/danger_map.py
+"""
+Bản đồ nguy hiểm (danger map) tính trước từ quỹ đạo tuần hoàn của các Ghost.
+
+Ghost chỉ đi ngang và quay đầu khi gặp tường, nên trên một layout cố định (chưa xoay,
+chưa bị ăn tường) trạng thái chung của mọi Ghost lặp lại theo chu kỳ P. GhostDangerMap
+mô phỏng chu kỳ đó MỘT lần và lưu cho mỗi pha t một bytearray theo ô: ô đó có nguy
+hiểm không, tức là có Ghost ở pha t HOẶC pha t+1 (đúng luật va chạm của
+Simulator._will_collide: Pacman đi vào ô Ghost đang đứng hoặc ô Ghost sắp tới).
+Truy vấn an toàn trở thành một phép tra mảng theo (pha, ô), và kiểm tra trước nhiều
+bước chỉ là cộng thêm vào pha (quay vòng theo chu kỳ).
+
+Các pha được mô phỏng và các hàng bytearray được lập dần khi có truy vấn cần tới
+(chu kỳ có thể dài hàng trăm pha, trong khi mê cung xoay sau mỗi 30 bước làm bản đồ
+hết hiệu lực), nên chi phí chỉ tỉ lệ với số pha thực sự dùng.
+
+Pha được xác định từ trạng thái Ghost (vị trí + hướng), không phải step_count, vì
+Ghost không di chuyển ở mọi bước (ví dụ khi Pacman dừng ở góc teleport).
+Bản đồ hết hiệu lực khi layout bị thay thế (xoay, reset) hoặc có tường bị ăn:
+dùng GhostDangerMap.for_state() để lấy lại bản đồ còn hiệu lực.
+
+Các planner theo lịch Ghost (SafeIntervalPlanner, MacroPlanner) dùng chung một
+SafetyWindow (GhostDangerMap.safety_window): các hàng nguy hiểm từ trạng thái bắt
+đầu tới lần xoay mê cung kế tiếp. Sau lần xoay đó lịch Ghost không còn đúng, nên
+mọi pha từ horizon trở đi coi là an toàn và planner phải lập lại plan.
+Lưu ý chung cho các planner đó: Pacman đi vào góc teleport tốn một bước nhưng Ghost
+không di chuyển (Pacman dừng chờ chọn đích), nên pha không tăng ở ô góc.
+"""
+
+MAX_PERIOD = 4096 # Số pha tối đa được mô phỏng; chu kỳ dài hơn thì chỉ biết MAX_PERIOD pha đầu
+
+
+def _ghost_key(ghosts):
+    """Khóa trạng thái chung của các Ghost (bỏ qua màu)."""
+    return tuple((ghost.pos, ghost.direction) for ghost in ghosts)
+
+
+class GhostDangerMap:
+    """
+    Bảng nguy hiểm theo (pha, ô) cho các Ghost của một trạng thái trên một grid.
+    Pha 0 là các Ghost truyền vào; pha t là sau t lần Ghost di chuyển.
+
+    period:       độ dài chu kỳ (None khi chưa mô phỏng hết chu kỳ hoặc chu kỳ dài hơn MAX_PERIOD)
+    cycle_start:  pha đầu tiên của chu kỳ (0 với quỹ đạo tuần hoàn thuần túy)
+
+    Bản đồ giữ tham chiếu tới grid để mô phỏng thêm pha; chỉ dùng khi is_valid(grid).
+    """
+    def __init__(self, grid, ghosts, max_period=MAX_PERIOD):
+        self.grid = grid
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self.layout_key = (grid.layout_version, len(grid.wall_edits))
+        self.max_period = max_period
+        self.cycle_start = None
+        self.period = None
+
+        initial = tuple(ghosts)
+        self._states = [initial] # trạng thái Ghost theo pha
+        self._phases = {_ghost_key(initial): 0} # khóa Ghost -> pha
+        self._danger = [None] # bytearray theo ô cho mỗi pha (lập khi cần)
+
+    @classmethod
+    def for_state(cls, grid, state, previous=None):
+        """Trả về previous nếu vẫn còn hiệu lực cho (grid, state), ngược lại tạo bản đồ mới."""
+        if previous is not None and previous.is_valid(grid) and previous.phase_of(state.ghosts) is not None:
+            return previous
+        return cls(grid, state.ghosts)
+
+    def is_valid(self, grid):
+        """Bản đồ còn đúng với grid hiện tại (chưa xoay/reset, chưa ăn thêm tường)."""
+        return grid is self.grid and self.layout_key == (grid.layout_version, len(grid.wall_edits))
+
+    def phase_of(self, ghosts):
+        """Pha tương ứng với các Ghost hiện tại, hoặc None nếu không nằm trên quỹ đạo."""
+        key = _ghost_key(ghosts)
+        phase = self._phases.get(key)
+        while phase is None and self._extend():
+            phase = self._phases.get(key)
+        return phase
+
+    def advance(self, phase, steps=1):
+        """
+        Pha sau `steps` lần Ghost di chuyển, hoặc None nếu vượt quá MAX_PERIOD pha
+        mà chưa tìm thấy chu kỳ.
+        """
+        t = phase + steps
+        while t >= len(self._states) and self._extend():
+            pass
+        if t < len(self._states):
+            return t
+        if self.period is None:
+            return None
+        return self.cycle_start + (t - self.cycle_start) % self.period
+
+    def is_dangerous(self, pos, phase, ahead=0):
+        """
+        Pacman đi vào ô pos ở pha (phase + ahead) có va chạm Ghost không.
+        Ô ngoài mê cung không bao giờ có Ghost; pha vượt quá MAX_PERIOD coi là an toàn.
+        """
+        r, c = pos
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            return False
+        danger = self.danger_row(phase, ahead)
+        return danger is not None and danger[r * self.cols + c] == 1
+
+    def danger_row(self, phase, ahead=0):
+        """
+        Hàng nguy hiểm (bytearray rows*cols, chỉ số r*cols+c) ở pha (phase + ahead),
+        hoặc None nếu pha vượt quá MAX_PERIOD. Không được sửa hàng trả về.
+        """
+        t = self.advance(phase, ahead) if ahead else phase
+        if t is None:
+            return None
+        danger = self._danger[t]
+        if danger is None:
+            danger = self._build_row(t)
+        return danger
+
+    def safety_window(self, state, interval):
+        """
+        SafetyWindow của state: từ pha của các Ghost trong state tới lần xoay mê cung
+        kế tiếp (mê cung xoay sau mỗi `interval` bước).
+        """
+        horizon = interval - state.step_count % interval
+        return SafetyWindow(self, self.phase_of(state.ghosts), horizon)
+
+    def ghost_positions(self, phase):
+        """Vị trí các Ghost ở một pha."""
+        return tuple(ghost.pos for ghost in self._states[phase])
+
+    def _extend(self):
+        """Mô phỏng thêm một pha. Trả về False nếu chu kỳ đã khép lại hoặc đã chạm giới hạn."""
+        if self.period is not None or len(self._states) >= self.max_period:
+            return False
+        following = tuple(ghost.get_updated_state(self.grid) for ghost in self._states[-1])
+        key = _ghost_key(following)
+        start = self._phases.get(key)
+        if start is not None:
+            self.cycle_start = start
+            self.period = len(self._states) - start
+            return False
+        self._phases[key] = len(self._states)
+        self._states.append(following)
+        self._danger.append(None)
+        return True
+
+    def _build_row(self, t):
+        """Lập hàng nguy hiểm của pha t: các ô có Ghost ở pha t hoặc pha kế tiếp."""
+        following_phase = self.advance(t)
+        if following_phase is not None:
+            following = self._states[following_phase]
+        else:
+            following = tuple(ghost.get_updated_state(self.grid) for ghost in self._states[t])
+        danger = bytearray(self.rows * self.cols)
+        for ghost in self._states[t] + following:
+            r, c = ghost.pos
+            if 0 <= r < self.rows and 0 <= c < self.cols:
+                danger[r * self.cols + c] = 1
+        self._danger[t] = danger
+        return danger
+
+
+class SafetyWindow:
+    """
+    Các hàng nguy hiểm của `horizon` pha liên tiếp, đánh số tương đối 0, 1, ...
+    kể từ pha gốc. Lập sẵn một lần cho mỗi lần tìm kiếm, nên is_safe() chỉ là
+    một phép tra mảng.
+    """
+    def __init__(self, danger_map, phase, horizon):
+        self.horizon = horizon
+        self.cols = danger_map.cols
+        self._rows = [danger_map.danger_row(phase, ahead) for ahead in range(horizon)]
+
+    def is_safe(self, pos, t):
+        """Pacman được đi vào pos ở pha tương đối t (luôn đúng khi t >= horizon)."""
+        if t >= self.horizon:
+            return True
+        row = self._rows[t]
+        return row is None or row[pos[0] * self.cols + pos[1]] == 0
@@ -0,0 +1,95 @@
+# pacman/core/events.py
+"""
+Kênh sự kiện có cấu trúc cho Rules và các agent, thay cho print().
+
+Mặc định EventLog TẮT: emit() chỉ kiểm tra hai cờ rồi trả về, nên chạy headless,
+benchmark hay mô phỏng theo lô không tốn chi phí in ra terminal.
+    enabled=True : lưu sự kiện vào ring buffer (deque có maxlen) để xem lại sau
+    echo=True    : in thông điệp tương ứng ra stdout (GameEngine bật khi chơi tương tác)
+
+Các loại sự kiện (kind) và dữ liệu đi kèm:
+    teleport_reached  pos, options           Pacman tới góc teleport, chờ chọn đích
+    teleported        source, destination    Pacman đã teleport (chọn thủ công)
+    collision         pos, step              Pacman chạm Ghost (thua)
+    rotation_error    error, step            Lỗi khi xoay mê cung, bỏ qua lần xoay này
+    replan            reason, step           AutoAgent hủy plan và lập lại
+    planning          step                   AutoAgent bắt đầu lập plan (A*, SIPP hoặc macro)
+    plan_cached       steps                  AutoAgent lấy plan từ PlanCache thay vì chạy A*
+    plan_found        steps                  AutoAgent có plan mới (SIPP/macro: an toàn với Ghost)
+    no_path           step                   A* không tìm được đường
+    planning_error    error, step            Lỗi khi lập plan, dùng plan dự phòng an toàn
+    plan_cache_error  path, error            PlanCache không ghi được file cache
+    no_safe_actions   step                   Không có hành động an toàn, đứng yên
+    agent_ready       agent                  Agent đã khởi tạo
+"""
+from collections import deque, namedtuple
+
+DEFAULT_CAPACITY = 1024
+
+Event = namedtuple('Event', ['kind', 'data'])
+
+# Thông điệp khi echo ra stdout
+MESSAGES = {
+    'teleport_reached': "Pacman reached teleport corner {pos}. Press 1-4 to select destination:",
+    'teleported': "Pacman teleported from {source} to {destination}",
+    'collision': "Pacman collided with a ghost at {pos} (step {step})",
+    'rotation_error': "Error rotating maze at step {step}: {error}",
+    'replan': "AutoAgent: {reason}! Replanning...",
+    'planning': "AutoAgent: Starting path planning (step {step})...",
+    'plan_cached': "AutoAgent: Loaded plan from cache ({steps} steps)",
+    'plan_found': "AutoAgent: Found safe path with {steps} steps",
+    'no_path': "AutoAgent: No path found - using safe random movement",
+    'planning_error': "AutoAgent planning error: {error}",
+    'plan_cache_error': "PlanCache: không thể ghi cache {path}: {error}",
+    'no_safe_actions': "AutoAgent: No safe actions available! Staying put.",
+    'agent_ready': "{agent} has ready.",
+}
+
+
+def format_event(event):
+    """Chuyển một Event thành thông điệp dễ đọc (dùng khi echo)."""
+    template = MESSAGES.get(event.kind)
+    if template is None:
+        return f"{event.kind}: {event.data}"
+    text = template.format(**event.data)
+    if event.kind == 'teleport_reached':
+        text += ''.join(f"\n  {i}: {option}" for i, option in enumerate(event.data['options'], 1))
+    return text
+
+
+class EventLog:
+    """Ring buffer các Event gần nhất, kèm tùy chọn in ra stdout. Mặc định tắt."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False, echo=False):
+        self.events = deque(maxlen=capacity)
+        self.enabled = enabled
+        self.echo = echo
+
+    @property
+    def active(self):
+        """True nếu emit() có làm gì đó (lưu hoặc in)."""
+        return self.enabled or self.echo
+
+    def emit(self, kind, **data):
+        """Ghi một sự kiện; không làm gì khi log đang tắt."""
+        if not (self.enabled or self.echo):
+            return
+        event = Event(kind, data)
+        if self.enabled:
+            self.events.append(event)
+        if self.echo:
+            print(format_event(event))
+
+    def recent(self, kind=None, limit=None):
+        """Các sự kiện đã lưu (cũ -> mới), lọc theo kind nếu có."""
+        events = [event for event in self.events if kind is None or event.kind == kind]
+        return events[-limit:] if limit else events
+
+    def clear(self):
+        self.events.clear()
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
@@ -1,6 +1,7 @@
 # pacman/core/grid.py
 import os
 import sys
+import hashlib
 
 class Grid:
     """
@@ -22,6 +23,12 @@ class Grid:
         self.teleport_corners = []
         self.initial_ghosts_info = []
 
+        # Theo dõi thay đổi của layout:
+        # - layout_version tăng khi cả layout bị thay thế (xoay, reset, nạp snapshot)
+        # - wall_edits: các ô tường bị ăn kể từ lần thay đổi layout_version gần nhất
+        self.layout_version = 0
+        self.wall_edits = []
+
         self._find_initial_objects()
         
         # Lưu trạng thái ban đầu để có thể reset
@@ -106,6 +113,7 @@ class Grid:
             self.layout_list = new_layout
             self.rows = new_rows
             self.cols = new_cols
+            self._mark_layout_replaced()
             
             # Cập nhật lại vị trí các đối tượng sau khi xoay
             self._update_positions_after_rotation(old_rows)
@@ -141,6 +149,15 @@ class Grid:
             (self.rows - 2, self.cols - 2)  # Bottom-Right (vào trong 1 ô)
         ]
     
+    def get_layout_hash(self, initial=False):
+        """
+        Tính mã băm (sha1) của layout đã biên dịch (sau khi ăn tường, xoay).
+        initial=True: băm layout gốc đọc từ file (dùng để phát hiện file thay đổi).
+        """
+        layout = self.initial_layout if initial else self.layout_list
+        data = '\n'.join(''.join(row) for row in layout)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
     def is_teleport_corner(self, pos):
         """
         Kiểm tra xem vị trí có phải là góc teleport không.
@@ -165,6 +182,7 @@ class Grid:
             if 0 <= r < self.rows and 0 <= c < self.cols:
                 if self.layout_list[r][c] == '%':
                     self.layout_list[r][c] = ' '
+                    self.wall_edits.append((r, c))
 
 # Cập nhật lại vị trí các đối tượng tĩnh như cổng thoát (nếu cần thiết)
 # (Đây là phần phức tạp, có thể để lại sau)
@@ -189,4 +207,10 @@ class Grid:
         self.rows = self.initial_rows
         self.cols = self.initial_cols
         self.exitgate_pos = self.initial_exitgate_pos
-        self.teleport_corners = self.initial_teleport_corners[:]  # Copy list
\ No newline at end of file
+        self.teleport_corners = self.initial_teleport_corners[:]  # Copy list
+        self._mark_layout_replaced()
+
+    def _mark_layout_replaced(self):
+        """Đánh dấu toàn bộ layout đã thay đổi (để các cache phụ thuộc layout tự làm mới)."""
+        self.layout_version += 1
+        self.wall_edits = []
\ No newline at end of file
@@ -0,0 +1,203 @@
+# pacman/core/layout_generator.py
+"""
+Sinh mê cung (layout) ngẫu nhiên, xác định theo seed, dùng cho benchmark khả năng mở rộng.
+
+Mê cung được khoét bằng DFS lặp (không đệ quy, chạy được với 500x500) trên lưới ô lẻ,
+sau đó đục thêm một phần tường nội bộ để tạo vòng lặp (corridor_density).
+Layout sinh ra dùng cùng ký tự với file layout: '%' tường, ' ' trống, '.' thức ăn,
+'0' bánh ma thuật, 'P' Pacman, 'G' Ghost, 'E' cổng thoát.
+"""
+import os
+import random
+from collections import deque
+
+MIN_SIZE = 5
+MAX_SIZE = 500
+EXIT_PLACEMENTS = ('far', 'random', 'corner')
+
+
+def generate_layout(rows, cols, seed=0, corridor_density=0.1, food_count=10, pie_count=2,
+                    ghost_count=2, exit_placement='far'):
+    """
+    Sinh một layout hợp lệ.
+
+    rows, cols: kích thước (kể cả viền tường), trong khoảng [5, 500].
+    corridor_density: tỉ lệ (0-1) tường nội bộ còn lại bị đục thêm; 0 = mê cung hoàn hảo
+                      (một đường duy nhất giữa hai ô), 1 = gần như không còn tường trong.
+    food_count, pie_count, ghost_count: số thức ăn, bánh ma thuật, Ghost.
+    exit_placement: 'far' (ô xa Pacman nhất), 'random' hoặc 'corner' (gần góc dưới phải).
+    Pacman, cổng thoát, thức ăn, bánh và Ghost không bao giờ nằm trên 4 góc teleport.
+
+    Trả về danh sách chuỗi, mỗi chuỗi là một hàng của layout.
+    """
+    if not (MIN_SIZE <= rows <= MAX_SIZE and MIN_SIZE <= cols <= MAX_SIZE):
+        raise ValueError(f"Layout size must be within [{MIN_SIZE}, {MAX_SIZE}], got {rows}x{cols}")
+    if not 0.0 <= corridor_density <= 1.0:
+        raise ValueError(f"corridor_density must be within [0, 1], got {corridor_density}")
+    if exit_placement not in EXIT_PLACEMENTS:
+        raise ValueError(f"Unknown exit placement: {exit_placement} (expected one of {EXIT_PLACEMENTS})")
+
+    rng = random.Random(seed)
+    layout = [['%'] * cols for _ in range(rows)]
+    _carve_maze(layout, rng)
+    _braid(layout, rng, corridor_density)
+    _open_teleport_corners(layout)
+
+    # Không đặt vật thể lên góc teleport: Pacman tới đó sẽ phải chờ chọn đích teleport
+    corners = set(_teleport_corners(rows, cols))
+    open_cells = [(r, c) for r in range(rows) for c in range(cols)
+                  if layout[r][c] == ' ' and (r, c) not in corners]
+    pacman_pos = rng.choice(open_cells)
+    distances = _bfs_distances(layout, pacman_pos)
+
+    # Cổng thoát
+    candidates = [pos for pos in open_cells if pos != pacman_pos]
+    if exit_placement == 'far':
+        exit_pos = max(candidates, key=lambda pos: (distances.get(pos, -1), pos))
+    elif exit_placement == 'corner':
+        exit_pos = min(candidates, key=lambda pos: (rows - 1 - pos[0]) + (cols - 1 - pos[1]))
+    else:
+        exit_pos = rng.choice(candidates)
+
+    # Thức ăn, bánh và Ghost trên các ô trống còn lại (Ghost không đứng sát Pacman)
+    free = [pos for pos in candidates if pos != exit_pos]
+    rng.shuffle(free)
+    needed = food_count + pie_count + ghost_count
+    if needed > len(free):
+        raise ValueError(f"Not enough open cells ({len(free)}) for {needed} objects")
+    ghost_cells = [pos for pos in free
+                   if abs(pos[0] - pacman_pos[0]) + abs(pos[1] - pacman_pos[1]) > 2][:ghost_count]
+    if len(ghost_cells) < ghost_count:
+        raise ValueError("Not enough open cells away from Pacman for the ghosts")
+    ghost_set = set(ghost_cells)
+    free = [pos for pos in free if pos not in ghost_set]
+    food_cells = free[:food_count]
+    pie_cells = free[food_count:food_count + pie_count]
+
+    layout[pacman_pos[0]][pacman_pos[1]] = 'P'
+    layout[exit_pos[0]][exit_pos[1]] = 'E'
+    for r, c in food_cells:
+        layout[r][c] = '.'
+    for r, c in pie_cells:
+        layout[r][c] = '0'
+    for r, c in ghost_cells:
+        layout[r][c] = 'G'
+
+    lines = [''.join(row) for row in layout]
+    check_reachability(lines)
+    return lines
+
+
+def check_reachability(lines):
+    """
+    Kiểm tra layout hợp lệ: có đúng một Pacman, có cổng thoát, và mọi thức ăn,
+    bánh và cổng thoát đều đến được từ Pacman mà không cần ăn tường.
+    Raise ValueError nếu không hợp lệ.
+    """
+    layout = [list(line) for line in lines]
+    pacman = [(r, c) for r, row in enumerate(layout) for c, ch in enumerate(row) if ch == 'P']
+    if len(pacman) != 1:
+        raise ValueError(f"Layout must contain exactly one Pacman, found {len(pacman)}")
+    targets = [(r, c) for r, row in enumerate(layout) for c, ch in enumerate(row) if ch in '.0E']
+    if not any(layout[r][c] == 'E' for r, c in targets):
+        raise ValueError("Layout has no exit gate")
+    distances = _bfs_distances(layout, pacman[0])
+    unreachable = [pos for pos in targets if pos not in distances]
+    if unreachable:
+        raise ValueError(f"{len(unreachable)} food/pie/exit cells are unreachable from Pacman, e.g. {unreachable[0]}")
+
+
+def save_layout(lines, path):
+    """Ghi layout ra file (tạo thư mục nếu cần). Trả về path."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def generate_layout_file(path, rows, cols, **kwargs):
+    """Sinh layout (xem generate_layout) và ghi ra file; trả về path để truyền cho Grid."""
+    return save_layout(generate_layout(rows, cols, **kwargs), path)
+
+
+def _carve_maze(layout, rng):
+    """Khoét mê cung hoàn hảo bằng DFS lặp trên các ô có tọa độ lẻ."""
+    rows, cols = len(layout), len(layout[0])
+    start = (1, 1)
+    layout[1][1] = ' '
+    stack = [start]
+    while stack:
+        r, c = stack[-1]
+        neighbours = [(r + dr, c + dc, dr // 2, dc // 2) for dr, dc in ((-2, 0), (2, 0), (0, -2), (0, 2))
+                      if 0 < r + dr < rows - 1 and 0 < c + dc < cols - 1 and layout[r + dr][c + dc] == '%']
+        if not neighbours:
+            stack.pop()
+            continue
+        nr, nc, hr, hc = rng.choice(neighbours)
+        layout[r + hr][c + hc] = ' '
+        layout[nr][nc] = ' '
+        stack.append((nr, nc))
+
+
+def _braid(layout, rng, density):
+    """Đục ngẫu nhiên một tỉ lệ tường nội bộ nối hai hành lang để tạo vòng lặp."""
+    if density <= 0:
+        return
+    rows, cols = len(layout), len(layout[0])
+    for r in range(1, rows - 1):
+        for c in range(1, cols - 1):
+            if layout[r][c] != '%':
+                continue
+            # Chỉ đục tường ngăn giữa hai ô trống thẳng hàng (giữ cấu trúc hành lang)
+            joins_rows = layout[r - 1][c] == ' ' and layout[r + 1][c] == ' '
+            joins_cols = layout[r][c - 1] == ' ' and layout[r][c + 1] == ' '
+            if (joins_rows or joins_cols) and rng.random() < density:
+                layout[r][c] = ' '
+
+
+def _teleport_corners(rows, cols):
+    """4 góc trong mà Grid dùng làm góc teleport."""
+    return ((1, 1), (1, cols - 2), (rows - 2, 1), (rows - 2, cols - 2))
+
+
+def _open_teleport_corners(layout):
+    """
+    Grid luôn dùng 4 góc trong (1,1), (1,cols-2), (rows-2,1), (rows-2,cols-2) làm góc teleport;
+    với kích thước chẵn các góc này có thể là tường, nên khoét đường ngắn nhất nối chúng vào mê cung.
+    """
+    rows, cols = len(layout), len(layout[0])
+    for corner in _teleport_corners(rows, cols):
+        if layout[corner[0]][corner[1]] != '%':
+            continue
+        # BFS xuyên tường (trong viền) tới ô trống gần nhất rồi khoét theo đường đó
+        parents = {corner: None}
+        queue = deque([corner])
+        while queue:
+            pos = queue.popleft()
+            if layout[pos[0]][pos[1]] == ' ':
+                break
+            for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                nxt = (pos[0] + dr, pos[1] + dc)
+                if 0 < nxt[0] < rows - 1 and 0 < nxt[1] < cols - 1 and nxt not in parents:
+                    parents[nxt] = pos
+                    queue.append(nxt)
+        while pos is not None:
+            layout[pos[0]][pos[1]] = ' '
+            pos = parents[pos]
+
+
+def _bfs_distances(layout, start):
+    """Khoảng cách BFS (không ăn tường) từ start đến mọi ô đến được."""
+    rows, cols = len(layout), len(layout[0])
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        r, c = queue.popleft()
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < rows and 0 <= nc < cols and (nr, nc) not in distances and layout[nr][nc] != '%':
+                distances[(nr, nc)] = distances[(r, c)] + 1
+                queue.append((nr, nc))
+    return distances
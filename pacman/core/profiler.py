@@ -0,0 +1,293 @@
+# pacman/core/profiler.py
+"""
+Profiler tùy chọn (opt-in) theo từng pha, thay cho việc bọc main.py bằng cProfile.
+
+Khi bật, install() bọc (wrap) các hàm nóng NGAY LÚC CÀI ĐẶT bằng bộ đếm thời gian:
+Rules.get_successor_for_astar / Rules.expand, các heuristic, các hàm BFS, push/pop frontier của A*,
+các pha vẽ của Renderer, get_action của agent, bước mô phỏng/frame của GameEngine.
+Khi không bật thì không có hàm nào bị bọc, nên không tốn chi phí gì.
+
+Bật bằng biến môi trường hoặc cờ dòng lệnh:
+    PACMAN_PROFILE=profile.json python main.py     # thống kê + histogram dạng JSON
+    PACMAN_PROFILE=profile.folded python main.py   # collapsed stack (speedscope / flamegraph.pl)
+    PACMAN_PROFILE=1 python main.py                # chỉ in bảng tổng kết khi thoát
+    python main.py --profile profile.json
+
+Mỗi lần gọi đo bằng time.perf_counter_ns() và được gom vào histogram log2 (micro giây)
+của pha tương ứng; thời gian "self" (trừ các pha con) được cộng theo ngăn xếp pha
+để xuất collapsed stack. Bản thân lớp bọc tốn khoảng 1 micro giây mỗi lần gọi, nên
+các pha gọi rất dày (frontier push/pop) sẽ bị phóng đại tương ứng.
+"""
+import atexit
+import functools
+import importlib
+import inspect
+import json
+import os
+import time
+import types
+from collections import defaultdict
+
+ENV_VAR = 'PACMAN_PROFILE'
+HISTOGRAM_BUCKETS = 32 # Bucket i: [2^(i-1), 2^i) micro giây; bucket 0: < 1 micro giây
+
+# (module, class hoặc None, các thuộc tính cần bọc)
+TARGETS = [
+    ('pacman.core.rules', 'Rules', ['get_successor', 'get_successor_for_astar', 'expand',
+                                    '_teleport_hub', '_choose_best_teleport_for_astar', '_bfs_maze_distance']),
+    ('pacman.core.simulator', 'Simulator', ['step']),
+    ('pacman.search.heuristics', 'Heuristics', ['maze_distance_heuristic', 'teleport_aware_heuristic',
+                                                'tsp_maze_heuristic', 'farthest_food_and_exit_heuristic',
+                                                'bfs_distance', 'mst_heuristic', '_bfs_maze_distance',
+                                                '_memoized_bfs_distance', '_teleport_aware_distance',
+                                                '_calculate_mst_cost', 'distance_table']),
+    ('pacman.search.utils', 'SearchUtils', ['bfs_maze_distance', 'calculate_mst']),
+    ('pacman.search.astar', 'AStarSearch', ['search']),
+    ('pacman.search.heuristics', None, ['farthest_food_and_exit_key', 'food_to_exit_key', 'nearest_food_key',
+                                        'mst_key', 'mst_exit_key', 'tsp_maze_key']),
+    ('pacman.search.heuristics', 'DistanceTables', ['table']),
+    ('pacman.search.astar_complete', 'AStarComplete', ['search', '_get_successors']),
+    ('pacman.search.sipp', 'SafeIntervalPlanner', ['search', 'safe_intervals']),
+    ('pacman.search.macro_planner', 'MacroPlanner', ['search', '_leg']),
+    ('pacman.agents.auto_agent', 'AutoAgent', ['get_action', '_create_plan']),
+    ('pacman.agents.manual_agent', 'ManualAgent', ['get_action']),
+    ('pacman.ui.renderer', 'Renderer', ['draw_all', 'draw_dirty', '_get_background', '_draw_scene',
+                                        'draw_teleport_corners', 'draw_teleport_selection_ui',
+                                        'draw_step', 'draw_score', 'draw_win_screen', 'draw_lose_screen']),
+    ('pacman.ui.game', 'GameEngine', ['_step_simulation', '_render_frame']),
+    ('pygame.display', None, ['flip', 'update']),
+]
+
+# Module A*/SIPP/macro dùng heapq làm frontier: thay tham chiếu heapq của module bằng bản có đo thời gian
+FRONTIER_MODULES = [
+    ('pacman.search.astar', 'AStarSearch'),
+    ('pacman.search.astar_complete', 'AStarComplete'),
+    ('pacman.search.sipp', 'SafeIntervalPlanner'),
+    ('pacman.search.macro_planner', 'MacroPlanner'),
+]
+
+_active = None
+
+
+class PhaseStats:
+    """Số lần gọi, tổng/min/max thời gian và histogram log2 của một pha."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def record(self, elapsed_ns):
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if self.min_ns is None or elapsed_ns < self.min_ns:
+            self.min_ns = elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        bucket = min((elapsed_ns // 1000).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+    def percentile(self, q):
+        """Phân vị xấp xỉ (cận trên của bucket, micro giây), q trong [0, 100]."""
+        if not self.count:
+            return 0.0
+        target = self.count * q / 100.0
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return float(1 << i)
+        return float(1 << (HISTOGRAM_BUCKETS - 1))
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total_ns / 1e6,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'min_us': (self.min_ns or 0) / 1e3,
+            'max_us': self.max_ns / 1e3,
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            # Cận trên (micro giây) của mỗi bucket -> số lần gọi
+            'histogram_us': {str(1 << i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Profiler:
+    """Gom thời gian theo pha; install() bọc các hàm trong TARGETS, uninstall() gỡ ra."""
+
+    def __init__(self):
+        self.phases = defaultdict(PhaseStats)
+        self.folded = defaultdict(int) # ngăn xếp pha (tuple) -> thời gian self (ns)
+        self._stack = []
+        self._child_ns = []
+        self._patches = [] # (owner, attr, giá trị gốc)
+
+    def wrap(self, name, func):
+        """
+        Trả về hàm bọc func, ghi thời gian mỗi lần gọi vào pha name.
+        Với generator (ví dụ Rules.expand), mỗi lần resume được đo như một lần gọi.
+        """
+        stack = self._stack
+        child_ns = self._child_ns
+        phases = self.phases
+        folded = self.folded
+        clock = time.perf_counter_ns
+
+        def enter():
+            stack.append(name)
+            child_ns.append(0)
+            return clock()
+
+        def leave(start):
+            elapsed = clock() - start
+            folded[tuple(stack)] += elapsed - child_ns.pop()
+            stack.pop()
+            if child_ns:
+                child_ns[-1] += elapsed
+            phases[name].record(elapsed)
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def timed_generator(*args, **kwargs):
+                generator = func(*args, **kwargs)
+                while True:
+                    start = enter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        leave(start)
+                    yield item
+
+            return timed_generator
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                leave(start)
+
+        return timed
+
+    def patch(self, owner, attr, name):
+        """Thay owner.attr bằng bản có đo thời gian (bỏ qua nếu không tồn tại)."""
+        original = owner.__dict__.get(attr) if isinstance(owner, type) else getattr(owner, attr, None)
+        if original is None or not callable(original):
+            return
+        setattr(owner, attr, self.wrap(name, original))
+        self._patches.append((owner, attr, original))
+
+    def install(self):
+        """Bọc mọi hàm trong TARGETS và frontier heapq của các module A*."""
+        for module_name, class_name, attrs in TARGETS:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue # Ví dụ chạy headless không có pygame
+            owner = getattr(module, class_name) if class_name else module
+            prefix = class_name or module_name
+            for attr in attrs:
+                self.patch(owner, attr, f"{prefix}.{attr}")
+
+        for module_name, class_name in FRONTIER_MODULES:
+            module = importlib.import_module(module_name)
+            heapq = module.heapq
+            frontier = types.SimpleNamespace(
+                heappush=self.wrap(f"{class_name}.frontier_push", heapq.heappush),
+                heappop=self.wrap(f"{class_name}.frontier_pop", heapq.heappop),
+                heapify=heapq.heapify,
+            )
+            setattr(module, 'heapq', frontier)
+            self._patches.append((module, 'heapq', heapq))
+        return self
+
+    def uninstall(self):
+        """Khôi phục mọi hàm đã bọc (theo thứ tự ngược)."""
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches.clear()
+
+    def reset(self):
+        self.phases.clear()
+        self.folded.clear()
+
+    def to_dict(self):
+        return {
+            'unit': 'microseconds',
+            'phases': {name: stats.as_dict() for name, stats in
+                       sorted(self.phases.items(), key=lambda item: -item[1].total_ns)},
+        }
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
+
+    def dump_collapsed(self, path):
+        """
+        Collapsed stack ("a;b;c <micro giây>" mỗi dòng), mở được bằng speedscope
+        (https://www.speedscope.app) hoặc flamegraph.pl.
+        """
+        with open(path, 'w') as f:
+            for stack, self_ns in sorted(self.folded.items()):
+                self_us = self_ns // 1000
+                if self_us > 0:
+                    f.write(f"{';'.join(stack)} {self_us}\n")
+
+    def dump(self, path):
+        """Ghi kết quả: .json -> thống kê JSON, đuôi khác -> collapsed stack."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith('.json'):
+            self.dump_json(path)
+        else:
+            self.dump_collapsed(path)
+
+    def report(self, limit=25):
+        """In bảng tổng kết các pha tốn thời gian nhất."""
+        print(f"\n{'phase':<52} {'calls':>9} {'total ms':>10} {'mean us':>9} {'p90 us':>8} {'max us':>9}")
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].total_ns)[:limit]:
+            data = stats.as_dict()
+            print(f"{name:<52} {data['count']:>9} {data['total_ms']:>10.1f} {data['mean_us']:>9.1f} "
+                  f"{data['p90_us']:>8.0f} {data['max_us']:>9.0f}")
+
+
+def enable(output=None):
+    """
+    Bật profiler toàn cục (một lần): cài đặt các lớp bọc và đăng ký atexit để
+    in bảng tổng kết và ghi kết quả ra output (nếu có).
+    """
+    global _active
+    if _active is not None:
+        return _active
+    _active = Profiler().install()
+
+    def finish():
+        _active.report()
+        if output:
+            _active.dump(output)
+            print(f"Profile written to {output}")
+
+    atexit.register(finish)
+    return _active
+
+
+def enable_from_env():
+    """Bật profiler nếu biến môi trường PACMAN_PROFILE được đặt ('1' = chỉ in bảng)."""
+    value = os.environ.get(ENV_VAR)
+    if not value or value == '0':
+        return None
+    return enable(None if value.lower() in ('1', 'true', 'yes') else value)
+
+
+def get_profiler():
+    """Profiler đang bật, hoặc None."""
+    return _active
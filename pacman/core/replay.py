@@ -0,0 +1,228 @@
+# pacman/core/replay.py
+"""
+Định dạng replay nhị phân (xác định - deterministic) cho một ván chơi.
+
+Cấu trúc file:
+    Header : MAGIC, version, sha1 layout gốc (20 bytes), tên file layout, chu kỳ snapshot
+    Body   : dãy bản ghi
+        0x00-0x3F  frame: 3 bit thấp là mã action, 3 bit tiếp theo là teleport_choice
+                   (mã action RAW có thêm 2 số nguyên 16-bit (dr, dc) theo sau)
+        0xFC       các ô tường bị ăn NGOÀI step() (ví dụ A* ăn tường trên grid thật)
+        0xFD       snapshot đầy đủ (zlib + JSON) của trạng thái TRƯỚC frame hiện tại
+
+Replayer chạy lại các frame qua Simulator (không cần planner, không cần pygame)
+và dùng snapshot để nhảy (seek) nhanh đến frame bất kỳ.
+"""
+import json
+import struct
+import zlib
+import bisect
+
+from pacman.core.action_codec import ACTIONS, ACTION_CODES
+from pacman.core.grid import Grid
+from pacman.core.simulator import Simulator
+
+MAGIC = b'PMRP'
+VERSION = 1
+DEFAULT_SNAPSHOT_INTERVAL = 256
+
+# Mã action trong byte frame (0-4 giống action_codec.ACTIONS)
+_NO_ACTION = 5
+_RAW_ACTION = 6
+
+_TAG_WALLS = 0xFC
+_TAG_SNAPSHOT = 0xFD
+
+_HEADER = struct.Struct('>4sB20sH')
+_RAW = struct.Struct('>hh')
+_U16 = struct.Struct('>H')
+_SNAPSHOT_HEADER = struct.Struct('>II')
+_CELL = struct.Struct('>HH')
+
+
+class ReplayRecorder:
+    """
+    Ghi replay cho một Simulator. Gắn vào bằng simulator.recorder = recorder;
+    Simulator sẽ gọi before_step/after_step/on_reset.
+    """
+    def __init__(self, path, grid, snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.frame = 0
+        self._file = open(path, 'wb')
+        layout_name = grid.layout_file.encode('utf-8')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, bytes.fromhex(grid.get_layout_hash(initial=True)),
+                                      snapshot_interval))
+        self._file.write(_U16.pack(len(layout_name)) + layout_name)
+        self._seen_layout = (grid.layout_version, len(grid.wall_edits))
+
+    def before_step(self, simulator, action, teleport_choice):
+        """Ghi các thay đổi xảy ra ngoài step(), snapshot định kỳ và frame hiện tại."""
+        grid = simulator.grid
+        version, edit_count = self._seen_layout
+        if grid.layout_version != version:
+            # Layout bị thay thế ngoài step() - chỉ snapshot mới mô tả được
+            self._write_snapshot(simulator)
+        elif len(grid.wall_edits) > edit_count:
+            cells = grid.wall_edits[edit_count:]
+            self._file.write(bytes((_TAG_WALLS,)) + _U16.pack(len(cells)))
+            self._file.write(b''.join(_CELL.pack(r, c) for r, c in cells))
+
+        if self.frame % self.snapshot_interval == 0:
+            self._write_snapshot(simulator)
+
+        self._file.write(encode_frame(action, teleport_choice))
+        self.frame += 1
+
+    def after_step(self, simulator):
+        self._seen_layout = (simulator.grid.layout_version, len(simulator.grid.wall_edits))
+
+    def on_reset(self, simulator):
+        """Ván chơi bị reset giữa chừng: ghi snapshot để replay tiếp tục đúng."""
+        self._write_snapshot(simulator)
+        self.after_step(simulator)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def _write_snapshot(self, simulator):
+        payload = zlib.compress(json.dumps(simulator.get_snapshot(), separators=(',', ':')).encode('utf-8'))
+        self._file.write(bytes((_TAG_SNAPSHOT,)) + _SNAPSHOT_HEADER.pack(self.frame, len(payload)) + payload)
+        self._file.flush()
+
+
+def encode_frame(action, teleport_choice=None):
+    """Mã hóa (action, teleport_choice) của một frame."""
+    choice = 0 if teleport_choice is None else teleport_choice
+    if not 0 <= choice <= 4:
+        raise ValueError(f"Unsupported teleport choice: {teleport_choice}")
+    if action is None:
+        return bytes((_NO_ACTION | choice << 3,))
+    code = ACTION_CODES.get(tuple(action))
+    if code is not None:
+        return bytes((code | choice << 3,))
+    return bytes((_RAW_ACTION | choice << 3,)) + _RAW.pack(*action)
+
+
+class Replay:
+    """Nội dung đã giải mã của một file replay."""
+    def __init__(self, layout_file, layout_hash, snapshot_interval, frames, events):
+        self.layout_file = layout_file
+        self.layout_hash = layout_hash
+        self.snapshot_interval = snapshot_interval
+        self.frames = frames # [(action, teleport_choice)]
+        self.events = events # {frame: [('walls', cells) | ('snapshot', dict)]}
+        self.snapshot_frames = sorted(f for f, items in events.items()
+                                      if any(kind == 'snapshot' for kind, _ in items))
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, layout_hash, snapshot_interval = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a Pacman replay file (or unsupported version): {path}")
+        offset = _HEADER.size
+        (name_len,) = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        layout_file = data[offset:offset + name_len].decode('utf-8')
+        offset += name_len
+
+        frames, events = [], {}
+        while offset < len(data):
+            tag = data[offset]
+            offset += 1
+            if tag == _TAG_SNAPSHOT:
+                frame, length = _SNAPSHOT_HEADER.unpack_from(data, offset)
+                offset += _SNAPSHOT_HEADER.size
+                snapshot = json.loads(zlib.decompress(data[offset:offset + length]))
+                offset += length
+                events.setdefault(frame, []).append(('snapshot', snapshot))
+            elif tag == _TAG_WALLS:
+                (count,) = _U16.unpack_from(data, offset)
+                offset += _U16.size
+                cells = [_CELL.unpack_from(data, offset + i * _CELL.size) for i in range(count)]
+                offset += count * _CELL.size
+                events.setdefault(len(frames), []).append(('walls', cells))
+            else:
+                code, choice = tag & 0x07, tag >> 3
+                if code == _NO_ACTION:
+                    action = None
+                elif code == _RAW_ACTION:
+                    action = _RAW.unpack_from(data, offset)
+                    offset += _RAW.size
+                else:
+                    action = ACTIONS[code]
+                frames.append((action, choice or None))
+        return cls(layout_file, layout_hash.hex(), snapshot_interval, frames, events)
+
+
+class Replayer:
+    """
+    Chạy lại replay qua Simulator. Trạng thái tại frame n là trạng thái
+    TRƯỚC khi áp dụng frame n (seek(0) = lúc bắt đầu, seek(len) = kết thúc).
+    """
+    def __init__(self, replay, layout_file=None):
+        if isinstance(replay, str):
+            replay = Replay.load(replay)
+        self.replay = replay
+        grid = Grid(layout_file or replay.layout_file)
+        if grid.get_layout_hash(initial=True) != replay.layout_hash:
+            raise ValueError("Layout file does not match the layout recorded in the replay")
+        self.simulator = Simulator(grid)
+        self.frame = 0
+        self._apply_events(0)
+
+    def __len__(self):
+        return len(self.replay)
+
+    @property
+    def game_state(self):
+        return self.simulator.game_state
+
+    @property
+    def grid(self):
+        return self.simulator.grid
+
+    def seek(self, frame):
+        """Nhảy đến frame bất kỳ, khôi phục từ snapshot gần nhất rồi mô phỏng tiếp."""
+        frame = max(0, min(frame, len(self.replay)))
+        snapshots = self.replay.snapshot_frames
+        i = bisect.bisect_right(snapshots, frame) - 1
+        start = snapshots[i] if i >= 0 else 0
+        # Chỉ khôi phục khi phải lùi lại hoặc snapshot gần hơn vị trí hiện tại
+        if frame < self.frame or start > self.frame:
+            if i < 0:
+                self.simulator.reset()
+            self.frame = start
+            self._apply_events(start)
+        while self.frame < frame:
+            self.step()
+        return self.simulator
+
+    def step(self):
+        """Mô phỏng một frame. Trả về False nếu đã hết replay."""
+        if self.frame >= len(self.replay):
+            return False
+        action, teleport_choice = self.replay.frames[self.frame]
+        self.simulator.step(action, teleport_choice)
+        self.frame += 1
+        self._apply_events(self.frame)
+        return True
+
+    def run(self):
+        """Chạy hết replay ở tốc độ tối đa (headless). Trả về trạng thái game cuối."""
+        self.seek(len(self.replay))
+        return self.simulator.game_status
+
+    def _apply_events(self, frame):
+        for kind, data in self.replay.events.get(frame, ()):
+            if kind == 'snapshot':
+                self.simulator.load_snapshot(data)
+            else:
+                for pos in data:
+                    self.simulator.grid.eat_wall(tuple(pos))
@@ -1,17 +1,24 @@
 # pacman/core/rules.py
 from pacman.core.state import GameState
 from pacman.core.entities import Pacman, Ghost
+from pacman.core.events import EventLog
+
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1)) # LÊN, XUỐNG, TRÁI, PHẢI
 
 class Rules:
     """
     Lớp này chứa logic chuyển đổi trạng thái (Transition Model).
     Nó nhận một trạng thái và một hành động, sau đó trả về trạng thái mới.
     """
-    def __init__(self, grid):
+    def __init__(self, grid, events=None):
         """
         Lưu trữ tham chiếu đến grid, vì grid có thể bị thay đổi (khi ăn tường).
+        events: EventLog nhận các sự kiện teleport (mặc định: log tắt, không in gì).
         """
         self.grid = grid
+        self.events = events if events is not None else EventLog()
+        self._teleport_hubs = {} # (góc, food_left) -> đích teleport tốt nhất cho A*
+        self._teleport_hubs_key = None
 
     def get_successor(self, current_state, action):
         """
@@ -47,9 +54,7 @@ class Rules:
             # Nếu Pacman đến góc teleport lần đầu, đặt trạng thái chờ
             teleport_options = self.grid.get_teleport_destinations(new_pos)
             if teleport_options:
-                print(f"Pacman reached teleport corner {new_pos}. Press 1-4 to select destination:")
-                for i, option in enumerate(teleport_options, 1):
-                    print(f"  {i}: {option}")
+                self.events.emit('teleport_reached', pos=new_pos, options=teleport_options)
                 
                 # Tạo Pacman mới với trạng thái chờ teleport
                 new_pacman = Pacman(new_pos, current_pacman.direction, power_steps, waiting_for_teleport=True)
@@ -187,7 +192,7 @@ class Rules:
             new_pacman = Pacman(destination, current_state.pacman.direction, 
                               current_state.pacman.power_steps, waiting_for_teleport=False)
             
-            print(f"Pacman teleported from {current_state.pacman.pos} to {destination}")
+            self.events.emit('teleported', source=current_state.pacman.pos, destination=destination)
             
             # Cập nhật step count và kiểm tra thức ăn/pie tại vị trí mới
             new_food_left = set(current_state.food_left)
@@ -241,11 +246,8 @@ class Rules:
         if self.grid.is_teleport_corner(new_pos):
             teleport_options = self.grid.get_teleport_destinations(new_pos)
             if teleport_options:
-                # Tự động chọn teleport tốt nhất dựa trên heuristic
-                best_destination = self._choose_best_teleport_for_astar(
-                    new_pos, teleport_options, current_state
-                )
-                new_pos = best_destination
+                # Tự động chọn teleport tốt nhất dựa trên heuristic (cache theo góc)
+                new_pos = self._teleport_hub(new_pos, current_state)
                 
                 # Kiểm tra thức ăn tại vị trí teleport mới
                 if new_pos in food_left:
@@ -305,6 +307,105 @@ class Rules:
             step_count=step_count
         )
     
+    def expand(self, current_state):
+        """
+        Generator sinh mọi successor (action, state) của current_state cho A* trong một lượt.
+        Kết quả giống hệt việc gọi get_successor_for_astar với từng action hợp lệ
+        (4 hướng không vào tường trừ khi có power, cộng các action teleport dạng độ lệch lớn),
+        nhưng:
+        - vị trí Ghost chỉ tính một lần cho mỗi state cha (tính lại nếu một action vừa ăn tường);
+        - food_left/pies_left (frozenset) được dùng lại nguyên vẹn khi Pacman không ăn gì;
+        - bỏ qua các action không làm thay đổi state (ra ngoài biên, đâm tường);
+        - mỗi góc teleport là một nút hub: đích của nó tính một lần (_teleport_hub), và
+          các action teleport hạ cánh cùng một ô chỉ sinh một successor (action đầu tiên).
+          Các successor bị gộp có state bằng nhau, nên A* vốn cũng bỏ chúng như bản trùng.
+        """
+        grid = self.grid
+        pacman = current_state.pacman
+        pacman_pos = pacman.pos
+        r, c = pacman_pos
+        power = pacman.power_steps
+        food_left = current_state.food_left
+        pies_left = current_state.pies_left
+        step_count = current_state.step_count + 1
+
+        # Danh sách action tính trước trên grid hiện tại (trước khi có action nào ăn tường)
+        actions = [(dr, dc) for dr, dc in DIRECTIONS if power > 0 or not grid.is_wall((r + dr, c + dc))]
+        if grid.is_teleport_corner(pacman_pos):
+            actions.extend((dest[0] - r, dest[1] - c) for dest in grid.get_teleport_destinations(pacman_pos))
+
+        ghosts = None
+        ghosts_key = None
+        landings = set() # Các ô đã hạ cánh sau teleport
+        for action in actions:
+            dr, dc = action
+            new_pos = (r + dr, c + dc)
+            if not self._is_within_bounds(new_pos):
+                continue
+            new_food, new_pies, power_steps = food_left, pies_left, power
+
+            # Teleport tự động khi bước vào góc teleport
+            if grid.is_teleport_corner(new_pos):
+                if grid.get_teleport_destinations(new_pos):
+                    new_pos = self._teleport_hub(new_pos, current_state)
+                    if new_pos in landings:
+                        continue
+                    landings.add(new_pos)
+                    if new_pos in new_food:
+                        new_food = new_food - {new_pos}
+                    if new_pos in new_pies:
+                        new_pies = new_pies - {new_pos}
+                        power_steps = 5
+
+            # Tường: chỉ đi được (và ăn tường) khi có power
+            if grid.is_wall(new_pos):
+                if power_steps <= 0:
+                    continue
+                grid.eat_wall(new_pos)
+            if power_steps > 0:
+                power_steps -= 1
+
+            if new_pos in new_food:
+                new_food = new_food - {new_pos}
+            if new_pos in new_pies:
+                new_pies = new_pies - {new_pos}
+                power_steps = 5
+
+            new_direction = pacman.direction
+            if dr == -1: new_direction = 90
+            elif dr == 1: new_direction = 270
+            elif dc == -1: new_direction = 180
+            elif dc == 1: new_direction = 0
+
+            # Ghost chỉ phụ thuộc vào tường: dùng chung cho mọi successor khi tường không đổi
+            key = (grid.layout_version, len(grid.wall_edits))
+            if key != ghosts_key:
+                ghosts = tuple(ghost.get_updated_state(grid) for ghost in current_state.ghosts)
+                ghosts_key = key
+
+            yield action, GameState(Pacman(new_pos, new_direction, power_steps), ghosts,
+                                    new_food, new_pies, step_count)
+
+    def _teleport_hub(self, corner, current_state):
+        """
+        Đích teleport mà A* tự chọn khi Pacman đến góc corner.
+        Kết quả chỉ phụ thuộc vào góc và food_left (cùng grid), nên được cache:
+        mọi lần đến cùng một góc với cùng số thức ăn dùng lại một lần tính.
+        Cache bị xóa khi layout đổi (xoay, reset) hoặc có tường bị ăn.
+        """
+        grid = self.grid
+        layout_key = (grid.layout_version, len(grid.wall_edits))
+        if layout_key != self._teleport_hubs_key:
+            self._teleport_hubs = {}
+            self._teleport_hubs_key = layout_key
+        key = (corner, current_state.food_left)
+        destination = self._teleport_hubs.get(key)
+        if destination is None:
+            destination = self._choose_best_teleport_for_astar(
+                corner, grid.get_teleport_destinations(corner), current_state)
+            self._teleport_hubs[key] = destination
+        return destination
+
     def _choose_best_teleport_for_astar(self, current_pos, teleport_options, current_state):
         """
         Chọn teleport tốt nhất cho A* dựa trên khoảng cách đến thức ăn gần nhất.
@@ -0,0 +1,203 @@
+# pacman/core/simulator.py
+"""
+Bộ mô phỏng game thuần Python, không phụ thuộc pygame.
+Chứa vòng lặp bước (step) và các luật thắng/thua/xoay mê cung,
+để có thể chạy game headless (server, benchmark) hoặc làm lõi cho GameEngine.
+"""
+from pacman.core.grid import Grid
+from pacman.core.rules import Rules
+from pacman.core.state import GameState
+from pacman.core.entities import Pacman, Ghost
+from pacman.core.danger_map import GhostDangerMap
+
+ROTATION_INTERVAL = 30 # Mê cung xoay sau mỗi 30 bước
+
+
+class Simulator:
+    """
+    Quản lý một ván chơi: grid, GameState hiện tại và trạng thái game
+    ('running', 'win', 'lose'). Mỗi lần gọi step() tương ứng với một frame
+    logic của GameEngine.
+    """
+    def __init__(self, grid, rules=None):
+        """
+        grid: đối tượng Grid hoặc đường dẫn file layout.
+        rules: Rules dùng chung (tạo mới nếu không truyền vào).
+        """
+        if isinstance(grid, str):
+            grid = Grid(grid)
+        self.grid = grid
+        self.rules = rules if rules is not None else Rules(grid)
+        self.game_state = GameState.get_initial_state(self.grid)
+        self.game_status = 'running'
+        self.rotated = False # True nếu mê cung vừa xoay trong step() gần nhất
+        self.teleport_used = False # True nếu teleport_choice đã được dùng trong step() gần nhất
+        self.recorder = None # ReplayRecorder (tùy chọn) ghi lại từng frame
+        self._danger_map = None # GhostDangerMap cho kiểm tra va chạm trước khi di chuyển
+        self._last_rotation_step = None
+
+    def reset(self):
+        """Đưa ván chơi về trạng thái ban đầu (mê cung không xoay)."""
+        self.grid.reset_to_initial_state()
+        self.rules.grid = self.grid
+        self.game_state = GameState.get_initial_state(self.grid)
+        self.game_status = 'running'
+        self.rotated = False
+        self.teleport_used = False
+        self._last_rotation_step = None
+        if self.recorder is not None:
+            self.recorder.on_reset(self)
+
+    def is_over(self):
+        """Ván chơi đã kết thúc (thắng hoặc thua) hay chưa."""
+        return self.game_status != 'running'
+
+    def step(self, action, teleport_choice=None):
+        """
+        Thực hiện một frame logic.
+        action: (dr, dc) hoặc None nếu không di chuyển.
+        teleport_choice: 1-4 nếu người chơi chọn đích teleport, ngược lại None.
+        Trả về trạng thái game sau bước này.
+        """
+        if self.recorder is not None:
+            self.recorder.before_step(self, action, teleport_choice)
+        try:
+            return self._step(action, teleport_choice)
+        finally:
+            if self.recorder is not None:
+                self.recorder.after_step(self)
+
+    def _step(self, action, teleport_choice):
+        self.rotated = False
+        self.teleport_used = False
+        if self.game_status != 'running':
+            return self.game_status
+
+        # --- KIỂM TRA VA CHẠM TRƯỚC KHI DI CHUYỂN ---
+        # LUÔN LUÔN kiểm tra va chạm - bất cứ khi nào chạm Ghost đều thua
+        if action and self._will_collide(action):
+            self.game_status = 'lose'
+            self.rules.events.emit('collision', pos=self.game_state.pacman.pos, step=self.game_state.step_count)
+
+        # --- KIỂM TRA XOAY MÊ CUNG (sau mỗi 30 bước) ---
+        if self.game_status != 'lose':
+            self._rotate_if_needed()
+
+        # --- XỬ LÝ TELEPORTATION SELECTION ---
+        if teleport_choice is not None and self.game_state.pacman.waiting_for_teleport:
+            self.game_state = self.rules.handle_teleport_selection(self.game_state, teleport_choice)
+            self.teleport_used = True
+
+        # --- APPLY ACTION: Dùng Rules để tính GameState tiếp theo ---
+        if action and self.game_status != 'lose':
+            self.game_state = self.rules.get_successor(self.game_state, action)
+
+            # --- KIỂM TRA VA CHẠM SAU KHI DI CHUYỂN (BACKUP CHECK) ---
+            pacman_pos = self.game_state.pacman.pos
+            for ghost in self.game_state.ghosts:
+                if ghost.pos == pacman_pos:
+                    self.game_status = 'lose'
+                    self.rules.events.emit('collision', pos=pacman_pos, step=self.game_state.step_count)
+                    break
+
+            # Nếu chưa thua, kiểm tra thắng
+            if self.game_status != 'lose':
+                food_left = len(self.game_state.food_left)
+                at_exit = pacman_pos == self.grid.exitgate_pos
+                if food_left <= 0 and at_exit: # Điều kiện thắng
+                    self.game_status = 'win'
+
+        return self.game_status
+
+    def run(self, agent, max_steps=10000):
+        """
+        Chạy headless cho tới khi kết thúc hoặc hết max_steps frame.
+        agent phải có get_action(game_state); thuộc tính teleport_choice (nếu có)
+        được dùng và reset giống như trong GameEngine.
+        Trả về trạng thái game cuối cùng.
+        """
+        for _ in range(max_steps):
+            if self.is_over():
+                break
+            action = agent.get_action(self.game_state)
+            teleport_choice = getattr(agent, 'teleport_choice', None)
+            self.step(action, teleport_choice)
+            if self.teleport_used:
+                agent.teleport_choice = None # Reset choice
+        return self.game_status
+
+    def get_snapshot(self):
+        """
+        Toàn bộ trạng thái ván chơi (layout đã ăn tường/xoay, GameState,
+        trạng thái game) dưới dạng dict chỉ gồm kiểu JSON cơ bản.
+        """
+        state = self.game_state
+        pacman = state.pacman
+        return {
+            'layout': [''.join(row) for row in self.grid.layout_list],
+            'exitgate_pos': self.grid.exitgate_pos,
+            'teleport_corners': self.grid.teleport_corners,
+            'pacman': [pacman.pos, pacman.direction, pacman.power_steps, pacman.waiting_for_teleport],
+            'ghosts': [[ghost.pos, ghost.color, ghost.direction] for ghost in state.ghosts],
+            'food_left': sorted(state.food_left),
+            'pies_left': sorted(state.pies_left),
+            'step_count': state.step_count,
+            'game_status': self.game_status,
+            'last_rotation_step': self._last_rotation_step,
+        }
+
+    def load_snapshot(self, snapshot):
+        """Khôi phục trạng thái từ dict tạo bởi get_snapshot()."""
+        to_pos = lambda pos: tuple(pos) if pos is not None else None
+        grid = self.grid
+        grid.layout_list = [list(row) for row in snapshot['layout']]
+        grid.rows = len(grid.layout_list)
+        grid.cols = len(grid.layout_list[0])
+        grid.exitgate_pos = to_pos(snapshot['exitgate_pos'])
+        grid.teleport_corners = [to_pos(pos) for pos in snapshot['teleport_corners']]
+        grid._mark_layout_replaced()
+
+        pos, direction, power_steps, waiting = snapshot['pacman']
+        self.game_state = GameState(
+            pacman=Pacman(to_pos(pos), direction, power_steps, waiting),
+            ghosts=tuple(Ghost(to_pos(g_pos), color, to_pos(g_dir)) for g_pos, color, g_dir in snapshot['ghosts']),
+            food_left=frozenset(to_pos(p) for p in snapshot['food_left']),
+            pies_left=frozenset(to_pos(p) for p in snapshot['pies_left']),
+            step_count=snapshot['step_count']
+        )
+        self.game_status = snapshot['game_status']
+        self._last_rotation_step = snapshot['last_rotation_step']
+        self.rotated = False
+        self.teleport_used = False
+
+    def _will_collide(self, action):
+        """
+        Kiểm tra Pacman có va chạm Ghost nếu thực hiện action không:
+        1. Pacman di chuyển đến vị trí hiện tại của Ghost
+        2. Cả hai di chuyển đến cùng một vị trí
+        """
+        pacman_pos = self.game_state.pacman.pos
+        dr, dc = action
+        new_pacman_pos = (pacman_pos[0] + dr, pacman_pos[1] + dc)
+        self._danger_map = GhostDangerMap.for_state(self.grid, self.game_state, self._danger_map)
+        return self._danger_map.is_dangerous(new_pacman_pos, self._danger_map.phase_of(self.game_state.ghosts))
+
+    def _rotate_if_needed(self):
+        """Xoay mê cung khi step_count vừa đạt bội số của 30 và chưa xoay lần này."""
+        step_count = self.game_state.step_count
+        if step_count > 0 and step_count % ROTATION_INTERVAL == 0 and self._last_rotation_step != step_count:
+            try:
+                # Lưu kích thước cũ để tính toán xoay
+                old_rows = self.grid.rows
+                old_cols = self.grid.cols
+
+                # Xoay mê cung và tất cả các vị trí entities
+                self.grid.rotate_90_degrees_right()
+                self.game_state = self.rules._rotate_entity_positions(self.game_state, old_rows, old_cols)
+
+                # Đánh dấu đã xoay ở step này
+                self._last_rotation_step = step_count
+                self.rotated = True
+
+            except Exception as e:
+                self.rules.events.emit('rotation_error', error=str(e), step=step_count)
@@ -6,9 +6,22 @@ Reusable and independent of pygame.
 
 from pacman.core.state import GameState
 from pacman.core.rules import Rules
-from pacman.search.heuristics import Heuristics
+from pacman.search.heuristics import Heuristics, resolve_heuristic
+from pacman.search.state_keys import StateKeyPacker
+from pacman.search.stats import SearchStats
 import heapq
-from typing import List, Tuple, Optional, Set
+import time
+from typing import Dict, List, Tuple
+
+CLOSED = -1  # g_costs value of an expanded state
+
+# Heuristics worth running lazily -> cheap bound used as their queue-time estimate.
+# tsp_maze on data/layout.txt (full goal from the start): 22.6 s eager, 7.1 s lazy.
+# Elsewhere the gain varies (gen-11x15-f2-pie 1986 -> 545 expansions, gen-11x11-f3
+# 662 -> 954), and only the heuristics listed here should be run lazily.
+LAZY_BOUNDS = {
+    "tsp_maze": "bfs_distance",
+}
 
 
 class AStarSearch:
@@ -16,117 +29,175 @@ class AStarSearch:
     A* search implementation for finding optimal path in Pacman game.
     """
     
-    def __init__(self, rules: Rules, heuristics: Heuristics, heuristic_type="maze_distance"):
+    def __init__(self, rules: Rules, heuristics: Heuristics, heuristic_type="maze_distance",
+                 lazy: bool = False, lazy_bound=None):
+        """
+        Args:
+            heuristic_type: Heuristic spec (name, "max(a,b)" or list of names)
+            lazy: Defer the heuristic until a node is popped. Successors are queued with
+                the parent's f (raised to g + lazy_bound if given); a popped node whose
+                real f is higher is re-queued instead of expanded. Pays off with
+                expensive heuristics such as tsp_maze, where most successors are never
+                expanded; see LAZY_BOUNDS for the tested pairings.
+            lazy_bound: Optional cheap heuristic spec used as the queue-time estimate
+        """
         self.rules = rules
         self.heuristics = heuristics
         self.heuristic_type = heuristic_type
+        # Resolved once (name, "max(a,b)" or list of names) instead of dispatching per successor
+        self._evaluate_heuristic = resolve_heuristic(heuristic_type, heuristics)
+        self.lazy = lazy
+        self._evaluate_bound = resolve_heuristic(lazy_bound, heuristics) if lazy_bound is not None else None
         
-    def search(self, initial_state: GameState, goal_condition) -> Optional[List[Tuple[int, int]]]:
+    def search(self, initial_state: GameState, goal_condition, return_stats: bool = False):
         """
         Perform A* search to find optimal path.
         
         Args:
             initial_state: Starting game state
             goal_condition: Function that takes a state and returns True if goal is reached
+            return_stats: If True, also return a SearchStats for this run
             
         Returns:
-            List of actions (dr, dc) to reach goal, or None if no path exists
+            List of actions (dr, dc) to reach goal, or None if no path exists.
+            With return_stats=True: (path, SearchStats)
         """
-        # Priority queue: (f_cost, g_cost, state_counter, state, path)
-        # Use counter to break ties and avoid comparing GameState objects
+        stats = SearchStats() if return_stats else None
+        if stats is not None:
+            start_time = time.perf_counter()
+            hits, misses = self.heuristics.cache_hits, self.heuristics.cache_misses
+
+        # States are identified by packed int keys (see state_keys.py): the g/closed
+        # table and parent pointers hold small ints instead of keeping every explored
+        # GameState alive (frontier entries still carry their state until popped)
+        grid = self.rules.grid
+        packer = StateKeyPacker(grid.cols, grid.rows * grid.cols, initial_state.food_left, initial_state.pies_left)
+        pack_state = packer.pack_state
+        start_key = pack_state(initial_state)
+
+        # Priority queue: (f_cost, depth_key, state_counter, state, key, scored)
+        # depth_key is g_cost, or -g_cost in lazy mode: there f ties break toward deeper
+        # nodes, otherwise every deferred sibling sharing its parent's f is scored first.
+        # Use counter to break ties and avoid comparing GameState objects;
+        # scored is False while the heuristic of a lazily queued node is still deferred
         state_counter = 0
-        frontier = [(0, 0, state_counter, initial_state, [])]
+        frontier = [(0, 0, state_counter, initial_state, start_key, not self.lazy)]
         heapq.heapify(frontier)
         state_counter += 1
         
-        # Closed set to avoid revisiting states
-        closed: Set[GameState] = set()
-        
-        # Track best g_cost for each state
-        g_costs = {initial_state: 0}
+        # Best g_cost per state key, or CLOSED once the state has been expanded
+        g_costs: Dict[int, int] = {start_key: 0}
+        # Parent pointers (key -> (parent key, action)) instead of a path per frontier entry
+        came_from: Dict[int, Tuple[int, Tuple[int, int]]] = {}
+
+        evaluate_heuristic = self._evaluate_heuristic
+        evaluate_bound = self._evaluate_bound
+        lazy = self.lazy
+
+        # Counters (cheap local ints; only copied into stats when requested)
+        expansions = generations = duplicates = reopenings = heuristic_calls = requeues = 0
+        peak_frontier = len(frontier)
+        result = None
         
         while frontier:
-            f_cost, g_cost, _, current_state, path = heapq.heappop(frontier)
+            f_cost, depth_key, _, current_state, key, scored = heapq.heappop(frontier)
+            g_cost = -depth_key if lazy else depth_key
             
             # Check if goal is reached
             if goal_condition(current_state):
-                return path
+                result = self._reconstruct(came_from, key)
+                break
             
-            # Skip if already processed with better cost
-            if current_state in closed:
+            # Skip if already processed, or superseded by a cheaper entry
+            known_g = g_costs[key]
+            if known_g == CLOSED or g_cost > known_g:
+                duplicates += 1
                 continue
+
+            # Lazy mode: score the node now; re-queue it if its real f is higher
+            if not scored:
+                heuristic_calls += 1
+                if stats is not None:
+                    h_start = time.perf_counter()
+                    h_cost = evaluate_heuristic(current_state)
+                    stats.heuristic_time += time.perf_counter() - h_start
+                else:
+                    h_cost = evaluate_heuristic(current_state)
+                if g_cost + h_cost > f_cost:
+                    requeues += 1
+                    heapq.heappush(frontier, (g_cost + h_cost, depth_key, state_counter, current_state, key, True))
+                    state_counter += 1
+                    continue
                 
-            closed.add(current_state)
+            g_costs[key] = CLOSED
+            expansions += 1
             
-            # Generate successors
-            for action in self._get_valid_actions(current_state):
-                successor_state = self.rules.get_successor_for_astar(current_state, action)
+            # Generate successors (one pass; ghosts moved once per parent)
+            for action, successor_state in self.rules.expand(current_state):
+                generations += 1
+                successor_key = pack_state(successor_state)
+                known_g = g_costs.get(successor_key)
                 
-                if successor_state in closed:
+                if known_g == CLOSED:
+                    duplicates += 1
                     continue
                     
-                # Calculate cost based on action type
-                if self._is_teleport_action(current_state.pacman.pos, action):
-                    new_g_cost = g_cost + 1  # Teleport cost is 1
-                else:
-                    new_g_cost = g_cost + 1  # Normal move cost is 1
-                
-                # Use the specified heuristic type
-                if self.heuristic_type == "maze_distance":
-                    new_h_cost = self.heuristics.maze_distance_heuristic(successor_state)
-                elif self.heuristic_type == "teleport_aware":
-                    new_h_cost = self.heuristics.teleport_aware_heuristic(successor_state)
-                elif self.heuristic_type == "tsp_maze":
-                    new_h_cost = self.heuristics.tsp_maze_heuristic(successor_state)
-                elif self.heuristic_type == "farthest_food_and_exit":
-                    new_h_cost = self.heuristics.farthest_food_and_exit_heuristic(successor_state)
-                else:
-                    new_h_cost = self.heuristics.maze_distance_heuristic(successor_state)
-                
-                new_f_cost = new_g_cost + new_h_cost
+                new_g_cost = g_cost + 1  # Normal moves and teleports both cost 1
                 
                 # Only add if we found a better path to this state
-                if successor_state not in g_costs or new_g_cost < g_costs[successor_state]:
-                    g_costs[successor_state] = new_g_cost
-                    new_path = path + [action]
-                    heapq.heappush(frontier, (new_f_cost, new_g_cost, state_counter, successor_state, new_path))
-                    state_counter += 1
-        
-        return None  # No path found
-    
-    def _get_valid_actions(self, state: GameState) -> List[Tuple[int, int]]:
-        """
-        Get all valid actions from current state.
-        Returns list of (dr, dc) tuples.
-        """
-        actions = []
-        pacman_pos = state.pacman.pos
-        
-        # Check all 4 directions
-        for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            new_pos = (pacman_pos[0] + dr, pacman_pos[1] + dc)
-            
-            # Check if move is valid (not into wall, unless in power mode)
-            if not self.rules.grid.is_wall(new_pos) or state.pacman.power_steps > 0:
-                actions.append((dr, dc))
-        
-        # Add teleport actions if at teleport corner
-        if self.rules.grid.is_teleport_corner(pacman_pos):
-            teleport_destinations = self.rules.grid.get_teleport_destinations(pacman_pos)
-            for dest in teleport_destinations:
-                # Add special teleport action (represented as large offset)
-                dr = dest[0] - pacman_pos[0]
-                dc = dest[1] - pacman_pos[1]
-                actions.append((dr, dc))
+                if known_g is not None and new_g_cost >= known_g:
+                    duplicates += 1
+                    continue
                 
-        return actions
-    
-    def _is_teleport_action(self, current_pos, action):
-        """
-        Kiểm tra xem action có phải là teleport không.
-        """
-        dr, dc = action
-        new_pos = (current_pos[0] + dr, current_pos[1] + dc)
+                if lazy:
+                    # Deferred: parent's f, raised by the cheap bound when one is configured
+                    new_f_cost = f_cost
+                    if evaluate_bound is not None:
+                        new_f_cost = max(f_cost, new_g_cost + evaluate_bound(successor_state))
+                else:
+                    # Use the specified heuristic type
+                    heuristic_calls += 1
+                    if stats is not None:
+                        h_start = time.perf_counter()
+                        new_h_cost = evaluate_heuristic(successor_state)
+                        stats.heuristic_time += time.perf_counter() - h_start
+                    else:
+                        new_h_cost = evaluate_heuristic(successor_state)
+                    new_f_cost = new_g_cost + new_h_cost
+                
+                if known_g is not None:
+                    reopenings += 1
+                g_costs[successor_key] = new_g_cost
+                came_from[successor_key] = (key, action)
+                heapq.heappush(frontier, (new_f_cost, -new_g_cost if lazy else new_g_cost, state_counter,
+                                          successor_state, successor_key, not lazy))
+                state_counter += 1
+                if len(frontier) > peak_frontier:
+                    peak_frontier = len(frontier)
         
-        # Nếu di chuyển đến góc teleport, đó là teleport action
-        return self.rules.grid.is_teleport_corner(new_pos)
+        if stats is None:
+            return result  # None if no path found
+
+        stats.expansions = expansions
+        stats.generations = generations
+        stats.duplicates = duplicates
+        stats.reopenings = reopenings
+        stats.peak_frontier = peak_frontier
+        stats.peak_closed = expansions
+        stats.heuristic_calls = heuristic_calls
+        stats.requeues = requeues
+        stats.cache_hits = self.heuristics.cache_hits - hits
+        stats.cache_misses = self.heuristics.cache_misses - misses
+        stats.path_length = len(result) if result is not None else None
+        stats.elapsed = time.perf_counter() - start_time
+        return result, stats
+
+    @staticmethod
+    def _reconstruct(came_from: Dict[int, Tuple[int, Tuple[int, int]]], key: int) -> List[Tuple[int, int]]:
+        """Follow parent pointers from key back to the start state."""
+        path = []
+        while key in came_from:
+            key, action = came_from[key]
+            path.append(action)
+        path.reverse()
+        return path
@@ -5,86 +5,166 @@ Implements proper state space formulation and FarthestFoodAndExit heuristic.
 """
 
 import heapq
-from collections import deque
-from typing import List, Tuple, Optional, Set, Dict, Any
+import time
+from typing import List, Tuple, Dict
 from pacman.core.state import GameState
-from pacman.core.entities import Pacman, Ghost
 from pacman.core.grid import Grid
 from pacman.core.rules import Rules
-from pacman.search.heuristics import Heuristics
+from pacman.core.simulator import ROTATION_INTERVAL
+from pacman.search.stats import SearchStats
+from pacman.search.heuristics import DistanceTables, resolve_key_heuristic
+from pacman.search.state_keys import StateKeyPacker
+
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # North, South, West, East
+INF = float('inf')
+CLOSED = -1  # g_costs value of an expanded state
 
 
 class AStarComplete:
     """
     Complete A* implementation with proper state space formulation.
-    State: (pacman_pos, food_set, ghost_states, pie_steps, step_count)
+    State: (pacman_pos, food_set, ghost_states, pie_steps, step_count, rotation)
+    
+    Maze rotations are modelled with a rotation index instead of rotating every
+    position: see _build_tables.
+    
+    heuristic: spec for heuristics.resolve_key_heuristic (a KEY_HEURISTICS name or
+    "max(a,b,...)"), evaluated on (pacman_pos, food_set) with canonical distances.
     """
     
-    def __init__(self, grid: Grid, rules: Rules):
+    def __init__(self, grid: Grid, rules: Rules, heuristic="farthest_food_and_exit"):
         self.grid = grid
         self.rules = rules
-        self.distance_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], int] = {}
-        self.heuristics = Heuristics(grid)
+        self.heuristic = heuristic
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.distance_tables = DistanceTables(grid, counters=self)
+        self._tables_key = None
         
-    def search(self, initial_state: GameState) -> Optional[List[Tuple[int, int]]]:
+    def search(self, initial_state: GameState, return_stats: bool = False):
         """
         Perform A* search to find optimal path.
         
+        Args:
+            initial_state: Starting game state
+            return_stats: If True, also return a SearchStats for this run
+        
         Returns:
-            List of actions (dr, dc) to reach goal, or None if no path exists
+            List of actions (dr, dc) to reach goal, or None if no path exists.
+            With return_stats=True: (path, SearchStats)
         """
-        # Convert GameState to tuple format for A* search
+        stats = SearchStats() if return_stats else None
+        if stats is not None:
+            start_time = time.perf_counter()
+            hits, misses = self.cache_hits, self.cache_misses
+
+        # Lookup tables for the current grid, then the start state in tuple format
+        self._build_tables(initial_state)
         initial_tuple_state = self._gamestate_to_tuple(initial_state)
+
+        # Packed int keys (see state_keys.py). The extra field is the interned phase of
+        # the step (_phase): states that differ only in absolute time merge.
+        packer = StateKeyPacker(self.cols, self.rows * self.cols, initial_tuple_state[1])
+        pack = packer.pack
+        intern = packer.intern
+        start_key = pack(initial_tuple_state[0], initial_tuple_state[3], initial_tuple_state[1],
+                         extra=intern(self._phase(initial_tuple_state)))
         
-        # Priority queue: (f_cost, g_cost, state_counter, state, path)
+        # Priority queue: (f_cost, g_cost, state_counter, state, key)
         state_counter = 0
-        frontier = [(0, 0, state_counter, initial_tuple_state, [])]
+        frontier = [(0, 0, state_counter, initial_tuple_state, start_key)]
         heapq.heapify(frontier)
         state_counter += 1
         
-        # Closed set to avoid revisiting states
-        closed: Set[Tuple] = set()
-        
-        # Track best g_cost for each state
-        g_costs = {initial_tuple_state: 0}
+        # Best g_cost per state key, or CLOSED once the state has been expanded
+        g_costs: Dict[int, int] = {start_key: 0}
+        # Parent pointers (key -> (parent key, action)) instead of a path per frontier entry
+        came_from: Dict[int, Tuple[int, Tuple[int, int]]] = {}
+
+        heuristic = self._heuristic
+
+        # Counters (cheap local ints; only copied into stats when requested)
+        expansions = generations = duplicates = reopenings = heuristic_calls = 0
+        peak_frontier = len(frontier)
+        result = None
         
         while frontier:
-            f_cost, g_cost, _, current_state, path = heapq.heappop(frontier)
+            f_cost, g_cost, _, current_state, key = heapq.heappop(frontier)
             
             # Check if goal is reached
             if self._is_goal_state(current_state):
-                return path
+                result = self._reconstruct(came_from, key)
+                break
             
-            # Skip if already processed with better cost
-            if current_state in closed:
+            # Skip if already processed, or superseded by a cheaper entry
+            known_g = g_costs[key]
+            if known_g == CLOSED or g_cost > known_g:
+                duplicates += 1
                 continue
                 
-            closed.add(current_state)
+            g_costs[key] = CLOSED
+            expansions += 1
             
-            # Generate successors
-            for successor_state, action, cost in self._get_successors(current_state):
-                if successor_state in closed:
+            # Generate successors (all at the same step, so they share one phase)
+            successors = self._get_successors(current_state)
+            if successors:
+                phase_id = intern(self._phase(successors[0][0]))
+            for successor_state, action, cost in successors:
+                generations += 1
+                successor_key = pack(successor_state[0], successor_state[3], successor_state[1],
+                                     extra=phase_id)
+                known_g = g_costs.get(successor_key)
+                if known_g == CLOSED:
+                    duplicates += 1
                     continue
                     
                 new_g_cost = g_cost + cost
                 
                 # Calculate heuristic
-                h_cost = self._calculate_heuristic(successor_state)
+                heuristic_calls += 1
+                if stats is not None:
+                    h_start = time.perf_counter()
+                    h_cost = heuristic(successor_state[0], successor_state[1])
+                    stats.heuristic_time += time.perf_counter() - h_start
+                else:
+                    h_cost = heuristic(successor_state[0], successor_state[1])
                 new_f_cost = new_g_cost + h_cost
                 
                 # Only add if we found a better path to this state
-                if successor_state not in g_costs or new_g_cost < g_costs[successor_state]:
-                    g_costs[successor_state] = new_g_cost
-                    new_path = path + [action]
-                    heapq.heappush(frontier, (new_f_cost, new_g_cost, state_counter, successor_state, new_path))
+                if known_g is None or new_g_cost < known_g:
+                    if known_g is not None:
+                        reopenings += 1
+                    g_costs[successor_key] = new_g_cost
+                    came_from[successor_key] = (key, action)
+                    heapq.heappush(frontier, (new_f_cost, new_g_cost, state_counter, successor_state, successor_key))
                     state_counter += 1
+                    if len(frontier) > peak_frontier:
+                        peak_frontier = len(frontier)
+                else:
+                    duplicates += 1
         
-        return None  # No path found
+        if stats is None:
+            return result  # None if no path found
+
+        stats.expansions = expansions
+        stats.generations = generations
+        stats.duplicates = duplicates
+        stats.reopenings = reopenings
+        stats.peak_frontier = peak_frontier
+        stats.peak_closed = expansions
+        stats.heuristic_calls = heuristic_calls
+        stats.cache_hits = self.cache_hits - hits
+        stats.cache_misses = self.cache_misses - misses
+        stats.path_length = len(result) if result is not None else None
+        stats.elapsed = time.perf_counter() - start_time
+        return result, stats
     
     def _gamestate_to_tuple(self, state: GameState) -> Tuple:
         """
         Convert GameState to tuple format for A* search.
-        State format: (pacman_pos, food_set, ghost_states, pie_steps, step_count)
+        State format: (pacman_pos, food_set, ghost_states, pie_steps, step_count, rotation)
+        Positions are in the canonical frame (the grid orientation when the search
+        starts); rotation is the number of maze rotations applied since then (mod 4).
         """
         pacman_pos = state.pacman.pos
         food_set = frozenset(state.food_left)
@@ -92,105 +172,117 @@ class AStarComplete:
         pie_steps = state.pacman.power_steps
         step_count = state.step_count
         
-        return (pacman_pos, food_set, ghost_states, pie_steps, step_count)
+        return (pacman_pos, food_set, ghost_states, pie_steps, step_count, 0)
     
-    def _tuple_to_gamestate(self, tuple_state: Tuple) -> GameState:
+    @staticmethod
+    def _phase(state: Tuple) -> Tuple:
         """
-        Convert tuple state back to GameState for processing.
+        Everything of a state that depends on time: ghosts, rotation, the step within
+        the rotation interval, and whether the step is 0 (never rotates). Successors
+        only depend on the step through these, so two states with equal positions,
+        food, power and phase are the same search state whatever their step_count.
         """
-        pacman_pos, food_set, ghost_states, pie_steps, step_count = tuple_state
-        
-        # Create Pacman object
-        pacman = Pacman(pacman_pos, power_steps=pie_steps)
-        
-        # Create Ghost objects
-        ghosts = []
-        for ghost_pos, ghost_direction in ghost_states:
-            ghosts.append(Ghost(ghost_pos, "red", ghost_direction))  # Default color
-        
-        return GameState(
-            pacman=pacman,
-            ghosts=tuple(ghosts),
-            food_left=food_set,
-            pies_left=frozenset(),  # Simplified for now
-            step_count=step_count
-        )
-    
+        step_count = state[4]
+        return state[2], state[5], step_count % ROTATION_INTERVAL, step_count > 0
+
+    @staticmethod
+    def _reconstruct(came_from: Dict[int, Tuple[int, Tuple[int, int]]], key: int) -> List[Tuple[int, int]]:
+        """Follow parent pointers from key back to the start state."""
+        path = []
+        while key in came_from:
+            key, action = came_from[key]
+            path.append(action)
+        path.reverse()
+        return path
+
     def _is_goal_state(self, state: Tuple) -> bool:
         """
         Check if state is a goal state.
         Goal: Pacman at exit gate AND no food left.
+        The exit does not move in the canonical frame, whatever the rotation.
         """
-        pacman_pos, food_set, _, _, _ = state
-        exit_pos = self._get_current_exit_pos(state[4])
-        
-        return pacman_pos == exit_pos and len(food_set) == 0
+        pacman_pos, food_set = state[0], state[1]
+        return pacman_pos == self.exit_pos and len(food_set) == 0
     
-    def _get_current_exit_pos(self, step_count: int) -> Tuple[int, int]:
-        """
-        Get current exit position considering maze rotation.
+    def _build_tables(self, initial_state: GameState):
         """
-        # Check if maze should rotate (every 30 steps)
-        if step_count % 30 == 0 and step_count > 0:
-            # Calculate rotated exit position
-            # This is a simplified version - in practice, you'd track rotation state
-            return self._rotate_position(self.grid.exitgate_pos, step_count // 30)
-        return self.grid.exitgate_pos
-    
-    def _rotate_position(self, pos: Tuple[int, int], rotation_count: int) -> Tuple[int, int]:
-        """
-        Rotate position by 90 degrees right, rotation_count times.
+        Build the lookup tables for the current grid, once per layout version.
+
+        Every position is kept in the canonical frame, so walls, exit, pies and maze
+        distances are rotation invariant and stored once. Only the mapping between the
+        displayed frame and the canonical frame depends on the rotation; it is
+        precomputed for the four rotations:
+            canonical_moves[k]:  list of (displayed action, canonical delta) for the 4 moves
+            ghost_moves[k]:      displayed ghost direction -> canonical delta
+            teleport_moves[k]:   corner -> list of (displayed action, canonical destination)
         """
-        r, c = pos
-        for _ in range(rotation_count % 4):  # 4 rotations = 360 degrees
-            r, c = c, self.grid.rows - 1 - r
-        return (r, c)
+        key = (id(self.grid), self.grid.layout_version, len(self.grid.wall_edits))
+        if key != self._tables_key:
+            rows, cols = self.grid.rows, self.grid.cols
+            self.rows, self.cols = rows, cols
+            self.walls = frozenset((r, c) for r in range(rows) for c in range(cols)
+                                   if self.grid.layout_list[r][c] == '%')
+            self.exit_pos = self.grid.exitgate_pos
+            corners = list(self.grid.teleport_corners)
+
+            self.canonical_moves = []
+            self.ghost_moves = []
+            self.teleport_moves = []
+            for k in range(4):
+                self.canonical_moves.append([(action, _to_canonical_vector(action, k))
+                                             for action in MOVES])
+                self.ghost_moves.append({vector: _to_canonical_vector(vector, k)
+                                         for vector in ((0, 1), (0, -1), (1, 0), (-1, 0))})
+                displayed = {corner: _to_display_pos(corner, k, rows, cols) for corner in corners}
+                self.teleport_moves.append({
+                    corner: [((displayed[dest][0] - displayed[corner][0], displayed[dest][1] - displayed[corner][1]), dest)
+                             for dest in corners if dest != corner]
+                    for corner in corners
+                })
+
+            self._heuristic = resolve_key_heuristic(self.heuristic, self.distance_tables.table, self.exit_pos)
+            self._tables_key = key
+        # Pies come from the state being searched (same frame as the grid)
+        self.pies = frozenset(initial_state.pies_left)
     
     def _get_successors(self, state: Tuple) -> List[Tuple[Tuple, Tuple[int, int], int]]:
         """
         Generate all valid successor states.
-        Returns list of (successor_state, action, cost) tuples.
+        Returns list of (successor_state, action, cost) tuples, where action is in the
+        displayed frame of the step it is taken in.
+        
+        Like Simulator.step, the maze rotates at the start of a step whose step_count
+        is a positive multiple of 30, before Pacman and the ghosts move.
         """
-        pacman_pos, food_set, ghost_states, pie_steps, step_count = state
+        pacman_pos, food_set, ghost_states, pie_steps, step_count, rotation = state
         successors = []
         
         # Calculate new step count
         new_step_count = step_count + 1
         
-        # Check for maze rotation
-        if new_step_count % 30 == 0:
-            # Apply rotation to all positions
-            pacman_pos = self._rotate_position(pacman_pos, 1)
-            food_set = frozenset(self._rotate_position(food, 1) for food in food_set)
-            ghost_states = tuple((self._rotate_position(ghost_pos, 1), ghost_dir) 
-                                for ghost_pos, ghost_dir in ghost_states)
+        # Check for maze rotation (only the rotation index changes)
+        if step_count > 0 and step_count % ROTATION_INTERVAL == 0:
+            rotation = (rotation + 1) % 4
         
         # Update ghost positions
-        new_ghost_states = self._update_ghost_positions(ghost_states)
+        new_ghost_states = self._update_ghost_positions(ghost_states, rotation)
         
         # Try all 4 directions + teleport
-        actions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # North, South, East, West
+        moves = self.canonical_moves[rotation]
+        if pacman_pos in self.teleport_moves[rotation]:
+            moves = moves + [(action, (dest[0] - pacman_pos[0], dest[1] - pacman_pos[1]))
+                             for action, dest in self.teleport_moves[rotation][pacman_pos]]
         
-        # Add teleport actions if at teleport corner
-        if self.grid.is_teleport_corner(pacman_pos):
-            teleport_destinations = self.grid.get_teleport_destinations(pacman_pos)
-            for dest in teleport_destinations:
-                dr = dest[0] - pacman_pos[0]
-                dc = dest[1] - pacman_pos[1]
-                actions.append((dr, dc))
-        
-        for action in actions:
-            dr, dc = action
+        for action, (dr, dc) in moves:
             new_pacman_pos = (pacman_pos[0] + dr, pacman_pos[1] + dc)
             
             # Check bounds
-            if not (0 <= new_pacman_pos[0] < self.grid.rows and 
-                   0 <= new_pacman_pos[1] < self.grid.cols):
+            if not (0 <= new_pacman_pos[0] < self.rows and 
+                   0 <= new_pacman_pos[1] < self.cols):
                 continue
             
             # Check wall collision
-            is_wall = self.grid.is_wall(new_pacman_pos)
-            if is_wall and pie_steps <= 0:
+            if new_pacman_pos in self.walls and pie_steps <= 0:
                 continue  # Cannot move through wall without pie
             
             # Check ghost collision
@@ -205,29 +297,33 @@ class AStarComplete:
                 new_food_set = new_food_set - {new_pacman_pos}
             
             # Check for magical pie
-            if new_pacman_pos in self.grid.initial_magical_pie:
+            if new_pacman_pos in self.pies:
                 new_pie_steps = 5  # Activate power mode
             elif new_pie_steps > 0:
                 new_pie_steps -= 1
             
             # Create new state
-            new_state = (new_pacman_pos, new_food_set, new_ghost_states, new_pie_steps, new_step_count)
+            new_state = (new_pacman_pos, new_food_set, new_ghost_states, new_pie_steps, new_step_count, rotation)
             successors.append((new_state, action, 1))  # All actions cost 1
         
         return successors
     
-    def _update_ghost_positions(self, ghost_states: Tuple) -> Tuple:
+    def _update_ghost_positions(self, ghost_states: Tuple, rotation: int) -> Tuple:
         """
         Update ghost positions based on their movement logic.
+        Ghost directions are kept in the displayed frame (ghosts always move
+        horizontally on screen) and mapped to the canonical frame per rotation.
         """
         new_ghost_states = []
+        ghost_moves = self.ghost_moves[rotation]
         
         for ghost_pos, ghost_direction in ghost_states:
             dr, dc = ghost_direction
-            new_ghost_pos = (ghost_pos[0], ghost_pos[1] + dc)  # Ghosts move horizontally only
+            move_r, move_c = ghost_moves[(0, dc)]  # Ghosts move horizontally only
+            new_ghost_pos = (ghost_pos[0] + move_r, ghost_pos[1] + move_c)
             
             # Check for wall collision
-            if self.grid.is_wall(new_ghost_pos):
+            if self._is_wall(new_ghost_pos):
                 # Reverse direction
                 new_direction = (dr, -dc)
                 new_ghost_pos = ghost_pos  # Stay in place
@@ -238,6 +334,10 @@ class AStarComplete:
         
         return tuple(new_ghost_states)
     
+    def _is_wall(self, pos: Tuple[int, int]) -> bool:
+        """Wall lookup in the canonical frame (outside the maze counts as wall)."""
+        return pos in self.walls or not (0 <= pos[0] < self.rows and 0 <= pos[1] < self.cols)
+    
     def _check_ghost_collision(self, pacman_pos: Tuple[int, int], ghost_states: Tuple) -> bool:
         """
         Check if Pacman collides with any ghost.
@@ -246,49 +346,20 @@ class AStarComplete:
             if pacman_pos == ghost_pos:
                 return True
         return False
-    
-    def _calculate_heuristic(self, state: Tuple) -> float:
-        """
-        Calculate heuristic using the FarthestFoodAndExit method.
-        """
-        # Convert tuple state to GameState for heuristic calculation
-        game_state = self._tuple_to_gamestate(state)
-        return self.heuristics.farthest_food_and_exit_heuristic(game_state)
-    
-    def _memoized_bfs_distance(self, start: Tuple[int, int], end: Tuple[int, int]) -> int:
-        """
-        Memoized BFS distance calculation.
-        """
-        cache_key = (start, end)
-        if cache_key in self.distance_cache:
-            return self.distance_cache[cache_key]
-        
-        if start == end:
-            self.distance_cache[cache_key] = 0
-            return 0
-        
-        # BFS to find shortest path
-        queue = deque([(start, 0)])
-        visited = {start}
-        
-        while queue:
-            pos, dist = queue.popleft()
-            
-            if pos == end:
-                self.distance_cache[cache_key] = dist
-                return dist
-            
-            # Check all 4 directions
-            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                new_pos = (pos[0] + dr, pos[1] + dc)
-                
-                if (new_pos not in visited and 
-                    0 <= new_pos[0] < self.grid.rows and 
-                    0 <= new_pos[1] < self.grid.cols and
-                    not self.grid.is_wall(new_pos)):
-                    visited.add(new_pos)
-                    queue.append((new_pos, dist + 1))
-        
-        # No path found
-        self.distance_cache[cache_key] = float('inf')
-        return float('inf')
+
+
+def _to_canonical_vector(vector: Tuple[int, int], rotation: int) -> Tuple[int, int]:
+    """Map a (dr, dc) vector of the frame rotated `rotation` times back to the canonical frame."""
+    dr, dc = vector
+    for _ in range(rotation):
+        dr, dc = -dc, dr
+    return dr, dc
+
+
+def _to_display_pos(pos: Tuple[int, int], rotation: int, rows: int, cols: int) -> Tuple[int, int]:
+    """Map a canonical position (rows x cols grid) to the frame rotated `rotation` times."""
+    r, c = pos
+    for _ in range(rotation):
+        r, c = c, rows - 1 - r
+        rows, cols = cols, rows
+    return (r, c)
@@ -2,14 +2,76 @@
 """
 Heuristic functions for A* search in Pacman.
 Includes h1 (BFS), h2 (MST), FarthestFoodAndExit, and distance caching.
+
+Heuristics are looked up by name through a registry and resolved to a single
+callable once per engine, instead of dispatching on the name for every successor:
+
+    STATE_HEURISTICS  name -> Heuristics method taking a GameState (AStarSearch)
+    KEY_HEURISTICS    name -> function h(pos, food_left, table, exit_pos) on the
+                      compact state key, where table(source) returns the maze
+                      distances from source. Engines with their own tuple states
+                      (AStarComplete, SafeIntervalPlanner, MacroPlanner) use these directly.
+    DistanceTables    the one provider of those per-source tables; Heuristics and
+                      the planners above each own one for their grid.
+
+A heuristic spec is a name, "max(a,b,...)" or a list of names; several names are
+composed with max(), which stays admissible when every part is admissible.
 """
 
 from pacman.core.state import GameState
 from pacman.core.grid import Grid
-from typing import Dict, Tuple, Set, Optional
+from typing import Callable, Dict, List, Tuple, Set, Optional
 import heapq
 from collections import deque
 
+INF = float('inf')
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # North, South, West, East
+
+
+class DistanceTables:
+    """
+    Per-source maze distance tables for one grid (one BFS per source, cached).
+
+    The cache is dropped when the layout is replaced (layout_version) or a wall is
+    eaten (wall_edits), so distances always match the grid's current walls.
+    Hits and misses are counted on `counters` (any object with cache_hits and
+    cache_misses, e.g. the owning engine), or on the provider itself.
+    """
+
+    def __init__(self, grid: Grid, counters=None):
+        self.grid = grid
+        self.counters = counters if counters is not None else self
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._tables: Dict[Tuple[int, int], Dict[Tuple[int, int], int]] = {}
+        self._key = None
+
+    def table(self, source: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        """Maze distances from source to every reachable cell."""
+        grid = self.grid
+        key = (grid.layout_version, len(grid.wall_edits))
+        if key != self._key:
+            self._key = key
+            self._tables = {}
+        table = self._tables.get(source)
+        if table is not None:
+            self.counters.cache_hits += 1
+            return table
+        self.counters.cache_misses += 1
+
+        table = {source: 0}
+        queue = deque([source])
+        while queue:
+            pos = queue.popleft()
+            dist = table[pos] + 1
+            for dr, dc in MOVES:
+                new_pos = (pos[0] + dr, pos[1] + dc)
+                if new_pos not in table and not grid.is_wall(new_pos):
+                    table[new_pos] = dist
+                    queue.append(new_pos)
+        self._tables[source] = table
+        return table
+
 
 class Heuristics:
     """
@@ -21,12 +83,17 @@ class Heuristics:
         self.distance_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], int] = {}
         # Global cache for BFS distances (from heuristic.py)
         self._distance_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], int] = {}
+        # BFS distance cache counters (read by the search engines for SearchStats)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Per-source distance tables for KEY_HEURISTICS (hits/misses counted here)
+        self._distance_tables = DistanceTables(grid, counters=self)
         
     def maze_distance_heuristic(self, state: GameState) -> int:
         """
         Custom maze distance heuristic using BFS-based pathfinding.
         Considers avoiding ghosts and using magical pies for wall eating.
-        This is admissible and consistent since it uses actual shortest paths in the maze.
+        Not admissible: the ghost penalty can exceed the true cost (see heuristic_analysis.md).
         """
         pacman_pos = state.pacman.pos
         
@@ -76,7 +143,7 @@ class Heuristics:
         """
         Traveling Salesman Problem-based heuristic using maze distances.
         Estimates the minimum cost to collect all remaining food using MST.
-        This is admissible and consistent.
+        Not admissible: the nearest-food edge is added on top of the MST (see heuristic_analysis.md).
         """
         pacman_pos = state.pacman.pos
         
@@ -193,7 +260,9 @@ class Heuristics:
         """
         cache_key = (start, goal)
         if cache_key in self.distance_cache:
+            self.cache_hits += 1
             return self.distance_cache[cache_key]
+        self.cache_misses += 1
         
         # BFS to find shortest path
         queue = deque([(start, 0)])
@@ -344,7 +413,9 @@ class Heuristics:
         """
         cache_key = (start, end)
         if cache_key in self._distance_cache:
+            self.cache_hits += 1
             return self._distance_cache[cache_key]
+        self.cache_misses += 1
         
         if start == end:
             self._distance_cache[cache_key] = 0
@@ -375,6 +446,13 @@ class Heuristics:
         self._distance_cache[cache_key] = float('inf')
         return float('inf')
     
+    def distance_table(self, source: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        """
+        Maze distances from source to every reachable cell (see DistanceTables).
+        Used by the KEY_HEURISTICS when they run on GameStates.
+        """
+        return self._distance_tables.table(source)
+
     def _get_current_exit_pos(self, step_count: int) -> Tuple[int, int]:
         """
         Get the current exit position considering maze rotation.
@@ -393,3 +471,169 @@ class Heuristics:
             r, c = c, self.grid.rows - 1 - r
         
         return (r, c)
+
+
+def farthest_food_and_exit_key(pos, food_left, table, exit_pos) -> float:
+    """
+    FarthestFoodAndExit on a state key: max(distance to the farthest food,
+    distance from the closest food to the exit).
+    """
+    to_exit = table(exit_pos)
+    if not food_left:
+        return to_exit.get(pos, INF)
+    from_pacman = table(pos)
+    dist_to_farthest_food = max(from_pacman.get(food, INF) for food in food_left)
+    dist_from_food_to_exit = min(to_exit.get(food, INF) for food in food_left)
+    return max(dist_to_farthest_food, dist_from_food_to_exit)
+
+
+def food_to_exit_key(pos, food_left, table, exit_pos) -> float:
+    """Distance to the exit through the food that makes that detour longest."""
+    to_exit = table(exit_pos)
+    if not food_left:
+        return to_exit.get(pos, INF)
+    return max(table(food).get(pos, INF) + to_exit.get(food, INF) for food in food_left)
+
+
+def nearest_food_key(pos, food_left, table, exit_pos) -> float:
+    """BFS distance to the nearest food (h1), or to the exit when no food is left."""
+    if not food_left:
+        return table(exit_pos).get(pos, INF)
+    from_pacman = table(pos)
+    return min(from_pacman.get(food, INF) for food in food_left)
+
+
+def mst_key(pos, food_left, table, exit_pos) -> float:
+    """Weight of the minimum spanning tree over Pacman and the remaining food (h2)."""
+    if not food_left:
+        return 0
+    return _mst_cost([pos] + list(food_left), table)
+
+
+def mst_exit_key(pos, food_left, table, exit_pos) -> float:
+    """
+    Weight of the minimum spanning tree over Pacman, the remaining food and the exit:
+    every route that eats all food and ends at the exit is such a spanning tree.
+    """
+    return _mst_cost([pos] + list(food_left) + [exit_pos], table)
+
+
+def tsp_maze_key(pos, food_left, table, exit_pos) -> float:
+    """MST over Pacman and the food plus the distance to the nearest food."""
+    if not food_left:
+        return table(exit_pos).get(pos, INF)
+    return _mst_cost([pos] + list(food_left), table) + nearest_food_key(pos, food_left, table, exit_pos)
+
+
+def _mst_cost(positions: List[Tuple[int, int]], table) -> float:
+    """Prim's algorithm on the complete graph of maze distances (O(n^2))."""
+    best = {position: INF for position in positions[1:]}
+    current = positions[0]
+    cost = 0
+    while best:
+        distances = table(current)
+        for position in best:
+            dist = distances.get(position, INF)
+            if dist < best[position]:
+                best[position] = dist
+        current = min(best, key=best.get)
+        cost += best.pop(current)
+    return cost
+
+
+# name -> Heuristics method taking a GameState
+STATE_HEURISTICS = {
+    "maze_distance": "maze_distance_heuristic",
+    "teleport_aware": "teleport_aware_heuristic",
+    "tsp_maze": "tsp_maze_heuristic",
+    "farthest_food_and_exit": "farthest_food_and_exit_heuristic",
+    "bfs_distance": "bfs_distance",
+    "mst": "mst_heuristic",
+}
+
+# name -> module function h(pos, food_left, table, exit_pos) (looked up by name at
+# resolve time, so a profiler patching the module function still sees the calls)
+KEY_HEURISTICS = {
+    "farthest_food_and_exit": "farthest_food_and_exit_key",
+    "food_to_exit": "food_to_exit_key",
+    "bfs_distance": "nearest_food_key",
+    "tsp_maze": "tsp_maze_key",
+    "mst": "mst_key",
+    "mst_exit": "mst_exit_key",
+}
+
+
+def heuristic_names(spec) -> List[str]:
+    """Heuristic names in a spec: "name", "max(a,b,...)" or a list/tuple of names."""
+    if isinstance(spec, str):
+        spec = spec.strip()
+        if spec.startswith("max(") and spec.endswith(")"):
+            names = [name.strip() for name in spec[4:-1].split(",")]
+        else:
+            names = [spec]
+    else:
+        names = list(spec)
+    if not names:
+        raise ValueError("Empty heuristic spec")
+    for name in names:
+        if name not in STATE_HEURISTICS and name not in KEY_HEURISTICS:
+            raise ValueError(f"Unknown heuristic: {name}")
+    return names
+
+
+def max_heuristic(functions: List[Callable]) -> Callable:
+    """Pointwise max of heuristics sharing one signature."""
+    if len(functions) == 1:
+        return functions[0]
+
+    def composed(*args):
+        value = functions[0](*args)
+        for function in functions[1:]:
+            other = function(*args)
+            if other > value:
+                value = other
+        return value
+
+    return composed
+
+
+def resolve_heuristic(spec, heuristics: Heuristics) -> Callable[[GameState], float]:
+    """
+    Resolve a spec to one callable h(state) on GameStates. Names with a Heuristics
+    method use it; key-only names run on the state's (pos, food_left).
+    """
+    functions = []
+    for name in heuristic_names(spec):
+        if name in STATE_HEURISTICS:
+            functions.append(getattr(heuristics, STATE_HEURISTICS[name]))
+        else:
+            functions.append(_on_game_state(globals()[KEY_HEURISTICS[name]], heuristics))
+    return max_heuristic(functions)
+
+
+def resolve_key_heuristic(spec, table, exit_pos) -> Callable[[Tuple[int, int], frozenset], float]:
+    """
+    Resolve a spec to one callable h(pos, food_left) for engines with compact
+    state keys. table(source) must return maze distances in the same frame as exit_pos.
+    """
+    functions = []
+    for name in heuristic_names(spec):
+        if name not in KEY_HEURISTICS:
+            raise ValueError(f"Heuristic {name!r} needs a full GameState")
+        functions.append(_bind_key_heuristic(globals()[KEY_HEURISTICS[name]], table, exit_pos))
+    return max_heuristic(functions)
+
+
+def _bind_key_heuristic(function, table, exit_pos):
+    def heuristic(pos, food_left):
+        return function(pos, food_left, table, exit_pos)
+    return heuristic
+
+
+def _on_game_state(function, heuristics: Heuristics):
+    grid = heuristics.grid
+    table = heuristics.distance_table
+
+    def heuristic(state):
+        return function(state.pacman.pos, state.food_left, table, grid.exitgate_pos)
+    return heuristic
@@ -0,0 +1,234 @@
+# pacman/search/macro_planner.py
+"""
+Two-level macro-action planner for the full goal: eat all food, then reach the exit.
+
+Top level: A* over macro states (target, food left). The target is the cell Pacman
+stands on after a leg (the start, a food cell or the exit); the food left is packed
+into the state key as a bitmask (StateKeyPacker). A macro action is a whole leg to
+one remaining food, or to the exit once no food is left, and costs the maze distance
+between the two cells (one BFS table per source). The default heuristic, "mst_exit",
+is the MST over the target, the food left and the exit. It is a lower bound on every
+leg sequence and consistent, so the food ordering is optimal for the distances. The
+top level has at most (food + 2) * 2^food states, whatever the size of the maze.
+
+Low level: the legs of the chosen ordering are filled in with a BFS over
+(cell, ghost phase) that checks the ghost schedule (GhostDangerMap) at every step, so
+a leg may detour or double back to let a ghost pass. Safety comes from the same
+SafetyWindow as SafeIntervalPlanner (see danger_map.py), so past the next maze
+rotation legs are plain BFS paths and the caller replans in the rotated frame.
+
+Simplifications forced by the game rules:
+- Teleports are not planned, and food on a teleport corner, which walking onto the
+  corner does not eat, makes the goal unreachable for this planner.
+- Magical pies are not targets: walls are never eaten, so a detour to a pie can only
+  make the plan longer. Pies on the way are still eaten.
+- Leg costs ignore the ghosts, so the filled-in plan can be longer than the top-level
+  cost when a leg has to wait for a ghost.
+"""
+
+import heapq
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from pacman.core.danger_map import GhostDangerMap
+from pacman.core.grid import Grid
+from pacman.core.simulator import ROTATION_INTERVAL
+from pacman.core.state import GameState
+from pacman.search.heuristics import DistanceTables, resolve_key_heuristic
+from pacman.search.state_keys import StateKeyPacker
+from pacman.search.stats import SearchStats
+
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # North, South, West, East
+INF = float('inf')
+CLOSED = -1  # g_costs value of an expanded macro state
+
+
+class MacroPlanner:
+    """
+    Top-level A* over (target, food left), with ghost-checked BFS legs.
+
+    heuristic: spec for heuristics.resolve_key_heuristic, evaluated on
+    (target, food_left) with the planner's maze distance tables.
+    """
+
+    def __init__(self, grid: Grid, heuristic="mst_exit"):
+        self.grid = grid
+        self.heuristic = heuristic
+        self.danger_map = None
+        self.safety = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.corners = frozenset()
+        self.distance_tables = DistanceTables(grid, counters=self)
+        self._tables_key = None
+
+    def search(self, initial_state: GameState, return_stats: bool = False):
+        """
+        Plan from initial_state: every food, then the exit gate.
+
+        Args:
+            initial_state: Starting game state (ghosts define phase 0)
+            return_stats: If True, also return a SearchStats for this run
+                (expansions etc. count macro states of the top-level search)
+
+        Returns:
+            List of actions (dr, dc), or None if no plan exists.
+            With return_stats=True: (path, SearchStats)
+        """
+        stats = SearchStats() if return_stats else None
+        if stats is not None:
+            start_time = time.perf_counter()
+            hits, misses = self.cache_hits, self.cache_misses
+
+        self._prepare(initial_state)
+        exit_pos = self.grid.exitgate_pos
+        start = initial_state.pacman.pos
+        food = frozenset(initial_state.food_left)
+        heuristic = self._heuristic
+
+        packer = StateKeyPacker(self.grid.cols, self.grid.rows * self.grid.cols, food)
+        start_key = packer.pack(start, 0, food)
+        g_costs: Dict[int, int] = {start_key: 0}  # Best leg-distance sum, or CLOSED
+        came_from: Dict[int, Tuple[int, Tuple[int, int]]] = {}  # key -> (parent key, target)
+        counter = 0
+        # Food on a teleport corner cannot be eaten by walking: no plan
+        frontier = [] if food & self.corners else [(heuristic(start, food), 0, counter, start, food, start_key)]
+
+        expansions = generations = duplicates = reopenings = 0
+        heuristic_calls = 1
+        peak_frontier = 1
+        targets = None
+
+        while frontier:
+            _, g_cost, _, target, food_left, key = heapq.heappop(frontier)
+            if target == exit_pos and not food_left:
+                targets = self._reconstruct(came_from, key)
+                break
+            known_g = g_costs[key]
+            if known_g == CLOSED or g_cost > known_g:
+                duplicates += 1
+                continue
+            g_costs[key] = CLOSED
+            expansions += 1
+
+            distances = self.distance_tables.table(target)
+            for next_target in food_left or (exit_pos,):
+                generations += 1
+                distance = distances.get(next_target)
+                if distance is None:
+                    continue  # Unreachable
+                next_food = food_left - {next_target} if food_left else food_left
+                successor_key = packer.pack(next_target, 0, next_food)
+                known_g = g_costs.get(successor_key)
+                if known_g == CLOSED:
+                    duplicates += 1
+                    continue
+                new_g_cost = g_cost + distance
+                if known_g is not None and new_g_cost >= known_g:
+                    duplicates += 1
+                    continue
+                heuristic_calls += 1
+                h_cost = heuristic(next_target, next_food)
+                if h_cost == INF:
+                    continue
+                if known_g is not None:
+                    reopenings += 1
+                g_costs[successor_key] = new_g_cost
+                came_from[successor_key] = (key, next_target)
+                counter += 1
+                heapq.heappush(frontier, (new_g_cost + h_cost, new_g_cost, counter,
+                                          next_target, next_food, successor_key))
+                if len(frontier) > peak_frontier:
+                    peak_frontier = len(frontier)
+
+        result = self._fill_legs(start, targets) if targets is not None else None
+
+        if stats is None:
+            return result
+
+        stats.expansions = expansions
+        stats.generations = generations
+        stats.duplicates = duplicates
+        stats.reopenings = reopenings
+        stats.peak_frontier = peak_frontier
+        stats.peak_closed = expansions
+        stats.heuristic_calls = heuristic_calls
+        stats.cache_hits = self.cache_hits - hits
+        stats.cache_misses = self.cache_misses - misses
+        stats.path_length = len(result) if result is not None else None
+        stats.elapsed = time.perf_counter() - start_time
+        return result, stats
+
+    def _prepare(self, initial_state: GameState):
+        """Per-layout heuristic and corners, and the ghost safety window of this search."""
+        grid = self.grid
+        key = (id(grid), grid.layout_version, len(grid.wall_edits))
+        if key != self._tables_key:
+            self._tables_key = key
+            self.corners = frozenset(grid.teleport_corners)
+            self._heuristic = resolve_key_heuristic(self.heuristic, self.distance_tables.table, grid.exitgate_pos)
+
+        self.danger_map = GhostDangerMap.for_state(grid, initial_state, self.danger_map)
+        self.safety = self.danger_map.safety_window(initial_state, ROTATION_INTERVAL)
+
+    def _fill_legs(self, start: Tuple[int, int], targets: List[Tuple[int, int]]) -> Optional[List[Tuple[int, int]]]:
+        """Concatenate the safe legs start -> targets[0] -> targets[1] -> ..."""
+        path = []
+        pos, phase = start, 0
+        for target in targets:
+            leg = self._leg(pos, target, phase)
+            if leg is None:
+                return None
+            actions, phase = leg
+            path.extend(actions)
+            pos = target
+        return path
+
+    def _leg(self, start: Tuple[int, int], goal: Tuple[int, int], phase: int):
+        """
+        Shortest safe leg from start to goal, leaving at ghost phase `phase`: never enters
+        a cell while a ghost is there or about to move there. BFS over (cell, phase);
+        phases past the horizon are merged, so the search stays finite.
+        Returns (actions, phase on arrival), or None.
+        """
+        if start == goal:
+            return [], phase
+        safety = self.safety
+        horizon = safety.horizon
+        corners = self.corners
+        start_node = (start, min(phase, horizon))
+        came_from = {start_node: None}
+        queue = deque([(start, phase)])
+        while queue:
+            pos, t = queue.popleft()
+            node = (pos, min(t, horizon))
+            for dr, dc in MOVES:
+                next_pos = (pos[0] + dr, pos[1] + dc)
+                if self.grid.is_wall(next_pos) or not safety.is_safe(next_pos, t):
+                    continue
+                # The ghosts do not move while Pacman waits in a teleport corner
+                next_t = t if next_pos in corners else t + 1
+                next_node = (next_pos, min(next_t, horizon))
+                if next_node in came_from:
+                    continue
+                came_from[next_node] = (node, (dr, dc))
+                if next_pos == goal:
+                    actions = []
+                    while came_from[next_node] is not None:
+                        next_node, action = came_from[next_node]
+                        actions.append(action)
+                    actions.reverse()
+                    return actions, next_t
+                queue.append((next_pos, next_t))
+        return None
+
+    @staticmethod
+    def _reconstruct(came_from: Dict[int, Tuple[int, Tuple[int, int]]], key: int) -> List[Tuple[int, int]]:
+        """Targets of the macro actions from the start to key."""
+        targets = []
+        while key in came_from:
+            key, target = came_from[key]
+            targets.append(target)
+        targets.reverse()
+        return targets
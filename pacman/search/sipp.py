@@ -0,0 +1,234 @@
+# pacman/search/sipp.py
+"""
+Safe Interval Path Planning (SIPP) around the deterministic ghost schedules.
+
+Ghosts bounce horizontally and only move when Pacman moves, so their positions
+are a fixed schedule indexed by the ghost phase (see GhostDangerMap). For every
+cell the planner computes its safe intervals once per search: maximal runs of
+phases in which Pacman may enter the cell (no ghost there at that phase or the
+next one). A* then searches (cell, safe interval) states, keeping the earliest
+arrival in each interval, so every plan it returns is collision-free by
+construction instead of being patched after planning.
+
+Differences from textbook SIPP, forced by the game rules:
+- There is no wait action (a blocked move leaves the ghosts where they are).
+  Waiting is done by shuttling to a safe neighbour and back: two steps, two
+  ghost phases. Since waits are not free, keeping only the earliest arrival per
+  interval can miss plans that need an odd delay; it never yields an unsafe one.
+- Entering a teleport corner does not advance the ghost phase (see
+  danger_map.py). Teleports themselves are not planned.
+- Walls are never eaten: a wall eaten with a magical pie changes the ghost
+  schedule.
+- The maze rotates every ROTATION_INTERVAL steps, which invalidates the
+  schedule. Safety is checked through a SafetyWindow, up to the next rotation
+  (the horizon); the caller replans in the rotated frame.
+"""
+
+import heapq
+import time
+from typing import List, Optional, Tuple
+
+from pacman.core.danger_map import GhostDangerMap
+from pacman.core.grid import Grid
+from pacman.core.simulator import ROTATION_INTERVAL
+from pacman.core.state import GameState
+from pacman.search.heuristics import DistanceTables, resolve_key_heuristic
+from pacman.search.stats import SearchStats
+
+MOVES = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # North, South, West, East
+INF = float('inf')
+
+
+class SafeIntervalPlanner:
+    """
+    SIPP over the ghost schedule of the current maze frame.
+    State: (pacman_pos, safe_interval_index, food_left); g = steps, plus the
+    ghost phase of the earliest arrival.
+
+    heuristic: spec for heuristics.resolve_key_heuristic. Waits only add steps,
+    so plain maze distances stay admissible.
+    """
+
+    def __init__(self, grid: Grid, heuristic="food_to_exit"):
+        self.grid = grid
+        self.heuristic = heuristic
+        self.danger_map = None
+        self.safety = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.corners = frozenset()
+        self.distance_tables = DistanceTables(grid, counters=self)
+        self._tables_key = None
+
+    def search(self, initial_state: GameState, collect_food: bool = True, return_stats: bool = False):
+        """
+        Find a collision-free plan from initial_state to the exit gate.
+
+        Args:
+            initial_state: Starting game state (ghosts define phase 0)
+            collect_food: If True, all food must be eaten before reaching the exit
+            return_stats: If True, also return a SearchStats for this run
+
+        Returns:
+            List of actions (dr, dc), or None if no safe plan exists.
+            With return_stats=True: (path, SearchStats)
+        """
+        stats = SearchStats() if return_stats else None
+        if stats is not None:
+            start_time = time.perf_counter()
+            hits, misses = self.cache_hits, self.cache_misses
+
+        self._prepare(initial_state)
+        exit_pos = self.grid.exitgate_pos
+        corners = self.corners
+        start = initial_state.pacman.pos
+        food = frozenset(initial_state.food_left) if collect_food else frozenset()
+
+        start_key = (start, self._interval_index(start, 0), food)
+        came_from = {start_key: None}  # key -> (parent key, actions)
+        best = {start_key: (0, 0)}  # key -> (steps, phase) of the earliest arrival
+        closed = set()
+        counter = 0
+        frontier = [(self._heuristic(start, food), 0, counter, 0, start_key)]
+
+        expansions = generations = duplicates = reopenings = heuristic_calls = 0
+        peak_frontier = 1
+        result = None
+
+        while frontier:
+            _, steps, _, phase, key = heapq.heappop(frontier)
+            pos, _, food_left = key
+            if pos == exit_pos and not food_left:
+                result = self._reconstruct(came_from, key)
+                break
+            if key in closed or best[key] != (steps, phase):
+                duplicates += 1  # Closed, or superseded by an earlier arrival
+                continue
+            closed.add(key)
+            expansions += 1
+
+            for dr, dc in MOVES:
+                next_pos = (pos[0] + dr, pos[1] + dc)
+                if self.grid.is_wall(next_pos):
+                    continue
+                in_corner = next_pos in corners
+                for index, entry, waits in self._departures(pos, phase, next_pos):
+                    generations += 1
+                    successor_key = (next_pos, index,
+                                     food_left - {next_pos} if not in_corner and next_pos in food_left else food_left)
+                    if successor_key in closed:
+                        duplicates += 1
+                        continue
+                    # The ghosts do not move while Pacman waits in a teleport corner
+                    arrival = (steps + len(waits) + 1, entry if in_corner else entry + 1)
+                    known = best.get(successor_key)
+                    if known is not None and known <= arrival:
+                        duplicates += 1
+                        continue
+                    heuristic_calls += 1
+                    h_cost = self._heuristic(next_pos, successor_key[2])
+                    if h_cost == INF:
+                        continue
+                    if known is not None:
+                        reopenings += 1
+                    best[successor_key] = arrival
+                    came_from[successor_key] = (key, waits + ((dr, dc),))
+                    counter += 1
+                    heapq.heappush(frontier, (arrival[0] + h_cost, arrival[0], counter, arrival[1], successor_key))
+                    if len(frontier) > peak_frontier:
+                        peak_frontier = len(frontier)
+
+        if stats is None:
+            return result
+
+        stats.expansions = expansions
+        stats.generations = generations
+        stats.duplicates = duplicates
+        stats.reopenings = reopenings
+        stats.peak_frontier = peak_frontier
+        stats.peak_closed = len(closed)
+        stats.heuristic_calls = heuristic_calls
+        stats.cache_hits = self.cache_hits - hits
+        stats.cache_misses = self.cache_misses - misses
+        stats.path_length = len(result) if result is not None else None
+        stats.elapsed = time.perf_counter() - start_time
+        return result, stats
+
+    def safe_intervals(self, pos: Tuple[int, int]) -> List[Tuple[int, float]]:
+        """
+        Safe intervals [(first, last), ...] of pos, as ghost phases relative to the
+        start of the current search. The last interval always ends at INF.
+        """
+        intervals = self._intervals.get(pos)
+        if intervals is not None:
+            return intervals
+        intervals = []
+        first = None
+        safety = self.safety
+        for phase in range(safety.horizon):
+            if safety.is_safe(pos, phase):
+                if first is None:
+                    first = phase
+            elif first is not None:
+                intervals.append((first, phase - 1))
+                first = None
+        intervals.append((safety.horizon if first is None else first, INF))
+        self._intervals[pos] = intervals
+        return intervals
+
+    def _prepare(self, initial_state: GameState):
+        """Bind the heuristic for the layout, then the safety window of this search."""
+        grid = self.grid
+        key = (id(grid), grid.layout_version, len(grid.wall_edits))
+        if key != self._tables_key:
+            self._tables_key = key
+            self.corners = frozenset(grid.teleport_corners)
+            self._heuristic = resolve_key_heuristic(self.heuristic, self.distance_tables.table, grid.exitgate_pos)
+
+        self.danger_map = GhostDangerMap.for_state(grid, initial_state, self.danger_map)
+        self.safety = self.danger_map.safety_window(initial_state, ROTATION_INTERVAL)
+        self._intervals = {}
+
+    def _interval_index(self, pos: Tuple[int, int], phase: int) -> Optional[int]:
+        for index, (first, last) in enumerate(self.safe_intervals(pos)):
+            if first <= phase <= last:
+                return index
+        return None
+
+    def _departures(self, pos: Tuple[int, int], phase: int, next_pos: Tuple[int, int]):
+        """
+        Yield (interval index, entry phase, wait actions) for every safe interval of
+        next_pos that Pacman can enter from pos, at the earliest phase reachable by
+        shuttling from pos (starting at `phase`).
+        """
+        waits = ()
+        for index, (first, last) in enumerate(self.safe_intervals(next_pos)):
+            if last < phase:
+                continue
+            while phase < first:
+                shuttle = self._shuttle(pos, phase)
+                if shuttle is None:
+                    return
+                waits += shuttle
+                phase += 1 if pos in self.corners else 2
+            if phase <= last:
+                yield index, phase, waits
+
+    def _shuttle(self, pos: Tuple[int, int], phase: int):
+        """Two actions that step to a safe neighbour and back at this phase, or None."""
+        if not self.safety.is_safe(pos, phase + 1):
+            return None
+        for dr, dc in MOVES:
+            neighbour = (pos[0] + dr, pos[1] + dc)
+            if (neighbour not in self.corners and not self.grid.is_wall(neighbour) and
+                    self.safety.is_safe(neighbour, phase)):
+                return (dr, dc), (-dr, -dc)
+        return None
+
+    @staticmethod
+    def _reconstruct(came_from, key) -> List[Tuple[int, int]]:
+        segments = []
+        while came_from[key] is not None:
+            key, actions = came_from[key]
+            segments.append(actions)
+        return [action for actions in reversed(segments) for action in actions]
@@ -0,0 +1,97 @@
+# pacman/search/state_keys.py
+"""
+Packed integer keys for search states.
+
+The closed/g tables of the A* engines used to be keyed by whole states (GameState
+objects or tuples holding frozensets and ghost tuples), which keeps every explored
+state alive for the whole search. A StateKeyPacker turns a state into one int:
+
+    [ extra | pies mask | food mask | waiting | power steps | position index ]
+
+- position index: r * cols + c
+- power steps:    POWER_BITS bits (Rules never sets more than 5)
+- waiting:        1 bit, Pacman stopped in a teleport corner
+- food / pies:    one bit per item of the start state (items are only ever eaten)
+- extra:          unbounded top field owned by the engine, e.g. an interned ghost
+                  configuration id (see intern) or a step count
+
+Two states get the same key exactly when the fields they are packed from are equal,
+so a search keyed by packed ints visits the same states in the same order.
+Keys of a packer are only comparable with keys of the same packer (one per search).
+
+Only the closed/g tables and the parent pointers shrink: frontier entries still carry
+their state until popped, so the frontier costs as much as before, and interned ghost
+configurations stay alive until the search ends. The packer itself remembers only the
+last food/pies set it packed, not every set it has seen.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+POWER_BITS = 3
+
+
+class StateKeyPacker:
+    """Packs (position, power, food, pies, extra) into one int for one search."""
+
+    def __init__(self, cols: int, cells: int, food: Iterable[Tuple[int, int]],
+                 pies: Iterable[Tuple[int, int]] = ()):
+        self.cols = cols
+        self._food_bits = {pos: 1 << i for i, pos in enumerate(sorted(food))}
+        self._pie_bits = {pos: 1 << i for i, pos in enumerate(sorted(pies))}
+        self._power_shift = max(1, cells - 1).bit_length()
+        self._waiting_shift = self._power_shift + POWER_BITS
+        self._food_shift = self._waiting_shift + 1
+        self._pies_shift = self._food_shift + len(self._food_bits)
+        self._extra_shift = self._pies_shift + len(self._pie_bits)
+        self._last_food = [None, 0]  # [last food set packed, its mask]
+        self._last_pies = [None, 0]
+        self._ids: Dict[object, int] = {}
+        self._last_ghosts = None
+        self._last_ghosts_id = 0
+
+    def pack(self, pos: Tuple[int, int], power: int, food: frozenset,
+             pies: frozenset = frozenset(), extra: int = 0, waiting: bool = False) -> int:
+        """Key of one state. food/pies must be subsets of the start state's items."""
+        return (pos[0] * self.cols + pos[1]
+                | power << self._power_shift
+                | waiting << self._waiting_shift
+                | self._mask(food, self._food_bits, self._last_food) << self._food_shift
+                | self._mask(pies, self._pie_bits, self._last_pies) << self._pies_shift
+                | extra << self._extra_shift)
+
+    def pack_state(self, state) -> int:
+        """Key of a GameState, with the ghost configuration interned into extra."""
+        pacman = state.pacman
+        ghosts = state.ghosts
+        if ghosts is not self._last_ghosts:
+            # Successors of one parent share their ghost tuple: intern it once
+            self._last_ghosts = ghosts
+            self._last_ghosts_id = self.intern(tuple((ghost.pos, ghost.direction) for ghost in ghosts))
+        return self.pack(pacman.pos, pacman.power_steps, state.food_left, state.pies_left,
+                         self._last_ghosts_id, pacman.waiting_for_teleport)
+
+    def intern(self, value) -> int:
+        """Small dense id for a hashable value (0, 1, 2, ... in order of first use)."""
+        ids = self._ids
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(ids)
+        return value_id
+
+    @staticmethod
+    def _mask(items: frozenset, bits: Dict[Tuple[int, int], int], last: List) -> int:
+        """
+        Bitmask of items. last holds the previous [set, mask]: siblings share their
+        parent's food/pies set object, so one entry catches most calls without
+        keeping old sets alive.
+        """
+        if not items:
+            return 0
+        if items is last[0]:
+            return last[1]
+        mask = 0
+        for pos in items:
+            mask |= bits[pos]
+        last[0] = items
+        last[1] = mask
+        return mask
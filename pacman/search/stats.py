@@ -0,0 +1,75 @@
+# pacman/search/stats.py
+"""
+Search statistics collected by the A* engines.
+Pass return_stats=True to AStarSearch.search / AStarComplete.search to get them.
+"""
+
+from typing import Dict
+
+
+class SearchStats:
+    """
+    Counters for a single search run.
+
+    expansions:        states popped from the frontier and expanded
+    generations:       successor states generated
+    duplicates:        generated or popped states that were already closed / not improved
+    reopenings:        already-seen open states re-queued because a cheaper path was found
+    peak_frontier:     largest frontier (heap) size
+    peak_closed:       largest closed-set size
+    heuristic_calls:   heuristic evaluations
+    requeues:          popped nodes re-queued because their deferred heuristic raised f (lazy A*)
+    heuristic_time:    seconds spent in the heuristic
+    cache_hits/misses: BFS distance cache lookups inside the heuristic
+    elapsed:           total search time in seconds
+    """
+
+    def __init__(self):
+        self.expansions = 0
+        self.generations = 0
+        self.duplicates = 0
+        self.reopenings = 0
+        self.peak_frontier = 0
+        self.peak_closed = 0
+        self.heuristic_calls = 0
+        self.requeues = 0
+        self.heuristic_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.elapsed = 0.0
+        self.path_length = None
+
+    @property
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """Average number of successors generated per expansion."""
+        return self.generations / self.expansions if self.expansions else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'expansions': self.expansions,
+            'generations': self.generations,
+            'duplicates': self.duplicates,
+            'reopenings': self.reopenings,
+            'peak_frontier': self.peak_frontier,
+            'peak_closed': self.peak_closed,
+            'heuristic_calls': self.heuristic_calls,
+            'requeues': self.requeues,
+            'heuristic_time': self.heuristic_time,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_rate': self.cache_hit_rate,
+            'elapsed': self.elapsed,
+            'path_length': self.path_length,
+        }
+
+    def __repr__(self):
+        return (f"SearchStats(expansions={self.expansions}, generations={self.generations}, "
+                f"duplicates={self.duplicates}, reopenings={self.reopenings}, "
+                f"peak_frontier={self.peak_frontier}, peak_closed={self.peak_closed}, "
+                f"heuristic_calls={self.heuristic_calls}, heuristic_time={self.heuristic_time:.4f}s, "
+                f"cache_hit_rate={self.cache_hit_rate:.1%}, elapsed={self.elapsed:.4f}s)")
@@ -2,9 +2,10 @@ import pygame
 import sys
 import os
 from pacman.core.grid import Grid
-from pacman.core.rules import Rules
-from pacman.core.state import GameState
-from pacman.ui.renderer import Renderer
+from pacman.core.simulator import Simulator
+from pacman.core.replay import ReplayRecorder
+from pacman.ui.renderer import Renderer, window_size, maze_surface
+from pacman.ui.text_cache import render_text
 
 from pacman.agents.manual_agent import ManualAgent
 from pacman.agents.auto_agent import AutoAgent
@@ -15,6 +16,10 @@ YELLOW = (255, 255, 0)
 WHITE = (255, 255, 255)
 BLUE = (0, 0, 255)
 
+DEFAULT_STEP_RATE = 60 # Số bước/giây nếu agent không khai báo step_rate
+MAX_CATCHUP_STEPS = 5 # Số bước tối đa bù lại trong một vòng lặp khi bị chậm
+UNTHROTTLED_BATCH = 256 # Số bước tối đa giữa hai lần xử lý event ở chế độ không giới hạn
+
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "assets")
 
 class ModeSelectionScreen:
@@ -67,7 +72,7 @@ class ModeSelectionScreen:
         color = self.hover_color if is_hover else self.button_color
         pygame.draw.rect(self.screen, color, rect, border_radius=15)
         pygame.draw.rect(self.screen, self.white, rect, 3, border_radius=15)
-        text_surface = self.font_button.render(text, True, self.text_color)
+        text_surface = render_text(self.font_button, text, self.text_color)
         self.screen.blit(text_surface, text_surface.get_rect(center=rect.center))
 
     def run(self):
@@ -110,7 +115,7 @@ class ModeSelectionScreen:
 
 
             # Tiêu đề
-            title_surface = self.font_title.render("PACMAN", True, self.button_color)
+            title_surface = render_text(self.font_title, "PACMAN", self.button_color)
             self.screen.blit(title_surface, title_surface.get_rect(center=(self.screen_width//2, 60)))
 
             # Nút
@@ -118,38 +123,54 @@ class ModeSelectionScreen:
             self.draw_button(self.button_auto, " Auto Mode", hover_auto)
 
             # Ghi chú nhỏ
-            note = self.font_note.render("Press ESC to exit", True, (180, 180, 180))
+            note = render_text(self.font_note, "Press ESC to exit", (180, 180, 180))
             self.screen.blit(note, note.get_rect(center=(self.screen_width//2, 480)))
 
             pygame.display.flip()
             clock.tick(60)
 
 class GameEngine:
-    def __init__(self, layout_file, agent_class):
+    def __init__(self, layout_file, agent_class, record_path=None, dirty_rects=False,
+                 sim_rate=None, render_rate=None, render_every=1, planner='astar'):
+        """
+        sim_rate: số bước mô phỏng mỗi giây (None = theo agent.step_rate,
+                  0 = không giới hạn - chạy nhanh nhất có thể).
+        render_rate: số frame vẽ tối đa mỗi giây (None = bằng sim_rate).
+        render_every: ở chế độ không giới hạn, vẽ sau mỗi N bước (0 = không vẽ
+                      cho tới khi ván chơi kết thúc).
+        planner: planner của AutoAgent ('astar', 'sipp' hoặc 'macro', xem AutoAgent).
+        """
         try:
             print(f"Initializing game with layout: {layout_file}")
             
-            # Khởi tạo Grid và GameState
-            self.grid = Grid(layout_file)
+            # Khởi tạo Simulator (Grid, Rules, GameState) - phần logic không phụ thuộc pygame
+            self.simulator = Simulator(Grid(layout_file))
+            # Chơi tương tác: in sự kiện (teleport, replan...) ra terminal như trước
+            self.rules.events.echo = True
             print(f"Grid loaded: {self.grid.rows}x{self.grid.cols}")
-
-            self.initial_ghosts = tuple() # TODO: Khởi tạo trạng thái ban đầu của Ghosts
-            self.game_state = GameState.get_initial_state(self.grid)        
             print(f"Game state initialized")
 
+            # Ghi replay (tùy chọn) để tái hiện ván chơi mà không cần chạy lại planner
+            if record_path:
+                self.simulator.recorder = ReplayRecorder(record_path, self.grid)
+                print(f"Recording replay to {record_path}")
+
+            # Dirty-rect: chỉ vẽ lại và cập nhật các ô thay đổi thay vì cả màn hình
+            self.dirty_rects = dirty_rects
+
             # Cấu hình màn hình
             self.screen_width = self.grid.cols * CELL_SIZE
             self.screen_height = (self.grid.rows + 2) * CELL_SIZE
             print(f"Screen size: {self.screen_width}x{self.screen_height}")
             
-            self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+            # Cửa sổ vuông tạo một lần, đủ chứa mê cung ở mọi hướng xoay;
+            # mê cung được vẽ vào subsurface ở giữa cửa sổ
+            self.window = pygame.display.set_mode(window_size(self.grid))
+            self.screen = maze_surface(self.window, self.grid)
+            self._window_dirty = True # Cần flip toàn cửa sổ (lề quanh mê cung thay đổi)
             pygame.display.set_caption("Pacman")
             print("Screen created successfully")
 
-            # Khởi tạo Rules
-            self.rules = Rules(self.grid)
-            print("Rules initialized")
-            
             # Khởi tạo Renderer
             self.renderer = Renderer(self.screen, self.grid)
             print("Renderer initialized")
@@ -158,14 +179,18 @@ class GameEngine:
             if agent_class.__name__ == 'AutoAgent':
                 # Allow choosing heuristic type for AutoAgent
                 heuristic_type = "tsp_maze"  # Default to best heuristic
-                self.agent = agent_class(self.grid, self.rules, heuristic_type)
-                print(f"AutoAgent using {heuristic_type} heuristic")
+                self.agent = agent_class(self.grid, self.rules, heuristic_type, planner=planner)
+                print(f"AutoAgent using {planner} planner ({heuristic_type} heuristic)")
             else:
                 self.agent = agent_class()
             print(f"Agent initialized: {agent_class.__name__}")
             
-            self.game_status = 'running' # 'running', 'win', 'lose'
             self.clock = pygame.time.Clock()
+
+            # Tốc độ mô phỏng và tốc độ vẽ tách rời nhau (fixed timestep)
+            self.sim_rate = sim_rate if sim_rate is not None else getattr(self.agent, 'step_rate', DEFAULT_STEP_RATE)
+            self.render_rate = render_rate or self.sim_rate or DEFAULT_STEP_RATE
+            self.render_every = render_every
             print("Game initialization completed successfully")
             
         except Exception as e:
@@ -174,6 +199,23 @@ class GameEngine:
             traceback.print_exc()
             raise e
 
+    @property
+    def grid(self):
+        return self.simulator.grid
+
+    @property
+    def rules(self):
+        return self.simulator.rules
+
+    @property
+    def game_state(self):
+        return self.simulator.game_state
+
+    @property
+    def game_status(self):
+        """'running', 'win', 'lose'"""
+        return self.simulator.game_status
+
     def _update_screen_after_rotation(self):
         """
         Cập nhật màn hình sau khi mê cung bị xoay.
@@ -182,9 +224,10 @@ class GameEngine:
         self.screen_width = self.grid.cols * CELL_SIZE
         self.screen_height = (self.grid.rows + 2) * CELL_SIZE
         
-        # Tạo màn hình mới với kích thước mới
-        self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("Pacman")
+        # Không tạo lại cửa sổ: chỉ xóa lề và lấy subsurface mới theo kích thước mới
+        self.window.fill(BLACK)
+        self.screen = maze_surface(self.window, self.grid)
+        self._window_dirty = True
         
         # Cập nhật renderer với grid mới và screen mới
         self.renderer.update_grid(self.grid)
@@ -195,27 +238,31 @@ class GameEngine:
             Tải lại game về trạng thái ban đầu.
             """
             print("Resetting game...")
-            # Reset mê cung về trạng thái ban đầu (không xoay)
-            self.grid.reset_to_initial_state()
-            
-            # Tạo lại state ban đầu
-            self.game_state = GameState.get_initial_state(self.grid)
+            # Reset mê cung (không xoay), GameState và trạng thái game
+            self.simulator.reset()
             
-            # Cập nhật tham chiếu grid cho rules và renderer
-            self.rules.grid = self.grid
+            # Cập nhật tham chiếu grid cho renderer
             self.renderer.grid = self.grid
             
             # Cập nhật màn hình sau khi reset
             self._update_screen_after_rotation()
-            
-            # Reset các biến trạng thái game
-            self.game_status = 'running'
-            
-            # Reset biến xoay mê cung
-            if hasattr(self, '_last_rotation_step'):
-                delattr(self, '_last_rotation_step')
 
     def run(self):
+        try:
+            return self._run_loop()
+        finally:
+            if self.simulator.recorder is not None:
+                self.simulator.recorder.close()
+
+    def _run_loop(self):
+        # Bộ tích lũy thời gian (ms) cho bước mô phỏng và frame vẽ;
+        # khởi tạo đầy để bước và frame đầu tiên chạy ngay
+        step_ms = 1000.0 / self.sim_rate if self.sim_rate else 0
+        render_ms = 1000.0 / self.render_rate
+        sim_time = step_ms
+        render_time = render_ms
+        steps_since_render = 0
+
         running = True
         while running:
                         
@@ -238,97 +285,73 @@ class GameEngine:
                     self.agent.process_event(event)
 
             # --- Cập nhật Logic Game (Transition) ---
-            if self.game_status == 'running': 
-                self.renderer.update_animation() 
-                self.renderer.update_animation_magical_pie()
-                self.renderer.update_teleport_animation() 
-
-                # --- LẤY HÀNH ĐỘNG TỪ AGENT (SAU KHI ĐÃ XỬ LÝ EVENTS) ---
-                action = self.agent.get_action(self.game_state)
-                
-                # --- KIỂM TRA VA CHẠM TRƯỚC KHI DI CHUYỂN ---
-                # LUÔN LUÔN kiểm tra va chạm - bất cứ khi nào chạm Ghost đều thua
-                if action:
-                    pacman_pos = self.game_state.pacman.pos
-                    dr, dc = action
-                    new_pacman_pos = (pacman_pos[0] + dr, pacman_pos[1] + dc)
-                    
-                    # Kiểm tra va chạm với từng Ghost
-                    for ghost in self.game_state.ghosts:
-                        # Tính toán vị trí mới của Ghost (nếu Ghost di chuyển)
-                        new_ghost = ghost.get_updated_state(self.grid)
-                        new_ghost_pos = new_ghost.pos
-                        
-                        # Kiểm tra các trường hợp va chạm (LUÔN LUÔN):
-                        # 1. Pacman di chuyển đến vị trí hiện tại của Ghost
-                        if new_pacman_pos == ghost.pos:
-                            self.game_status = 'lose'
-                            break
-                        # 2. Cả hai di chuyển đến cùng một vị trí
-                        elif new_pacman_pos == new_ghost_pos:
-                            self.game_status = 'lose'
-                            break
-                
-                # --- KIỂM TRA XOAY MÊ CUNG (sau mỗi 30 bước) ---
-                if self.game_status != 'lose':
-                    step_count = self.game_state.step_count
-                    # Chỉ xoay khi step_count vừa đạt bội số của 30 và chưa xoay lần này
-                    if step_count > 0 and step_count % 30 == 0 and (not hasattr(self, '_last_rotation_step') or self._last_rotation_step != step_count):
-                        try:
-                            # Lưu kích thước cũ để tính toán xoay
-                            old_rows = self.grid.rows
-                            old_cols = self.grid.cols
-                            
-                            # Xoay mê cung
-                            self.grid.rotate_90_degrees_right()
-                            
-                            # Xoay tất cả các vị trí entities
-                            self.game_state = self.rules._rotate_entity_positions(self.game_state, old_rows, old_cols)
-                            
-                            # Cập nhật màn hình sau khi xoay
-                            self._update_screen_after_rotation()
-                            
-                            # Đánh dấu đã xoay ở step này
-                            self._last_rotation_step = step_count
-                            
-                        except Exception as e:
-                            print(f"Error rotating maze at step {step_count}: {e}")
-                
-                # --- XỬ LÝ TELEPORTATION SELECTION ---
-                if hasattr(self.agent, 'teleport_choice') and self.agent.teleport_choice is not None:
-                    if self.game_state.pacman.waiting_for_teleport:
-                        self.game_state = self.rules.handle_teleport_selection(self.game_state, self.agent.teleport_choice)
-                        self.agent.teleport_choice = None  # Reset choice
-                
-                # --- APPLY ACTION: Dùng Rules để tính GameState tiếp theo ---
-                if action and self.game_status != 'lose':
-                    old_cols = self.grid.cols
-                    old_rows = self.grid.rows
-                    
-                    self.game_state = self.rules.get_successor(self.game_state, action)
-                    
-                    # Kiểm tra xem mê cung có bị xoay không
-                    if self.grid.cols != old_cols or self.grid.rows != old_rows:
-                        self._update_screen_after_rotation()
-                            
-                    # --- KIỂM TRA VA CHẠM SAU KHI DI CHUYỂN (BACKUP CHECK) ---
-                    # LUÔN LUÔN kiểm tra va chạm - bất cứ khi nào chạm Ghost đều thua
-                    if self.game_status != 'lose':
-                        pacman_pos = self.game_state.pacman.pos
-                        for ghost in self.game_state.ghosts:
-                            if ghost.pos == pacman_pos:
-                                self.game_status = 'lose'
-                                break
-
-                    # Nếu chưa thua, kiểm tra thắng
-                    if self.game_status != 'lose':
-                        food_left = len(self.game_state.food_left) 
-                        at_exit = self.game_state.pacman.pos == self.grid.exitgate_pos
-                        
-                        if food_left <= 0 and at_exit: # Điều kiện thắng 
-                            self.game_status = 'win'
+            if self.game_status == 'running' and not self.sim_rate:
+                # Không giới hạn: chạy liên tục, chỉ vẽ sau mỗi render_every bước
+                batch = self.render_every or UNTHROTTLED_BATCH
+                for _ in range(batch):
+                    self._step_simulation()
+                    steps_since_render += 1 # Chỉ đếm các bước đã thực sự chạy
+                    if self.game_status != 'running':
+                        break
+                should_render = self.game_status != 'running' or \
+                    (self.render_every and steps_since_render >= self.render_every)
+            else:
+                steps = 0
+                while self.game_status == 'running' and sim_time >= step_ms and steps < MAX_CATCHUP_STEPS:
+                    self._step_simulation()
+                    sim_time -= step_ms
+                    steps += 1
+                if steps == MAX_CATCHUP_STEPS:
+                    sim_time = 0 # Bị chậm quá nhiều: bỏ phần thời gian còn nợ
+                should_render = render_time >= render_ms
+                if should_render:
+                    render_time %= render_ms # Không vẽ bù các frame đã lỡ
 
             # --- VẼ ---
+            if should_render:
+                steps_since_render = 0
+                self._render_frame()
+
+            # Điều chỉnh tốc độ vòng lặp theo tốc độ mô phỏng/vẽ
+            if self.sim_rate and self.game_status == 'running':
+                elapsed = self.clock.tick(max(self.sim_rate, self.render_rate))
+            elif self.sim_rate or self.game_status != 'running':
+                elapsed = self.clock.tick(self.render_rate)
+            else:
+                elapsed = self.clock.tick()
+            sim_time += elapsed
+            render_time += elapsed
+        
+        # Trả về 'quit' nếu vòng lặp bị phá vỡ
+        return 'quit'
+
+    def _step_simulation(self):
+        """Một bước mô phỏng: lấy hành động từ agent rồi chuyển cho Simulator."""
+        # --- LẤY HÀNH ĐỘNG TỪ AGENT (SAU KHI ĐÃ XỬ LÝ EVENTS) ---
+        action = self.agent.get_action(self.game_state)
+        teleport_choice = getattr(self.agent, 'teleport_choice', None)
+
+        # --- Va chạm, xoay mê cung, teleport, di chuyển, thắng/thua ---
+        self.simulator.step(action, teleport_choice)
+
+        if self.simulator.teleport_used:
+            self.agent.teleport_choice = None  # Reset choice
+
+        # Cập nhật màn hình nếu mê cung vừa xoay
+        if self.simulator.rotated:
+            self._update_screen_after_rotation()
+
+    def _render_frame(self):
+        """Vẽ một frame (hoạt ảnh chỉ chạy khi ván chơi đang diễn ra)."""
+        if self.game_status == 'running':
+            self.renderer.update_animation() 
+            self.renderer.update_animation_magical_pie()
+            self.renderer.update_teleport_animation() 
+
+        if self.dirty_rects and self.game_status == 'running' and not self._window_dirty:
+            pygame.display.update(self.renderer.draw_dirty(self.game_state))
+        else:
+            self._window_dirty = False
             self.renderer.draw_all(self.game_state)
 
             if self.game_status == 'win': 
@@ -337,12 +360,3 @@ class GameEngine:
                 self.renderer.draw_lose_screen()
 
             pygame.display.flip() 
-            
-            # Điều chỉnh tốc độ dựa trên loại agent
-            if hasattr(self.agent, 'heuristic_type'):  # AutoAgent
-                self.clock.tick(10) # 10 FPS = 0.1 giây cho mỗi bước)
-            else:  # ManualAgent
-                self.clock.tick(60)  # 60 FPS cho manual 
-        
-        # Trả về 'quit' nếu vòng lặp bị phá vỡ
-        return 'quit'
\ No newline at end of file
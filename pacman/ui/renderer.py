@@ -2,6 +2,8 @@ import pygame
 import os
 import sys
 
+from pacman.ui.text_cache import render_text
+
 CELL_SIZE = 20
 BLACK = (0, 0, 0)
 BLUE = (0, 0, 255)
@@ -12,6 +14,30 @@ DARK_BLUE = (10, 20, 40)
 # Màu tường fallback nếu không có texture
 WALL_BLUE = (30, 60, 120)
 ANIMATION_SPEED = 10 
+PACMAN_DIRECTIONS = (0, 90, 180, 270)
+
+# Cache sprite dùng chung cho mọi Renderer, theo CELL_SIZE:
+# {CELL_SIZE: {'pacman': {(frame, direction): Surface}, 'pie': {alpha: Surface}, 'teleport': {alpha: Surface}}}
+# Không phụ thuộc screen nên vẫn dùng được sau update_screen() khi mê cung xoay.
+_SPRITE_CACHE = {}
+
+
+def window_size(grid):
+    """
+    Kích thước cửa sổ vuông (cạnh = chiều lớn nhất của mê cung, cộng 2 hàng HUD),
+    đủ chứa mê cung ở mọi hướng xoay nên không cần tạo lại cửa sổ khi xoay.
+    """
+    side = max(grid.rows, grid.cols) * CELL_SIZE
+    return side, side + 2 * CELL_SIZE
+
+
+def maze_surface(window, grid):
+    """Subsurface của window đúng bằng kích thước mê cung hiện tại (kèm HUD), đặt ở giữa cửa sổ."""
+    width = grid.cols * CELL_SIZE
+    height = (grid.rows + 2) * CELL_SIZE
+    x = (window.get_width() - width) // 2
+    y = (window.get_height() - height) // 2
+    return window.subsurface((x, y, width, height))
 
 class Renderer:
     def __init__(self, screen, grid):
@@ -29,6 +55,7 @@ class Renderer:
         self.font_small = pygame.font.Font(None, 36)
         self.font_medium = pygame.font.Font(None, 48)
         self.font_large = pygame.font.Font(None, 74)
+        self.font_tiny = pygame.font.Font(None, 16) # Chữ "T" trên góc teleport
 
         # Biến hoạt ảnh và hiệu ứng
         self.current_idle_frame = 0
@@ -45,6 +72,20 @@ class Renderer:
         self.teleport_min_alpha = 100
         self.teleport_max_alpha = 255
         self.teleport_color = (0, 255, 255)  # Cyan color for teleportation
+
+        # Sprite dựng sẵn (Pacman đã xoay, bánh và góc teleport theo từng mức alpha)
+        self.sprites = self._build_sprite_cache()
+
+        # Nền tĩnh (màu nền + tường) được vẽ sẵn một lần, chỉ vá lại khi ăn tường
+        # hoặc vẽ lại toàn bộ khi mê cung xoay/reset
+        self._background = None
+        self._background_version = None
+        self._background_edits = 0
+
+        # Dirty-rect: trạng thái đã vẽ ở frame trước, để chỉ vẽ lại các ô thay đổi
+        self._prev_state = None
+        self._force_full_redraw = True
+        self._patched_cells = []
     
     def _update_screen_dimensions(self):
         """
@@ -59,12 +100,15 @@ class Renderer:
         """
         self.grid = new_grid
         self._update_screen_dimensions()
+        self._background = None
+        self._force_full_redraw = True
         
     def update_screen(self, new_screen):
         """
         Cập nhật screen mới sau khi xoay mê cung.
         """
         self.screen = new_screen
+        self._force_full_redraw = True
         
     def _load_ghost_images(self, colors):
         """
@@ -155,6 +199,100 @@ class Renderer:
             # Trả về None nếu không tải được, sẽ fallback về màu xanh
             return None
         
+    def _build_sprite_cache(self):
+        """
+        Dựng sẵn mọi sprite cần cho vòng lặp vẽ: các frame idle của Pacman x 4 hướng,
+        bánh ma thuật và góc teleport cho mỗi mức alpha của hiệu ứng fade.
+        Cache dùng chung theo CELL_SIZE, chỉ dựng một lần.
+        """
+        sprites = _SPRITE_CACHE.get(CELL_SIZE)
+        if sprites is None:
+            sprites = {'pacman': {}, 'pie': {}, 'teleport': {}}
+            for frame, image in enumerate(self.pacman_idle_images):
+                for direction in PACMAN_DIRECTIONS:
+                    sprites['pacman'][(frame, direction)] = pygame.transform.rotate(image, direction)
+            for alpha in range(self.min_alpha, self.max_alpha + 1):
+                sprites['pie'][alpha] = self._make_pie_sprite(alpha)
+            for alpha in range(self.teleport_min_alpha, self.teleport_max_alpha + 1):
+                sprites['teleport'][alpha] = self._make_teleport_sprite(alpha)
+            _SPRITE_CACHE[CELL_SIZE] = sprites
+        return sprites
+
+    def _make_pie_sprite(self, alpha):
+        """Bánh ma thuật với độ trong suốt alpha."""
+        temp_surface = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        current_color = (*self.food_color_rgb, alpha)
+        circle_center_on_surface = (CELL_SIZE // 2, CELL_SIZE // 2)
+        pygame.draw.circle(temp_surface, current_color, circle_center_on_surface, CELL_SIZE // 3)
+        return temp_surface
+
+    def _make_teleport_sprite(self, alpha):
+        """Góc teleport (hình tròn, viền và chữ "T") với độ trong suốt alpha."""
+        # Tạo surface với alpha để có hiệu ứng fade
+        temp_surface = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+        current_color = (*self.teleport_color, alpha)
+
+        # Vẽ hình tròn với hiệu ứng fade
+        center = (CELL_SIZE // 2, CELL_SIZE // 2)
+        pygame.draw.circle(temp_surface, current_color, center, CELL_SIZE // 3)
+
+        # Vẽ viền để làm nổi bật
+        pygame.draw.circle(temp_surface, (255, 255, 255, 200), center, CELL_SIZE // 3, 2)
+
+        # Vẽ chữ "T" để chỉ teleport
+        text_surface = render_text(self.font_tiny, "T", (255, 255, 255, 255))
+        text_rect = text_surface.get_rect(center=center)
+        temp_surface.blit(text_surface, text_rect)
+        return temp_surface
+
+    def _get_sprite(self, kind, key, make):
+        """Lấy sprite từ cache; dựng và lưu lại nếu chưa có (giá trị ngoài dải dựng sẵn)."""
+        sprite = self.sprites[kind].get(key)
+        if sprite is None:
+            sprite = self.sprites[kind][key] = make()
+        return sprite
+
+    def _build_background(self):
+        """Vẽ màu nền và toàn bộ tường vào một Surface dùng lại cho mọi frame."""
+        background = pygame.Surface((self.screen_width, self.screen_height)).convert()
+        background.fill(DARK_BLUE)
+        offset_y = 2 * CELL_SIZE
+        for r in range(self.grid.rows):
+            for c in range(self.grid.cols):
+                if self.grid.layout_list[r][c] == '%': # Tường
+                    self._draw_wall_tile(background, r, c, offset_y)
+        self._background = background
+        self._background_version = self.grid.layout_version
+        self._background_edits = len(self.grid.wall_edits)
+
+    def _draw_wall_tile(self, surface, r, c, offset_y):
+        """Vẽ một ô tường, dùng texture nếu có, fallback về màu nếu không."""
+        draw_x = c * CELL_SIZE
+        draw_y = r * CELL_SIZE + offset_y
+        if self.wall_texture:
+            surface.blit(self.wall_texture, (draw_x, draw_y))
+        else:
+            pygame.draw.rect(surface, WALL_BLUE, (draw_x, draw_y, CELL_SIZE, CELL_SIZE))
+
+    def _get_background(self):
+        """
+        Trả về nền tĩnh đã cache. Tạo lại nếu layout bị thay thế (xoay, reset);
+        nếu chỉ có vài ô tường bị ăn thì chỉ vá đúng các ô đó
+        (các ô đã vá được lưu trong self._patched_cells).
+        """
+        self._patched_cells = []
+        if (self._background is None or self._background_version != self.grid.layout_version or
+                self._background.get_size() != (self.screen_width, self.screen_height)):
+            self._build_background()
+            self._force_full_redraw = True
+        elif len(self.grid.wall_edits) > self._background_edits:
+            offset_y = 2 * CELL_SIZE
+            self._patched_cells = self.grid.wall_edits[self._background_edits:]
+            for r, c in self._patched_cells:
+                self._background.fill(DARK_BLUE, (c * CELL_SIZE, r * CELL_SIZE + offset_y, CELL_SIZE, CELL_SIZE))
+            self._background_edits = len(self.grid.wall_edits)
+        return self._background
+
     def update_animation(self):
         """Cập nhật khung hình hoạt ảnh của Pacman."""
         self.animation_counter += 1
@@ -180,84 +318,18 @@ class Renderer:
         """Hàm tổng hợp để vẽ mọi thứ dựa trên GameState hiện tại."""
         try:
             # Đảm bảo screen được cập nhật đúng kích thước
-            if hasattr(self, 'screen') and self.screen is not None:
-                # Sử dụng màu nền mới thay vì đen
-                self.screen.fill(DARK_BLUE)
-            else:
+            if not hasattr(self, 'screen') or self.screen is None:
                 print("Error: Screen is None!")
                 return
                 
             offset_y = 2 * CELL_SIZE
             
-            # --- 1. Vẽ Tường (Maze) với texture ---
-            wall_count = 0
-            for r in range(self.grid.rows):
-                for c in range(self.grid.cols):
-                    if self.grid.layout_list[r][c] == '%': # Tường
-                        draw_x = c * CELL_SIZE
-                        draw_y = r * CELL_SIZE + offset_y
-                        
-                        # Sử dụng texture nếu có, fallback về màu nếu không
-                        if self.wall_texture:
-                            self.screen.blit(self.wall_texture, (draw_x, draw_y))
-                        else:
-                            pygame.draw.rect(self.screen, WALL_BLUE, (draw_x, draw_y, CELL_SIZE, CELL_SIZE))
-                        wall_count += 1
+            # --- 1. Nền + Tường (Maze): một lần blit từ nền đã cache ---
+            self.screen.blit(self._get_background(), (0, 0))
             
             
-            # --- 2. Vẽ Thức ăn (Food) với màu sáng hơn ---
-            for r, c in game_state.food_left:
-                center_x = c * CELL_SIZE + CELL_SIZE // 2
-                center_y = r * CELL_SIZE + CELL_SIZE // 2 + offset_y
-                # Sử dụng màu vàng sáng cho thức ăn
-                pygame.draw.circle(self.screen, YELLOW, (center_x, center_y), CELL_SIZE // 6)
-
-            # --- 3. Vẽ Bánh ma thuật (Magical Pies) với hiệu ứng fade ---
-            for r, c in game_state.pies_left:
-                temp_surface = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
-                current_color = (*self.food_color_rgb, self.food_alpha)
-                circle_center_on_surface = (CELL_SIZE // 2, CELL_SIZE // 2)
-                pygame.draw.circle(temp_surface, current_color, circle_center_on_surface, CELL_SIZE // 3)
-                
-                blit_pos_x = c * CELL_SIZE
-                blit_pos_y = r * CELL_SIZE + offset_y
-                self.screen.blit(temp_surface, (blit_pos_x, blit_pos_y))
-                
-            # --- 4. Vẽ Cổng thoát (Exit Gate) ---
-            if len(game_state.food_left) <= 0 and self.grid.exitgate_pos and self.exitgate_image:
-                r, c = self.grid.exitgate_pos
-                draw_x = c * CELL_SIZE
-                draw_y = r * CELL_SIZE + offset_y
-                self.screen.blit(self.exitgate_image, (draw_x, draw_y))
-                
-            # --- 5. Vẽ Pacman với hoạt ảnh và xoay ---
-            if self.pacman_idle_images:
-                # Lấy Pacman object từ state
-                pacman = game_state.pacman 
-                r, c = pacman.pos
-                pacman_direction = pacman.direction # <-- LẤY HƯỚNG TỪ STATE
-                
-                image_to_rotate = self.pacman_idle_images[self.current_idle_frame]
-                rotated_image = pygame.transform.rotate(image_to_rotate, pacman_direction)
-                
-                draw_x = c * CELL_SIZE
-                draw_y = r * CELL_SIZE + offset_y
-                rect = rotated_image.get_rect(center=(draw_x + CELL_SIZE // 2, draw_y + CELL_SIZE // 2))
-                self.screen.blit(rotated_image, rect)
-            
-            # --- 6. Vẽ Ghosts ---
-            for ghost in game_state.ghosts:
-                r, c = ghost.pos
-                color = ghost.color
-                if color in self.ghost_images:
-                    image = self.ghost_images[color]
-                    draw_x = c * CELL_SIZE
-                    draw_y = r * CELL_SIZE + offset_y
-                    rect = image.get_rect(center=(draw_x + CELL_SIZE // 2, draw_y + CELL_SIZE // 2))
-                    self.screen.blit(image, rect)
-
-            # --- 7. Vẽ Teleportation Corners ---
-            self.draw_teleport_corners(offset_y)
+            # --- 2-7. Food, Pies, Exit, Pacman, Ghosts, Teleport corners ---
+            self._draw_scene(game_state)
             
             # --- 7.5. Vẽ Teleportation Selection UI ---
             if game_state.pacman.waiting_for_teleport:
@@ -266,6 +338,9 @@ class Renderer:
             # --- 8. Vẽ thông tin (HUD) ---
             self.draw_step(game_state.step_count)
             self.draw_score(len(game_state.food_left))
+
+            self._prev_state = game_state
+            self._force_full_redraw = bool(game_state.pacman.waiting_for_teleport)
             
         except Exception as e:
             print(f"Error in draw_all: {e}")
@@ -273,10 +348,121 @@ class Renderer:
             traceback.print_exc()
             # Không thoát game, chỉ in lỗi
 
+    def _draw_scene(self, game_state, cells=None):
+        """
+        Vẽ các đối tượng trên mê cung (theo đúng thứ tự lớp).
+        cells: nếu khác None, chỉ vẽ các đối tượng nằm trong các ô này.
+        """
+        offset_y = 2 * CELL_SIZE
+
+        # --- 2. Vẽ Thức ăn (Food) với màu sáng hơn ---
+        for r, c in game_state.food_left:
+            if cells is not None and (r, c) not in cells:
+                continue
+            center_x = c * CELL_SIZE + CELL_SIZE // 2
+            center_y = r * CELL_SIZE + CELL_SIZE // 2 + offset_y
+            # Sử dụng màu vàng sáng cho thức ăn
+            pygame.draw.circle(self.screen, YELLOW, (center_x, center_y), CELL_SIZE // 6)
+
+        # --- 3. Vẽ Bánh ma thuật (Magical Pies) với hiệu ứng fade ---
+        alpha = self.food_alpha
+        pie_sprite = self._get_sprite('pie', alpha, lambda: self._make_pie_sprite(alpha))
+        for r, c in game_state.pies_left:
+            if cells is not None and (r, c) not in cells:
+                continue
+            blit_pos_x = c * CELL_SIZE
+            blit_pos_y = r * CELL_SIZE + offset_y
+            self.screen.blit(pie_sprite, (blit_pos_x, blit_pos_y))
+            
+        # --- 4. Vẽ Cổng thoát (Exit Gate) ---
+        if len(game_state.food_left) <= 0 and self.grid.exitgate_pos and self.exitgate_image and \
+                (cells is None or self.grid.exitgate_pos in cells):
+            r, c = self.grid.exitgate_pos
+            draw_x = c * CELL_SIZE
+            draw_y = r * CELL_SIZE + offset_y
+            self.screen.blit(self.exitgate_image, (draw_x, draw_y))
+            
+        # --- 5. Vẽ Pacman với hoạt ảnh và xoay ---
+        if self.pacman_idle_images and (cells is None or game_state.pacman.pos in cells):
+            # Lấy Pacman object từ state
+            pacman = game_state.pacman 
+            r, c = pacman.pos
+            pacman_direction = pacman.direction # <-- LẤY HƯỚNG TỪ STATE
+            
+            frame = self.current_idle_frame
+            rotated_image = self._get_sprite(
+                'pacman', (frame, pacman_direction),
+                lambda: pygame.transform.rotate(self.pacman_idle_images[frame], pacman_direction))
+            
+            draw_x = c * CELL_SIZE
+            draw_y = r * CELL_SIZE + offset_y
+            rect = rotated_image.get_rect(center=(draw_x + CELL_SIZE // 2, draw_y + CELL_SIZE // 2))
+            self.screen.blit(rotated_image, rect)
+        
+        # --- 6. Vẽ Ghosts ---
+        for ghost in game_state.ghosts:
+            r, c = ghost.pos
+            color = ghost.color
+            if cells is not None and ghost.pos not in cells:
+                continue
+            if color in self.ghost_images:
+                image = self.ghost_images[color]
+                draw_x = c * CELL_SIZE
+                draw_y = r * CELL_SIZE + offset_y
+                rect = image.get_rect(center=(draw_x + CELL_SIZE // 2, draw_y + CELL_SIZE // 2))
+                self.screen.blit(image, rect)
+
+        # --- 7. Vẽ Teleportation Corners ---
+        self.draw_teleport_corners(offset_y, cells)
+
+    def draw_dirty(self, game_state):
+        """
+        Chế độ dirty-rect: chỉ vẽ lại các ô thay đổi so với frame trước
+        (Pacman, Ghosts cũ/mới, thức ăn/bánh vừa bị ăn, tường vừa bị ăn,
+        các ô có hiệu ứng động) cùng HUD.
+        Trả về danh sách Rect (tọa độ cửa sổ) cần truyền cho pygame.display.update().
+        """
+        background = self._get_background()
+        prev = self._prev_state
+        window_offset = self.screen.get_abs_offset() # screen có thể là subsurface của cửa sổ
+        if self._force_full_redraw or prev is None or game_state.pacman.waiting_for_teleport:
+            self.draw_all(game_state)
+            return [self.screen.get_rect().move(window_offset)]
+
+        # Các ô cần vẽ lại
+        cells = {prev.pacman.pos, game_state.pacman.pos}
+        cells.update(ghost.pos for ghost in prev.ghosts)
+        cells.update(ghost.pos for ghost in game_state.ghosts)
+        cells.update(prev.food_left - game_state.food_left)
+        cells.update(prev.pies_left) # Bánh có hiệu ứng fade: luôn vẽ lại
+        cells.update(self.grid.teleport_corners) # Góc teleport có hiệu ứng chớp tắt
+        cells.update(self._patched_cells)
+        if self.grid.exitgate_pos and (not game_state.food_left or not prev.food_left):
+            cells.add(self.grid.exitgate_pos)
+
+        offset_y = 2 * CELL_SIZE
+        rects = []
+        for r, c in cells:
+            if 0 <= r < self.grid.rows and 0 <= c < self.grid.cols:
+                rect = pygame.Rect(c * CELL_SIZE, r * CELL_SIZE + offset_y, CELL_SIZE, CELL_SIZE)
+                self.screen.blit(background, rect, rect)
+                rects.append(rect)
+        self._draw_scene(game_state, cells)
+
+        # HUD
+        hud_rect = pygame.Rect(0, 0, self.screen_width, offset_y)
+        self.screen.blit(background, hud_rect, hud_rect)
+        self.draw_step(game_state.step_count)
+        self.draw_score(len(game_state.food_left))
+        rects.append(hud_rect)
+
+        self._prev_state = game_state
+        return [rect.move(window_offset) for rect in rects]
+
     def draw_step(self, step_count):
         """Vẽ số bước đi."""
         # Thêm background cho text để dễ đọc hơn
-        text_surface = self.font.render(f"Step: {step_count}", True, WHITE)
+        text_surface = render_text(self.font, f"Step: {step_count}", WHITE)
         text_rect = text_surface.get_rect()
         text_rect.topleft = (CELL_SIZE // 2, CELL_SIZE // 2)
         
@@ -287,7 +473,7 @@ class Renderer:
 
     def draw_score(self, food_remain):
         """Vẽ số thức ăn còn lại."""
-        text_surface = self.font.render(f"Food remain: {food_remain} ", True, WHITE)
+        text_surface = render_text(self.font, f"Food remain: {food_remain} ", WHITE)
         text_rect = text_surface.get_rect()
         text_rect.topright = (self.screen_width - CELL_SIZE // 2, CELL_SIZE // 2)
         
@@ -296,33 +482,21 @@ class Renderer:
         pygame.draw.rect(self.screen, (0, 0, 0, 150), bg_rect)
         self.screen.blit(text_surface, text_rect)
     
-    def draw_teleport_corners(self, offset_y):
+    def draw_teleport_corners(self, offset_y, cells=None):
         """Vẽ các góc teleportation với hiệu ứng chớp tắt."""
+        alpha = self.teleport_alpha
+        teleport_sprite = self._get_sprite('teleport', alpha, lambda: self._make_teleport_sprite(alpha))
         for r, c in self.grid.teleport_corners:
-            # Tạo surface với alpha để có hiệu ứng fade
-            temp_surface = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
-            current_color = (*self.teleport_color, self.teleport_alpha)
-            
-            # Vẽ hình tròn với hiệu ứng fade
-            center = (CELL_SIZE // 2, CELL_SIZE // 2)
-            pygame.draw.circle(temp_surface, current_color, center, CELL_SIZE // 3)
-            
-            # Vẽ viền để làm nổi bật
-            pygame.draw.circle(temp_surface, (255, 255, 255, 200), center, CELL_SIZE // 3, 2)
-            
-            # Vẽ chữ "T" để chỉ teleport
-            font_small = pygame.font.Font(None, 16)
-            text_surface = font_small.render("T", True, (255, 255, 255, 255))
-            text_rect = text_surface.get_rect(center=center)
-            temp_surface.blit(text_surface, text_rect)
-            
+            if cells is not None and (r, c) not in cells:
+                continue
             # Blit lên màn hình
             draw_x = c * CELL_SIZE
             draw_y = r * CELL_SIZE + offset_y
-            self.screen.blit(temp_surface, (draw_x, draw_y))
+            self.screen.blit(teleport_sprite, (draw_x, draw_y))
     
     def draw_teleport_selection_ui(self, game_state):
         """Vẽ UI để chọn teleportation destination."""
+        self._force_full_redraw = True
         # Tạo overlay mờ
         overlay = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 150))
@@ -332,7 +506,7 @@ class Renderer:
         teleport_options = self.grid.get_teleport_destinations(game_state.pacman.pos)
         
         # Vẽ hướng dẫn
-        instruction_text = self.font_medium.render("Select teleport destination:", True, WHITE)
+        instruction_text = render_text(self.font_medium, "Select teleport destination:", WHITE)
         instruction_rect = instruction_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 100))
         self.screen.blit(instruction_text, instruction_rect)
         
@@ -344,7 +518,7 @@ class Renderer:
             screen_y = r * CELL_SIZE + CELL_SIZE // 2 + 2 * CELL_SIZE
             
             # Vẽ số lựa chọn
-            choice_text = self.font_medium.render(f"{i}", True, YELLOW)
+            choice_text = render_text(self.font_medium, f"{i}", YELLOW)
             choice_rect = choice_text.get_rect(center=(screen_x, screen_y - 30))
             self.screen.blit(choice_text, choice_rect)
             
@@ -357,7 +531,7 @@ class Renderer:
             # self.screen.blit(coord_text, coord_rect)
         
         # Vẽ hướng dẫn phím
-        help_text = self.font_small.render("Press 1-4 to select destination", True, WHITE)
+        help_text = render_text(self.font_small, "Press 1-4 to select destination", WHITE)
         help_rect = help_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 + 100))
         self.screen.blit(help_text, help_rect)
 
@@ -365,15 +539,16 @@ class Renderer:
         """
         Vẽ màn hình thông báo chiến thắng.
         """
+        self._force_full_redraw = True
         # Tạo bề mặt mờ (Overlay)
         s = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
         s.fill((0, 0, 0, 200)) # Màu đen, độ trong suốt 200
         self.screen.blit(s, (0, 0))
 
-        win_text = self.font_large.render(f"YOU WIN!", True, YELLOW)
-        step_text = self.font_medium.render(f"Total Steps: {step_count}", True, WHITE)
-        restart_text = self.font_small.render("Press 'R' to restart", True, WHITE)
-        menu_text = self.font_small.render("Press 'ESC' for Main Menu", True, WHITE)
+        win_text = render_text(self.font_large, f"YOU WIN!", YELLOW)
+        step_text = render_text(self.font_medium, f"Total Steps: {step_count}", WHITE)
+        restart_text = render_text(self.font_small, "Press 'R' to restart", WHITE)
+        menu_text = render_text(self.font_small, "Press 'ESC' for Main Menu", WHITE)
         
         center_x = self.screen_width // 2
         center_y = self.screen_height // 2
@@ -387,14 +562,15 @@ class Renderer:
         """
         Vẽ màn hình thông báo Thua Cuộc (Game Over).
         """
+        self._force_full_redraw = True
         # Tạo bề mặt mờ (Overlay)
         s = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
         s.fill((0, 0, 0, 220)) # Màu đen, mờ hơn win
         self.screen.blit(s, (0, 0))
 
-        game_over_text = self.font_large.render(f"GAME OVER", True, (255, 0, 0)) # Màu đỏ
-        restart_text = self.font_small.render("Press 'R' to restart", True, WHITE)
-        menu_text = self.font_small.render("Press 'ESC' for Main Menu", True, WHITE)
+        game_over_text = render_text(self.font_large, f"GAME OVER", (255, 0, 0)) # Màu đỏ
+        restart_text = render_text(self.font_small, "Press 'R' to restart", WHITE)
+        menu_text = render_text(self.font_small, "Press 'ESC' for Main Menu", WHITE)
         
         center_x = self.screen_width // 2
         center_y = self.screen_height // 2
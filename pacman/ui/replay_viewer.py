@@ -0,0 +1,86 @@
+import pygame
+
+from pacman.core.replay import Replayer
+from pacman.ui.renderer import Renderer, window_size, maze_surface
+
+
+class ReplayViewer:
+    """
+    Xem lại file replay: vẽ trạng thái tại frame bất kỳ.
+    Phím: SPACE chạy/dừng, ←/→ lùi/tiến 1 frame, PAGE UP/DOWN lùi/tiến 50 frame,
+    HOME/END về đầu/cuối, ESC thoát.
+    """
+    def __init__(self, replay_path, fps=10):
+        self.replayer = Replayer(replay_path)
+        self.fps = fps
+        self.playing = False
+        # Cửa sổ vuông tạo một lần; mê cung vẽ vào subsurface ở giữa
+        self.window = pygame.display.set_mode(window_size(self.replayer.grid))
+        self.screen = None
+        self._set_screen()
+        pygame.display.set_caption("Pacman - Replay")
+        self.renderer = Renderer(self.screen, self.replayer.grid)
+        self.clock = pygame.time.Clock()
+
+    def _set_screen(self):
+        """Lấy subsurface mới nếu kích thước mê cung thay đổi (do xoay). Trả về True nếu có thay đổi."""
+        grid = self.replayer.grid
+        screen = maze_surface(self.window, grid)
+        if self.screen is not None and self.screen.get_size() == screen.get_size():
+            return False
+        self.window.fill((0, 0, 0))
+        self.screen = screen
+        return True
+
+    def _sync_screen(self):
+        if self._set_screen():
+            self.renderer.update_grid(self.replayer.grid)
+            self.renderer.update_screen(self.screen)
+
+    def seek(self, frame):
+        self.replayer.seek(frame)
+        self._sync_screen()
+
+    def run(self):
+        replayer = self.replayer
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return 'quit'
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        return 'quit'
+                    elif event.key == pygame.K_SPACE:
+                        self.playing = not self.playing
+                    elif event.key == pygame.K_RIGHT:
+                        self.seek(replayer.frame + 1)
+                    elif event.key == pygame.K_LEFT:
+                        self.seek(replayer.frame - 1)
+                    elif event.key == pygame.K_PAGEDOWN:
+                        self.seek(replayer.frame + 50)
+                    elif event.key == pygame.K_PAGEUP:
+                        self.seek(replayer.frame - 50)
+                    elif event.key == pygame.K_HOME:
+                        self.seek(0)
+                    elif event.key == pygame.K_END:
+                        self.seek(len(replayer))
+
+            if self.playing:
+                if not replayer.step():
+                    self.playing = False
+                self._sync_screen()
+
+            self.renderer.update_animation()
+            self.renderer.update_animation_magical_pie()
+            self.renderer.update_teleport_animation()
+            self.renderer.draw_all(replayer.game_state)
+
+            status = replayer.simulator.game_status
+            if status == 'win':
+                self.renderer.draw_win_screen(replayer.game_state.step_count)
+            elif status == 'lose':
+                self.renderer.draw_lose_screen()
+
+            pygame.display.set_caption(f"Pacman - Replay (frame {replayer.frame}/{len(replayer)})")
+            pygame.display.flip()
+            self.clock.tick(self.fps if self.playing else 30)
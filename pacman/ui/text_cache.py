@@ -0,0 +1,59 @@
+# pacman/ui/text_cache.py
+"""
+Cache Surface chữ đã render (font.render) để không phải raster lại
+những chuỗi không đổi giữa các frame (HUD, overlay, nút menu).
+Khóa: (font, chuỗi, màu); loại bỏ theo LRU khi vượt quá số mục tối đa.
+"""
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class TextCache:
+    """
+    Cache LRU của các Surface chữ. Surface trả về được dùng chung,
+    chỉ nên blit chứ không vẽ đè lên.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        """Giống font.render(text, antialias, color) nhưng dùng lại Surface đã render."""
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False) # Bỏ mục ít dùng gần đây nhất
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+_shared_cache = None
+
+
+def get_text_cache():
+    """Cache dùng chung cho toàn bộ UI."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = TextCache()
+    return _shared_cache
+
+
+def render_text(font, text, color, antialias=True):
+    """Render chữ qua cache dùng chung."""
+    return get_text_cache().render(font, text, color, antialias)